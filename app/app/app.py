@@ -7,13 +7,40 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from toolz import pipe
+from fastapi_lti1p3.session_cache import SessionCache
 
 from app.app.errors.http_error import http_error_handler, validation_error_handler
 from app.app.errors.user_info_error import get_user_info_exception_handler, UserInfoException
 from app.app.routes import register_routers as register_routers
 from app.config.environment import Settings
-from app.infrastructure.database.db import create_db_and_tables, init_db
+from app.infrastructure.database.db import create_db_and_tables, init_db, dispose_db
 from app.infrastructure.event_processor.process_manager import start_process_worker
+from app.infrastructure.event_processor.buffer import start_event_buffer, stop_event_buffer
+from app.infrastructure.jobs.runner import start_job_workers
+from app.infrastructure.LLM.pdf_extraction import shutdown_pool as shutdown_pdf_extraction_pool
+from app.infrastructure.LLM.clients import close_clients as close_llm_clients
+from app.infrastructure.cache.prompts import start_prompt_cache
+from app.infrastructure.LLM.telemetry import LLMTrace, current_trace as current_llm_trace
+
+class LLMTraceMiddleware(BaseHTTPMiddleware):
+
+    async def dispatch(self, request: Request, call_next):
+        # The trace is shared with the request's task, every LLM call made while handling it is appended
+        trace = LLMTrace()
+        token = current_llm_trace.set(trace)
+        try:
+            response = await call_next(request)
+        finally:
+            current_llm_trace.reset(token)
+
+        if trace.calls:
+            summary = trace.log(f"{request.method} {request.url.path}")
+            response.headers["X-LLM-Trace-Id"] = summary["trace_id"]
+            response.headers["X-LLM-Calls"] = str(summary["calls"])
+            response.headers["X-LLM-Tokens"] = str(summary["prompt_tokens"] + summary["response_tokens"])
+            response.headers["X-LLM-Seconds"] = str(summary["latency_seconds"])
+        return response
+
 
 class TemplateMiddleware(BaseHTTPMiddleware):
 
@@ -48,7 +75,15 @@ def init_database(app: FastAPI) -> FastAPI:
 def register_events(app: FastAPI) -> FastAPI:
     # TODO add events if applicable
     app.on_event("startup")(create_db_and_tables) # This event can be removed if not seeding a database
+    app.on_event("startup")(start_prompt_cache)
     app.on_event("startup")(start_process_worker)
+    app.on_event("startup")(start_event_buffer)
+    app.on_event("startup")(start_job_workers)
+    app.on_event("shutdown")(stop_event_buffer)
+    app.on_event("shutdown")(shutdown_pdf_extraction_pool)
+    app.on_event("shutdown")(close_llm_clients)
+    app.on_event("shutdown")(SessionCache().close)
+    app.on_event("shutdown")(dispose_db)
 
     return app
 
@@ -57,6 +92,7 @@ def register_middleware(app: FastAPI) -> FastAPI:
     # TODO register middleware if applicable
 
     app.add_middleware(TemplateMiddleware)
+    app.add_middleware(LLMTraceMiddleware)
     app.add_middleware(CORSMiddleware, 
         allow_origins=["*"], 
         allow_credentials=True,
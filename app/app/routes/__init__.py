@@ -3,7 +3,7 @@ from fastapi.applications import FastAPI
 
 from fastapi_lti1p3 import routes
 from app.app.routes import (root, qas, domain, concept, concept_to_concept, concept_to_module,
-                            module, course, question, gui, prompt, student, quiz)
+                            module, course, question, gui, prompt, student, quiz, job)
 from app.config.environment import get_settings
 from app.domain.models.errors import APIMErrorResponse, ErrorResponse
 
@@ -32,4 +32,5 @@ def register_routers(app: FastAPI) -> FastAPI:
     app.include_router(gui.router, tags=["GUI"], prefix="/gui")
     app.include_router(prompt.router, tags=["Prompt"], prefix="/prompt")
     app.include_router(student.router, tags=["Student"], prefix="/student")
+    app.include_router(job.router, tags=["Job"], prefix="/jobs")
     return app
\ No newline at end of file
@@ -1,11 +1,11 @@
-from typing import List, Literal, Union, Dict
+from typing import List, Literal, Union, Dict, Optional
 
 from fastapi import APIRouter, Depends, Response, Request, Query
 
 from app.domain.models.errors import ErrorResponse
 from ..errors.db_error import DBError
 
-from app.domain.models.concept import ConceptToConceptCreate, ConceptRead, ConceptToConceptDelete, ConceptBulkRead, ConceptToConceptRead
+from app.domain.models.concept import ConceptToConceptCreate, ConceptRead, ConceptToConceptDelete, ConceptBulkRead, ConceptToConceptRead, ConceptToConceptClosureRead
 from app.domain.protocols.services.concept import ConceptToConceptService as CToCProtocol
 from app.domain.services.concept import ConceptService
 
@@ -87,6 +87,112 @@ async def get_many_junction_sets(
         )
 
 
+@router.get("/closure/{direction}", name="ConceptToConcept:get-closure", response_model=Union[List[ConceptToConceptClosureRead], ErrorResponse])
+async def get_junction_closure(
+    request: Request, 
+    response: Response,
+    direction: Literal["up", "down"] = "down",
+    max_depth: Optional[int] = Query(None, ge=1),
+    concepts: ConceptBulkRead = Depends(list_concept_names),
+    c_to_c_service: CToCProtocol = Depends(ConceptService)
+    ) -> Union[List[ConceptToConceptClosureRead], ErrorResponse]:
+    """
+    Returns every junction reachable from the given concepts with its depth, walked by the database in a single recursive query.
+    | Input | Required | Type | Description |
+    | :---- | :------- | :--- | :---------- |
+    | direction | True | str["up", "down"] | "down" follows the prerequisites of the supplied concepts, "up" follows their dependents |
+    | max_depth | False | int | Longest chain of junctions followed, CONCEPT_CLOSURE_MAX_DEPTH if omitted |
+    | list_of_names | True | str | Concept names delimited by '\|' |
+
+    """
+    try:
+        return await c_to_c_service.get_concept_closure(concepts=concepts, junction_direction=direction, max_depth=max_depth)
+
+    except DBError as e:
+        response.status_code = e.status_code
+        return ErrorResponse(
+            code=e.status_code,
+            type=e.type,
+            message=str(e)
+        )
+
+
+@router.get("/module/{module_id}/closure/{direction}", name="ConceptToConcept:get-module-closure", response_model=Union[List[ConceptToConceptClosureRead], ErrorResponse])
+async def get_module_junction_closure(
+    request: Request, 
+    response: Response,
+    module_id: int,
+    direction: Literal["up", "down"] = "down",
+    max_depth: Optional[int] = Query(None, ge=1),
+    c_to_c_service: CToCProtocol = Depends(ConceptService)
+    ) -> Union[List[ConceptToConceptClosureRead], ErrorResponse]:
+    """
+    Returns every junction reachable from the concepts of a module with its depth, walked by the database in a single recursive query.
+    """
+    try:
+        return await c_to_c_service.get_module_closure(module_id=module_id, junction_direction=direction, max_depth=max_depth)
+
+    except DBError as e:
+        response.status_code = e.status_code
+        return ErrorResponse(
+            code=e.status_code,
+            type=e.type,
+            message=str(e)
+        )
+
+
+@router.get("/chain/{direction}", name="ConceptToConcept:get-concept-chain", response_model=Union[ConceptBulkRead, ErrorResponse])
+async def get_concept_chain(
+    request: Request, 
+    response: Response,
+    direction: Literal["up", "down"] = "down",
+    hops: Optional[int] = Query(None, ge=1),
+    concepts: ConceptBulkRead = Depends(list_concept_names),
+    c_to_c_service: CToCProtocol = Depends(ConceptService)
+    ) -> Union[ConceptBulkRead, ErrorResponse]:
+    """
+    Returns the concepts reachable from the given concepts through chains of junctions, ordered by distance.
+    | Input | Required | Type | Description |
+    | :---- | :------- | :--- | :---------- |
+    | direction | True | str["up", "down"] | "down" follows the prerequisites of the supplied concepts, "up" follows their dependents |
+    | hops | False | int | How many junctions to follow, the whole chain if omitted |
+    | list_of_names | True | str | Concept names delimited by '\|' |
+
+    """
+    try:
+        return await c_to_c_service.get_concept_chain(concepts=concepts, junction_direction=direction, hops=hops)
+
+    except DBError as e:
+        response.status_code = e.status_code
+        return ErrorResponse(
+            code=e.status_code,
+            type=e.type,
+            message=str(e)
+        )
+
+
+@router.get("/order", name="ConceptToConcept:get-learning-order", response_model=Union[ConceptBulkRead, ErrorResponse])
+async def get_learning_order(
+    request: Request, 
+    response: Response,
+    concepts: ConceptBulkRead = Depends(list_concept_names),
+    c_to_c_service: CToCProtocol = Depends(ConceptService)
+    ) -> Union[ConceptBulkRead, ErrorResponse]:
+    """
+    Returns the given concepts in learning order, each concept after its prerequisites among them
+    """
+    try:
+        return await c_to_c_service.get_learning_order(concepts=concepts)
+
+    except DBError as e:
+        response.status_code = e.status_code
+        return ErrorResponse(
+            code=e.status_code,
+            type=e.type,
+            message=str(e)
+        )
+
+
 #TODO: add return for success or failure to delete
 @router.delete("", name="ConceptToConcept:delete-concept-to-concept-junctions")
 async def delete_concept_junction(
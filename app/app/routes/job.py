@@ -0,0 +1,92 @@
+import asyncio
+from typing import Union
+
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.domain.models.errors import ErrorResponse
+from app.domain.models.job import JobRead
+from app.domain.protocols.services.job import JobService as JobServiceProtocol
+from app.domain.services.job import JobService
+from fastapi_lti1p3 import enforce_auth
+from fastapi_lti1p3.errors.validation_errors import AuthValidationError
+
+router = APIRouter()
+
+_TERMINAL_STATUSES = {"succeeded", "failed"}
+
+# Roles allowed to queue background jobs and read them back
+JOB_ROLES = {'TeacherEnrollment', 'DesignerEnrollment'}
+
+
+async def authorize_job_owner(request: Request) -> str:
+    """
+    Returns the user of the request's LTI session, the owner of the jobs it queues.
+
+    :raises AuthValidationError: If there is no session or it does not belong to the Instructional Team
+    """
+    session_data = await enforce_auth(request=request, accepted_roles=JOB_ROLES)
+    return session_data.id_token.get("sub")
+
+
+def unauthorized_response(error: AuthValidationError) -> ErrorResponse:
+    return ErrorResponse(code=error.status_code, type="UnauthorizedAccess", message=error.message)
+
+
+@router.get("/{job_id}", name="job:get-job", response_model=Union[JobRead, ErrorResponse])
+async def get_job(
+    request: Request,
+    response: Response,
+    job_id: int,
+    job_service: JobServiceProtocol = Depends(JobService)
+) -> Union[JobRead, ErrorResponse]:
+    """
+    Returns the status of a background job, its timing and, once finished, its result or error.
+    Only the user who queued the job can read it.
+    """
+    try:
+        owner = await authorize_job_owner(request=request)
+    except AuthValidationError as e:
+        response.status_code = e.status_code
+        return unauthorized_response(e)
+
+    job = await job_service.get_job(job_id=job_id, owner=owner)
+    if job is None:
+        response.status_code = 404
+        return ErrorResponse(code=404, type="JobNotFoundError", message=f"There is no job with job_id: {job_id}.")
+    return job
+
+
+@router.get("/{job_id}/events", name="job:stream-job")
+async def stream_job(
+    request: Request,
+    job_id: int,
+    poll_interval: float = 1.0,
+    job_service: JobServiceProtocol = Depends(JobService)
+) -> StreamingResponse:
+    """
+    Streams the job as Server-Sent Events, one event whenever its status changes, until it succeeds or fails.
+    Only the user who queued the job can stream it.
+    """
+    try:
+        owner = await authorize_job_owner(request=request)
+    except AuthValidationError as e:
+        return JSONResponse(status_code=e.status_code, content=unauthorized_response(e).dict())
+
+    async def events():
+        last_status = None
+        while not await request.is_disconnected():
+            job = await job_service.get_job(job_id=job_id, owner=owner)
+            if job is None:
+                yield f"event: error\ndata: {ErrorResponse(code=404, type='JobNotFoundError', message=f'There is no job with job_id: {job_id}.').json()}\n\n"
+                return
+
+            if job.status != last_status:
+                last_status = job.status
+                yield f"event: {job.status}\ndata: {job.json()}\n\n"
+            if job.status in _TERMINAL_STATUSES:
+                return
+
+            await asyncio.sleep(max(poll_interval, 0.1))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -8,18 +8,23 @@ from fastapi import (
     APIRouter,
     Depends,
     File,
+    Header,
     HTTPException,
+    Query,
     Request,
     Response,
     UploadFile,
 )
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from loguru import logger
-from sqlmodel import Session
+import numpy as np
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.domain.models.course import CourseRead
 from app.domain.models.errors import ErrorResponse
 from app.domain.models.forms import ModuleForm, RegistrationForm
+from app.domain.models.job import JobRead
 from app.domain.models.llm_agent import ContingencyFunctions, Validator
 from app.domain.models.module import ModuleConceptsResponse, ModuleRead, ModuleSummary
 from app.domain.models.question import QuestionCreate
@@ -31,41 +36,58 @@ from app.domain.protocols.routes.qas import (
 )
 from app.domain.protocols.services.course import CourseService as CourseServiceProtocol
 from app.domain.protocols.services.domain import DomainService as DomainServiceProtocol
+from app.domain.protocols.services.job import JobService as JobServiceProtocol
 from app.domain.protocols.services.module import ModuleService as ModuleServiceProtocol
 from app.domain.protocols.services.personalization import KnowledgeStateParameters
 from app.domain.services.canvas import CanvasCourseService
 from app.domain.services.concept import ConceptService
 from app.domain.services.course import CourseService
 from app.domain.services.domain import DomainService
+from app.domain.services.job import JobService
 from app.domain.services.module import ModuleService
 from app.domain.services.personalization import QuestionPersonalizationService
 from app.domain.services.question import QuestionService
 from app.domain.services.quiz import QuizService
 from app.domain.services.student import StudentService
 from app.domain.services.trigger_event import TriggerEventService
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.db import get_session
 from app.infrastructure.LLM.contingencies.general import check_valid_json
 from app.infrastructure.LLM.contingencies.questions import (
     check_contents_question_list,
     check_has_key_questions,
     format_questions,
+    repair_question_list,
 )
 from app.infrastructure.LLM.llm_agent import LLMAgent
 from app.utils.anonymization import hash_string_using_sha256
 from app.utils.personalization import (
     convert_question_list_to_dataframe,
     extract_concept_names_from_concept_bulk_read,
+    index_answers_by_question_id,
     map_answers_to_questions,
 )
 from fastapi_lti1p3 import enforce_auth
+from fastapi_lti1p3.errors.validation_errors import AuthValidationError
 from fastapi_lti1p3.session_cache import SessionCache
 
 from ..errors.db_error import DBError
 from ..errors.llm_response_error import LLMResponseError
 from ..errors.validation_error import ValidationError
+from .job import authorize_job_owner, unauthorized_response
 
 router = APIRouter()
 
+
+def question_contingency_functions() -> ContingencyFunctions:
+    return ContingencyFunctions(
+        validators=[
+            Validator(order=1, function=check_valid_json),
+            Validator(order=2, function=check_has_key_questions),
+            Validator(order=3, function=check_contents_question_list, repair=repair_question_list)
+        ],
+        formatter=format_questions
+    )
+
 @router.post("/register", name="qas:register", response_model=Union[CourseRead, ErrorResponse])
 async def register(
     request: Request,
@@ -73,9 +95,12 @@ async def register(
     model_name: Literal["gpt-3.5-turbo", "gemini-1.5-pro-latest", "gpt-4o", "llama-3"],
     content_files: List[UploadFile] = File(...),
     form_data: RegistrationForm = Depends(RegistrationForm.as_form),
+    background: bool = False,
+    idempotency_key: Optional[str] = Header(default=None),
     course_service: CourseServiceProtocol = Depends(CourseService),
     domain_service: DomainServiceProtocol = Depends(DomainService),
-) -> Union[CourseRead, ErrorResponse]:
+    job_service: JobServiceProtocol = Depends(JobService),
+) -> Union[CourseRead, JobRead, ErrorResponse]:
     """
     Registers a new course in the system, assigns a domain and LLM-generated content summary to the course.\n
 
@@ -88,6 +113,8 @@ async def register(
     | name | False | Str | Name of course, uses 'instructor - quarter' if no name is supplied |
     | subject | True | Str | Subject of course |
     | difficulty | True | Int | Difficulty level of course coded as Int (1: introductory, 2: intermediate, 3: undergrad?, ...) final code tbd |
+    | background | False | Bool | Queues the registration as a background job and returns the job to poll at /jobs/{job_id} |
+    | Idempotency-Key | False | Header | Retried background requests with the same key return the existing job |
     """
     # Check if files are either text or PDF
     for content_file in content_files:
@@ -96,22 +123,85 @@ async def register(
             response.status_code = 400
             return ErrorResponse(code=400, detail="Invalid file type. Only text and PDF are allowed.")
 
+    if background:
+        return await enqueue_job(
+            request=request,
+            response=response,
+            job_service=job_service,
+            operation="qas:register",
+            payload={"model_name": model_name, "form_data": jsonable_encoder(form_data)},
+            files=content_files,
+            idempotency_key=idempotency_key
+        )
+
+    result = await register_course(
+        model_name=model_name,
+        content_files=content_files,
+        form_data=form_data,
+        course_service=course_service,
+        domain_service=domain_service
+    )
+    if isinstance(result, ErrorResponse):
+        response.status_code = result.code
+    return result
+
+
+async def register_course(
+    model_name: str,
+    content_files: List[UploadFile],
+    form_data: RegistrationForm,
+    course_service: CourseServiceProtocol,
+    domain_service: DomainServiceProtocol,
+) -> Union[CourseRead, ErrorResponse]:
+    """
+    Creates the domain when none is supplied, then the course. Shared by the route and its background job.
+    """
     domain_is_new = False
 
     if not form_data.domain_id:
         domain_result = await domain_service.create_domain(domain=form_data)
         if isinstance(domain_result, ErrorResponse):
-            response.status_code = domain_result.code
             return domain_result
         form_data.domain_id = domain_result.domain_id
         domain_is_new = True
 
-    course_result = await course_service.create_course(form_data=form_data, content_files=content_files, domain_is_new=domain_is_new, model_name=model_name)
-    if isinstance(course_result, ErrorResponse):
-        response.status_code = course_result.code
-        return course_result
+    return await course_service.create_course(form_data=form_data, content_files=content_files, domain_is_new=domain_is_new, model_name=model_name)
+
 
-    return course_result
+async def enqueue_job(
+    request: Request,
+    response: Response,
+    job_service: JobServiceProtocol,
+    operation: str,
+    payload: Dict,
+    files: Optional[List[UploadFile]] = None,
+    idempotency_key: Optional[str] = None,
+    secrets: Optional[Dict] = None,
+) -> Union[JobRead, ErrorResponse]:
+    """
+    Queues the operation for the background workers, answers 202 for a new job and 200 when the idempotency key matched an existing one.
+    Queuing requires an Instructional Team session, the job can then only be read back at /jobs/{job_id} by the same user.
+    """
+    try:
+        owner = await authorize_job_owner(request=request)
+    except AuthValidationError as e:
+        response.status_code = e.status_code
+        return unauthorized_response(e)
+
+    try:
+        job, created = await job_service.enqueue(
+            operation=operation,
+            payload=payload,
+            files=files,
+            idempotency_key=idempotency_key,
+            secrets=secrets,
+            owner=owner
+        )
+    except DBError as e:
+        response.status_code = e.status_code
+        return ErrorResponse(code=e.status_code, type=e.type, message=str(e))
+    response.status_code = 202 if created else 200
+    return job
 
 @router.post("/module", name="qas:create-module", response_model=Union[ModuleRead, ErrorResponse])
 async def create_module(
@@ -120,15 +210,31 @@ async def create_module(
     model_name: Literal["gpt-3.5-turbo", "gemini-1.5-pro-latest", "gpt-4o", "llama-3"],
     files: List[UploadFile] = File(...),
     form_data: ModuleForm = Depends(ModuleForm.as_form),
-    module_service: ModuleServiceProtocol = Depends(ModuleService)
-) -> Union[ModuleRead, ErrorResponse]:
+    background: bool = False,
+    idempotency_key: Optional[str] = Header(default=None),
+    module_service: ModuleServiceProtocol = Depends(ModuleService),
+    job_service: JobServiceProtocol = Depends(JobService),
+) -> Union[ModuleRead, JobRead, ErrorResponse]:
     """
     | Input | Required | Type | Description |
     | :---- | :------: | :--: | :---------- |
     | files | True | List of Files | Module contents either as an image or text file, used to generate content summary, module concepts, and prerequisite relationships |
     | title | True | Str | Title of Module |
     | course_id | True | ID of course module is being created for |  
+    | background | False | Bool | Queues the module creation as a background job and returns the job to poll at /jobs/{job_id} |
+    | Idempotency-Key | False | Header | Retried background requests with the same key return the existing job |
     """
+    if background:
+        return await enqueue_job(
+            request=request,
+            response=response,
+            job_service=job_service,
+            operation="qas:create-module",
+            payload={"model_name": model_name, "form_data": jsonable_encoder(form_data)},
+            files=files,
+            idempotency_key=idempotency_key
+        )
+
     try:
         result = await module_service.create_module(form_data=form_data, files=files, model_name=model_name)
         return result
@@ -206,20 +312,12 @@ async def get_quiz_questions(
     quiz_type: Literal["prereq", "preview", "review"],
     prompt: str,
     num_questions: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_session)
 ) -> List[QuestionCreate]:
 
     llm_agent = LLMAgent(module_id=module_id)
     
-    contingency_functions = ContingencyFunctions(
-        validators=[
-            Validator(order=1, function=check_valid_json),
-            Validator(order=2, function=check_has_key_questions),
-            Validator(order=3, function=check_contents_question_list)
-        ],
-        formatter=format_questions
-    )
-    questions = await llm_agent.execute(action="questions", contingency_functions=contingency_functions, params= {
+    questions = await llm_agent.execute(action="questions", contingency_functions=question_contingency_functions(), params= {
         "quiz_type": quiz_type,
         "model_name": model_name,
         "prompt": prompt,
@@ -228,6 +326,53 @@ async def get_quiz_questions(
     return questions
 
 
+@router.get(
+    path="/quiz/{module_id}/{quiz_type}/stream",
+    name="qas:stream-quiz-questions",
+    responses={
+        404: {"model": ErrorResponse},
+        400: {"model": ErrorResponse},
+        500: {"model": ErrorResponse}
+    }
+)
+async def stream_quiz_questions(
+    request: Request,
+    model_name: Literal["gpt-3.5-turbo", "gemini-1.5-pro-latest", "gpt-4o", "llama-3"],
+    module_id: int,
+    quiz_type: Literal["prereq", "preview", "review"],
+    prompt: str,
+    num_questions: int
+) -> StreamingResponse:
+    """
+    Streams the generated questions as Server-Sent Events: a 'question' event as soon as each question is complete and validated,
+    an 'error' event for each rejected question and a final 'done' event with the no of questions sent.
+    """
+    llm_agent = LLMAgent(module_id=module_id)
+    params = {
+        "quiz_type": quiz_type,
+        "model_name": model_name,
+        "prompt": prompt,
+        "num_questions": num_questions
+    }
+
+    async def events():
+        try:
+            async for event, data in llm_agent.stream(action="questions", contingency_functions=question_contingency_functions(), params=params):
+                if await request.is_disconnected():
+                    return
+                if event == "item":
+                    yield f"event: question\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+                elif event == "error":
+                    yield f"event: error\ndata: {json.dumps({'message': data})}\n\n"
+                else:
+                    yield f"event: done\ndata: {json.dumps({'questions': data})}\n\n"
+        except Exception as e:
+            logger.exception("Question stream failed")
+            yield f"event: error\ndata: {ErrorResponse(code=500, type='LLMResponseError', message=str(e)).json()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @router.post(
         path="/quiz/personal/{module_id}/{quiz_type}",
         name="qas:generate_personalized_quiz_for_all_students",
@@ -238,11 +383,16 @@ async def get_quiz_questions(
             }
         )
 async def generate_personalized_quiz_for_all_students(
+        request: Request,
+        response: Response,
         quiz_params: PersonalizedQuizProtocol,
+        background: bool = False,
+        idempotency_key: Optional[str] = Header(default=None),
         question_service = Depends(QuestionService),
-        concept_service = Depends(ConceptService)
-) -> Dict:
-    # ---------- extracts concepts to be tested -----------------
+        concept_service = Depends(ConceptService),
+        student_service = Depends(StudentService),
+        job_service: JobServiceProtocol = Depends(JobService)
+) -> Union[Dict, JobRead]:
     # TODO: Build a switch case for different quiz types.
     if quiz_params.quiz_type != "prereq":
         return JSONResponse(
@@ -253,19 +403,55 @@ async def generate_personalized_quiz_for_all_students(
                 "message": 'Only prereq is available currently'
                 }
             )
-    else:
-        # TODO: Define an alternative strategy for extracting relevant concepts.
-        concepts_json_results = await concept_service.get_all_prereqs_of_module(
-            quiz_params.module_id
+
+    if background:
+        # The access token is encrypted apart from the payload and dropped once the job finishes
+        return await enqueue_job(
+            request=request,
+            response=response,
+            job_service=job_service,
+            operation="qas:generate-personalized-quizzes",
+            payload={"quiz_params": jsonable_encoder(quiz_params, exclude={"canvas_access_token"})},
+            secrets={"canvas_access_token": quiz_params.canvas_access_token},
+            idempotency_key=idempotency_key
         )
+
+    return await generate_personalized_quizzes(
+        quiz_params=quiz_params,
+        question_service=question_service,
+        concept_service=concept_service,
+        student_service=student_service
+    )
+
+
+async def generate_personalized_quizzes(
+        quiz_params: PersonalizedQuizProtocol,
+        question_service,
+        concept_service,
+        student_service
+) -> Dict:
+    """
+    Selects and publishes every student's prereq quiz. Shared by the route and its background job.
+    """
+    # ---------- extracts concepts to be tested -----------------
+    # TODO: Define an alternative strategy for extracting relevant concepts.
+    concepts_json_results = await concept_service.get_all_prereqs_of_module(
+        quiz_params.module_id,
+        hops=quiz_params.prereq_hops
+    )
     concepts_to_be_tested = await extract_concept_names_from_concept_bulk_read(
         concepts_object=concepts_json_results
     )
 
-    # extracts potential questions
+    # extracts the question and answer bank once for every student
     questions = await question_service.get_all_questions_for_concepts(
         concept_list=concepts_to_be_tested
     )
+    answers_by_question_id = await index_answers_by_question_id(
+        answers=await question_service.get_answers_for_questions(
+            question_ids=[question.id for question in questions]
+        )
+    )
 
     # ---------- Canvas Specific Code -----------------
     canvas_course_service = CanvasCourseService(
@@ -276,45 +462,41 @@ async def generate_personalized_quiz_for_all_students(
     logger.info(f"{student_ids}")
     # ---------- End of Canvas Specific Code -----------------
 
-    for student in student_ids:
-        logger.info(f"Quiz creation for {student} in progress...")
-        # TODO: Replace with student service DB Extraction.
-        student_knowledge_state = {}
-
-        personalization_service = QuestionPersonalizationService(
-            knowledge_state=KnowledgeStateParameters(
-                concept_list=concepts_to_be_tested,
-                student_knowledge_state=student_knowledge_state,
-                sme_concept_wise_importance=quiz_params.sme_input,
-                sme_opinion_importance_factor=quiz_params.sme_importance
-            ),
-            questions=questions
-        )
+    # Every student's quiz is sampled together from a students x concepts knowledge matrix.
+    student_knowledge_matrix = await student_service.get_students_knowledge_matrix(
+        canvas_ids=[hash_string_using_sha256(str(student)) for student in student_ids],
+        concept_list=concepts_to_be_tested
+    )
+    personalization_service = QuestionPersonalizationService(
+        knowledge_state=KnowledgeStateParameters(
+            concept_list=concepts_to_be_tested,
+            student_knowledge_state={},
+            sme_concept_wise_importance=quiz_params.sme_input or {},
+            sme_opinion_importance_factor=quiz_params.sme_importance
+        ),
+        questions=questions
+    )
+    personalized_quizzes = await personalization_service.get_personalized_quizzes(
+        student_knowledge_matrix=student_knowledge_matrix,
+        n_questions=quiz_params.n_questions
+    )
 
-        personalized_questions = await personalization_service.get_personalized_questions(
-            n_questions=quiz_params.n_questions
-        )
-        personalized_answers = await question_service.get_answers_for_questions(
-            question_ids=[question.id for question in personalized_questions]
-        )
-        personalized_question_answers_object = await map_answers_to_questions(
+    quizzes = {}
+    for student, personalized_questions in zip(student_ids, personalized_quizzes):
+        quizzes[student] = await map_answers_to_questions(
             questions=personalized_questions,
-            answers=personalized_answers
+            answers_by_question_id=answers_by_question_id
         )
 
-        # ---------- Canvas Specific Code -----------------
-        quiz = await canvas_course_service.create_personalized_practice_quiz(
-            student_id=student,
-            module_id=quiz_params.module_id,
-            type_of_quiz=quiz_params.quiz_type
-        )
-        for question_answer_object in personalized_question_answers_object:
-            await canvas_course_service.add_question_to_quiz(
-                quiz=quiz,
-                question=question_answer_object
-            )
-        # ---------- End of Canvas Specific Code -----------------
-        logger.info(f"Quiz creation for {student} completed.")
+    # ---------- Canvas Specific Code -----------------
+    publish_results = await canvas_course_service.publish_personalized_quizzes(
+        quizzes=quizzes,
+        module_id=quiz_params.module_id,
+        type_of_quiz=quiz_params.quiz_type
+    )
+    # ---------- End of Canvas Specific Code -----------------
+
+    return {result.student_id: result.dict() for result in publish_results}
 
 
 @router.post("/quiz", name="qas:create-quiz")
@@ -424,13 +606,21 @@ async def get_personalized_question(
     # Get student knowledge
     # TODO: Ask the team if we can store this in session data.
     if not session_data.knowledge_state:
-        student_knowledge_state = {}
-        for concept in concepts_to_be_tested:
-            c_to_k = await student_service.get_student_knowledge_score(
-                student_id=session_info.get('user_id'),
-                concept_name=concept
+        student = await student_service.get_student(
+            canvas_id=hash_string_using_sha256(session_info.get('user_id'))
+        )
+        if student:
+            # A single slice of the course's cached knowledge matrix rather than a query per concept
+            knowledge_vector = await student_service.get_student_knowledge_vector(
+                course_id=question_params.course_id,
+                student_id=student.id,
+                concept_list=concepts_to_be_tested
+            )
+            student_knowledge_state = dict(
+                zip(concepts_to_be_tested, np.nan_to_num(knowledge_vector, nan=0.5).tolist())
             )
-            student_knowledge_state[concept] = 0.5 if not c_to_k else c_to_k
+        else:
+            student_knowledge_state = {concept: 0.5 for concept in concepts_to_be_tested}
 
         session_data = await session_cache.set(
             cache_id=session_data.session_id,
@@ -480,6 +670,7 @@ async def get_personalized_question(
 async def get_concept_list(
         module_id: int,
         quiz_type: Literal['prereq', 'preview', 'review'],
+        hops: int = Query(1, ge=1),
         concept_service = Depends(ConceptService)
 ) -> List:
     # TODO: Build a switch case for different quiz types.
@@ -494,7 +685,8 @@ async def get_concept_list(
         )
 
     concepts_json_results = await concept_service.get_all_prereqs_of_module(
-        module_id
+        module_id,
+        hops=hops
     )
     return await extract_concept_names_from_concept_bulk_read(
         concepts_object=concepts_json_results
@@ -565,8 +757,8 @@ async def on_submit(
             course_id=session_info.get('course_id')
         )
 
-    # Create a trigger event entry in the DB.
-    await trigger_event_service.add_event(
+    # Queue a trigger event entry for the DB.
+    await trigger_event_service.queue_event(
         event = TriggerEventCreate(
             datetime_stamp=datetime.datetime.now(),
             student_id=student.id,
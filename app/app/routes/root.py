@@ -1,11 +1,14 @@
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Request, Response, Depends, Form
+from fastapi.responses import PlainTextResponse
 from fastapi.templating import Jinja2Templates
 
 from app.domain.models.errors import ErrorResponse
 from app.config.environment import get_settings
+from app.infrastructure.database.db import get_pool_metrics
+from app.infrastructure.LLM.telemetry import LLMTelemetry
 
 from fastapi_lti1p3 import enforce_auth, LTI
 
@@ -56,6 +59,17 @@ async def lti_launch(
     return response
 
 
+@router.get("/health/db-pool")
+async def db_pool_metrics() -> List[Dict[str, Any]]:
+    """
+    Connection pool usage of each event loop's engine, used to size DATABASE_POOL_SIZE and DATABASE_POOL_MAX_OVERFLOW
+    """
+    return get_pool_metrics()
 
 
-
+@router.get("/health/llm", response_class=PlainTextResponse)
+async def llm_metrics() -> str:
+    """
+    LLM call counts, tokens, latency, queue wait and validator runs per action and model, in the Prometheus text format
+    """
+    return LLMTelemetry().render()
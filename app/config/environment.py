@@ -1,7 +1,8 @@
 from functools import lru_cache
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
-from pydantic import Field, ConfigDict
+from pydantic import AliasChoices, Field, ConfigDict
 from pydantic_settings import BaseSettings
 
 
@@ -27,6 +28,112 @@ class Settings(BaseSettings):
 
     TRITON_API_KEY: str
 
+    # Database connection pool, applied to each event loop's engine
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_POOL_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30.0
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+
+    # Trigger event worker
+    TRIGGER_EVENT_NOTIFY_CHANNEL: str = "triggerevent_queue"
+    TRIGGER_EVENT_LISTEN: bool = True
+    TRIGGER_EVENT_MIN_IDLE_SECONDS: float = 1.0
+    TRIGGER_EVENT_MAX_IDLE_SECONDS: float = 60.0
+    TRIGGER_EVENT_WORKER_COUNT: int = 1
+    TRIGGER_EVENT_BATCH_SIZE: int = 100
+    TRIGGER_EVENT_PARTITIONS: int = 16
+
+    # Write-behind buffer for submitted trigger events
+    TRIGGER_EVENT_BUFFER: bool = False
+    TRIGGER_EVENT_BUFFER_FLUSH_MS: int = 200
+    TRIGGER_EVENT_BUFFER_MAX_EVENTS: int = 500
+    TRIGGER_EVENT_BUFFER_CAPACITY: int = 10000
+
+    # Per-course student knowledge matrix used for personalization
+    KNOWLEDGE_MATRIX_TTL_SECONDS: float = 300.0
+
+    # In memory index of the concept prerequisite junctions, when disabled prerequisite chains are walked with recursive queries instead
+    CONCEPT_GRAPH_IN_MEMORY: bool = True
+    CONCEPT_GRAPH_TTL_SECONDS: float = 300.0
+    # Deepest prerequisite chain followed by the recursive closure queries
+    CONCEPT_CLOSURE_MAX_DEPTH: int = 16
+
+    # Question bank read cache, questions and their answers grouped by concept
+    QUESTION_BANK_TTL_SECONDS: float = 600.0
+    QUESTION_BANK_MAX_QUESTIONS: int = 20000
+
+    # LTI session cache, 'memory' keeps sessions per process, 'redis' shares them between replicas under SSO_REDIS_SESSION_PREFIX
+    SESSION_CACHE_BACKEND: str = "memory"
+    SESSION_CACHE_REDIS_URL: Optional[str] = Field(default=None, validation_alias=AliasChoices("SESSION_CACHE_REDIS_URL", "REDIS_URL"))
+    SESSION_TTL_SECONDS: int = 8 * 3600
+    NONCE_TTL_SECONDS: int = 600
+    # Only bounds the memory backend, redis evicts by TTL alone
+    SESSION_CACHE_MAX_ENTRIES: int = 10000
+
+    # Prompt template cache, invalidated through a NOTIFY whenever a prompt is created or updated
+    PROMPT_NOTIFY_CHANNEL: str = "prompt_changes"
+    PROMPT_LISTEN: bool = True
+
+    # Background jobs for long running QAS operations
+    JOB_NOTIFY_CHANNEL: str = "job_queue"
+    JOB_LISTEN: bool = True
+    JOB_WORKER_COUNT: int = 2
+    JOB_MIN_IDLE_SECONDS: float = 1.0
+    JOB_MAX_IDLE_SECONDS: float = 30.0
+    JOB_HEARTBEAT_SECONDS: float = 15.0
+    # A running job whose heartbeat is older than this is considered abandoned by a crashed worker and reclaimed
+    JOB_STALE_SECONDS: float = 120.0
+    JOB_MAX_ATTEMPTS: int = 3
+
+    # PDF text extraction, 0 workers uses one process per CPU
+    PDF_EXTRACTION_WORKERS: int = 0
+    PDF_PAGES_PER_TASK: int = 25
+
+    # Content addressed cache of extracted document text and validated LLM outputs
+    CONTENT_CACHE_ENABLED: bool = True
+    CONTENT_CACHE_TTL_SECONDS: float = 30 * 24 * 3600.0
+    CONTENT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Pruning runs once every this many writes
+    CONTENT_CACHE_PRUNE_EVERY: int = 50
+    # Actions whose outputs are cached, 'questions' is left out so regenerating a quiz yields new questions
+    CONTENT_CACHE_LLM_ACTIONS: List[str] = ["summarize", "domain-concepts", "module-concepts", "module-concepts-alone"]
+
+    # Canvas API client, CANVAS_API_URL can point at a local fake Canvas server for testing
+    CANVAS_API_URL: str = "https://canvas.ucsd.edu/"
+    CANVAS_MAX_CONCURRENCY: int = 8
+    CANVAS_MAX_RETRIES: int = 5
+    CANVAS_BACKOFF_BASE_SECONDS: float = 1.0
+    CANVAS_BACKOFF_MAX_SECONDS: float = 30.0
+    # Requests are held back while the X-Rate-Limit-Remaining bucket is below this value
+    CANVAS_RATE_LIMIT_LOW_WATER: float = 100.0
+
+    # LLM provider clients, kept alive per event loop. The URLs can point at a local OpenAI compatible mock server for testing
+    OPENAI_API_URL: str = "https://api.openai.com/v1"
+    LLAMA_API_URL: str = "https://traip13.dsmlp.ucsd.edu/v1/chat/completions"
+    # Per provider limit on in flight calls, also the size of its connection pool
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 120.0
+    LLM_KEEPALIVE_SECONDS: float = 60.0
+    LLM_MAX_RETRIES: int = 2
+
+    # Materials larger than a provider's chunk budget are summarized map-reduce style, chunk by chunk
+    LLM_CHUNK_TOKENS: Dict[str, int] = {"openai": 12000, "gemini": 30000, "llama": 3000}
+    LLM_CHUNK_OVERLAP_TOKENS: int = 200
+    # Per action limit on chunks being sent at once, on top of LLM_MAX_CONCURRENCY
+    LLM_MAP_CONCURRENCY: int = 4
+
+    # Share of LLM prompts and responses logged, each cut to LLM_LOG_MAX_CHARS
+    LLM_LOG_SAMPLE_RATE: float = 0.01
+    LLM_LOG_MAX_CHARS: int = 2000
+    # USD per million prompt and response tokens by model, models without an entry are reported at no cost
+    LLM_TOKEN_PRICES: Dict[str, Dict[str, float]] = {
+        "gpt-4o": {"prompt": 5.0, "response": 15.0},
+        "gpt-3.5-turbo": {"prompt": 0.5, "response": 1.5},
+        "gemini-1.5-pro-latest": {"prompt": 3.5, "response": 10.5},
+    }
+
     # TODO: Remove this temporary field after LastPass is integrated
     SECRET_HASH_KEY: str
     
@@ -71,6 +71,10 @@ class ConceptToConceptRead(ConceptToConceptBase):
 class ConceptToConceptDelete(ConceptToConceptBase):
     pass
 
+class ConceptToConceptClosureRead(ConceptToConceptBase):
+    # No of junctions between the junction and the concepts the closure started from, 1 for their own junctions
+    depth: int
+
 class ConceptToDomainBase(SQLModel):
     concept_name: str = Field(foreign_key="concept.name", primary_key=True)
     domain_id: int = Field(foreign_key="domain.domain_id", primary_key=True)
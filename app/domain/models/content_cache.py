@@ -0,0 +1,18 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import Field, SQLModel, Column
+from sqlalchemy import LargeBinary
+
+
+class ContentCacheEntry(SQLModel, table=True):
+    """
+    Content addressed cache entry, the key is derived from a SHA-256 of the inputs that produced the value.
+    """
+    key: str = Field(primary_key=True)
+    # 'text' for extracted document text, 'llm' for validated LLM outputs
+    kind: str = Field(index=True)
+    value: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    size_bytes: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    accessed_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    hits: Optional[int] = Field(default=0)
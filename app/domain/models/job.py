@@ -0,0 +1,81 @@
+from typing import Optional, Dict, Any, Literal
+from datetime import datetime
+from sqlmodel import Field, SQLModel, Column, Integer, String
+from sqlalchemy import ForeignKey, LargeBinary
+from sqlalchemy.dialects.postgresql import JSON
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class JobBase(SQLModel):
+    operation: str
+    # Requests retried with the same key get the existing job instead of enqueueing the work again
+    idempotency_key: Optional[str] = Field(default=None, sa_column=Column(String, unique=True, nullable=True))
+    max_attempts: int = Field(default=3, ge=1)
+
+
+class Job(JobBase, table=True):
+    job_id: Optional[int] = Field(default=None, primary_key=True)
+    payload: Dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    # Encrypted credentials the operation needs, e.g. a Canvas access token, kept out of payload and cleared once the job finishes
+    secrets: Optional[str] = None
+    # sub claim of the LTI session that queued the job, only that user can read it back
+    owner: Optional[str] = Field(default=None, index=True)
+    status: str = Field(default="queued", index=True)
+    result: Optional[Any] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    error: Optional[str] = None
+    attempts: int = Field(default=0)
+    worker: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Refreshed by the worker while the job runs, a running job with a stale heartbeat is reclaimed
+    heartbeat_at: Optional[datetime] = None
+
+
+class JobCreate(JobBase):
+    payload: Dict[str, Any] = {}
+    secrets: Optional[str] = None
+    owner: Optional[str] = None
+
+
+class JobRead(JobBase):
+    job_id: int
+    status: JobStatus
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    # Time spent waiting for a worker and running, filled in by from_job
+    queued_seconds: Optional[float] = None
+    run_seconds: Optional[float] = None
+
+    @classmethod
+    def from_job(cls, job: Job) -> "JobRead":
+        read = cls.from_orm(job)
+        if job.started_at is not None:
+            read.queued_seconds = (job.started_at - job.created_at).total_seconds()
+            if job.finished_at is not None:
+                read.run_seconds = (job.finished_at - job.started_at).total_seconds()
+        return read
+
+
+class JobRun(JobRead):
+    """
+    A claimed job as handed to its operation, secrets is still encrypted
+    """
+    payload: Dict[str, Any] = {}
+    secrets: Optional[str] = None
+
+
+class JobFile(SQLModel, table=True):
+    # Uploaded files of a job, kept so a worker in any replica can run it
+    file_id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: int = Field(sa_column=Column(Integer, ForeignKey("job.job_id", ondelete="CASCADE"), index=True, nullable=False))
+    filename: str
+    content_type: Optional[str] = None
+    content: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
@@ -27,6 +27,16 @@ class Validator(BaseModel):
     error_response: Optional[str] = None
     status: str = "FAIL"
     function: Callable
+    # Names of the validators that must pass before this one runs. None depends on the validators of the next lower order
+    depends_on: Optional[List[str]] = None
+    # Called when the validator fails, e.g. to re-ask the LLM for just the broken items instead of regenerating the response
+    repair: Optional[Callable] = None
+    # Items an item level validator dropped from the response, left for its repair function
+    failed_items: List[Any] = []
+
+    @property
+    def name(self) -> str:
+        return self.function.__name__
 
     def __str__(self):
         return f"Validator #{self.order}: {self.function.__name__} | Error: {self.error_response}"
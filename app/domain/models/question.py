@@ -1,6 +1,7 @@
 from datetime import date
 from typing import Annotated, List, Literal, Optional
 
+from sqlalchemy import DDL, event
 from sqlmodel import ARRAY, Column, Field, Integer, SQLModel
 
 
@@ -16,7 +17,7 @@ class AnswerBaseExtended(AnswerBase):
     question_id: Optional[int] = Field(default=None, foreign_key="question.id")
 
 class Answer(AnswerBaseExtended, table=True):
-    pass
+    question_id: Optional[int] = Field(default=None, foreign_key="question.id", index=True)
 
 class QuestionBase(SQLModel):
     # TODO: Add a foreign key relation from the concept name.
@@ -33,7 +34,8 @@ class QuestionBase(SQLModel):
     neutral_comments: str
 
 class Question(QuestionBase, table=True):
-    pass
+    # Questions are looked up by the concept they test
+    question_name: str = Field(index=True)
 
 class QuestionCreate(QuestionBase):
     pass
@@ -59,3 +61,14 @@ class QuestionAnswerInput(SQLModel):
 class QuestionAnswerSelection(SQLModel):
     question: Question
     answers: List[AnswerRead]
+
+
+# create_all only indexes new tables, existing databases get the indexes of the question bank lookups here
+_QUESTION_BANK_INDEX_DDL = DDL(
+    """
+    CREATE INDEX IF NOT EXISTS ix_question_question_name ON question (question_name);
+    CREATE INDEX IF NOT EXISTS ix_answer_question_id ON answer (question_id);
+    """
+)
+
+event.listen(SQLModel.metadata, "after_create", _QUESTION_BANK_INDEX_DDL.execute_if(dialect="postgresql"))
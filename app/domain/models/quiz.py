@@ -31,3 +31,13 @@ class QuizResultBase(SQLModel):
 
 class QuizResult(QuizResultBase, table=True):
     pass
+
+
+class CanvasQuizPublishResult(SQLModel):
+    # Outcome of publishing one student's personalized quiz to Canvas
+    student_id: int
+    canvas_quiz_id: Optional[int] = None
+    question_ids: List[int] = []
+    n_published: int = 0
+    status: Literal["published", "partial", "failed"]
+    error: Optional[str] = None
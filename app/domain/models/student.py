@@ -58,6 +58,14 @@ class StudentKnowledgeRead(StudentKnowledgeBase):
 class StudentKnowledgeCreate(StudentKnowledgeBase):
     pass
 
+class StudentKnowledgeScore(SQLModel):
+    # StudentKnowledge without the change history, used for bulk reads
+    student_id: int
+    concept_name: str
+    numerator: float
+    denominator: float
+    score: float
+
 
 def update_change_history(mapper, connection, target):
     if target.change_history is None:
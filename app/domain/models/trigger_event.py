@@ -1,6 +1,7 @@
 from typing import Optional, List, Annotated, Literal
 from datetime import datetime
 from sqlmodel import Field, SQLModel, Column, ARRAY, Integer
+from sqlalchemy import DDL, event
 
 class TriggerEventBase(SQLModel):
     datetime_stamp: datetime
@@ -23,4 +24,94 @@ class TriggerEventProcess(SQLModel):
     concept: str = Field(foreign_key="concept.name")
     student_id: int = Field(foreign_key="student.student_id")
     numerator: float
-    denominator: float
\ No newline at end of file
+    denominator: float
+
+class TriggerEventAccumulator(SQLModel, table=True):
+    """
+    Running per (student_id, concept) sums of the pending Trigger Events, maintained by the database triggers defined below
+    so the worker reads already reduced rows instead of aggregating the whole triggerevent table.
+    """
+    student_id: int = Field(foreign_key="student.student_id", primary_key=True)
+    concept: str = Field(foreign_key="concept.name", primary_key=True)
+    numerator: float
+    denominator: float
+    event_ids: List[int] = Field(sa_column=Column("event_ids", ARRAY(Integer), nullable=False))
+
+
+# Statement level triggers on triggerevent, inserts are folded into the accumulator with an ON CONFLICT upsert,
+# deletes (events consumed by the worker) are subtracted and emptied rows removed.
+# Runs on every create_all so existing databases pick it up. The functions are replaced in place, the triggers are only
+# created (and the accumulator rebuilt from the pending events) when they are missing, so a restart takes no table lock.
+# See the README for the supported Postgres versions.
+_ACCUMULATOR_DDL = DDL(
+    """
+    CREATE OR REPLACE FUNCTION triggereventaccumulator_add() RETURNS trigger AS $body$
+    BEGIN
+        INSERT INTO triggereventaccumulator(student_id, concept, numerator, denominator, event_ids)
+        SELECT student_id, concept, SUM(weight * value), SUM(weight), array_agg(event_id)
+        FROM inserted_events
+        GROUP BY student_id, concept
+        ON CONFLICT (student_id, concept) DO UPDATE SET
+            numerator = triggereventaccumulator.numerator + EXCLUDED.numerator,
+            denominator = triggereventaccumulator.denominator + EXCLUDED.denominator,
+            event_ids = triggereventaccumulator.event_ids || EXCLUDED.event_ids;
+        RETURN NULL;
+    END
+    $body$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION triggereventaccumulator_release() RETURNS trigger AS $body$
+    BEGIN
+        UPDATE triggereventaccumulator a
+        SET numerator = a.numerator - d.numerator,
+            denominator = a.denominator - d.denominator,
+            event_ids = ARRAY(SELECT unnest(a.event_ids) EXCEPT SELECT unnest(d.event_ids))
+        FROM (
+            SELECT student_id, concept, SUM(weight * value) numerator, SUM(weight) denominator, array_agg(event_id) event_ids
+            FROM deleted_events
+            GROUP BY student_id, concept
+        ) d
+        WHERE a.student_id = d.student_id AND a.concept = d.concept;
+
+        DELETE FROM triggereventaccumulator a
+        USING (SELECT DISTINCT student_id, concept FROM deleted_events) d
+        WHERE a.student_id = d.student_id AND a.concept = d.concept AND cardinality(a.event_ids) = 0;
+        RETURN NULL;
+    END
+    $body$ LANGUAGE plpgsql;
+
+    DO $install$
+    BEGIN
+        -- Serializes replicas starting together, released at commit
+        PERFORM pg_advisory_xact_lock(hashtext('triggereventaccumulator'));
+
+        IF EXISTS (
+            SELECT 1 FROM pg_trigger
+            WHERE tgrelid = 'triggerevent'::regclass AND tgname = 'triggerevent_accumulate'
+        ) THEN
+            RETURN;
+        END IF;
+
+        DROP TRIGGER IF EXISTS triggerevent_release ON triggerevent;
+
+        CREATE TRIGGER triggerevent_accumulate
+        AFTER INSERT ON triggerevent
+        REFERENCING NEW TABLE AS inserted_events
+        FOR EACH STATEMENT EXECUTE FUNCTION triggereventaccumulator_add();
+
+        CREATE TRIGGER triggerevent_release
+        AFTER DELETE ON triggerevent
+        REFERENCING OLD TABLE AS deleted_events
+        FOR EACH STATEMENT EXECUTE FUNCTION triggereventaccumulator_release();
+
+        -- CREATE TRIGGER holds triggerevent until commit, so no event can slip in between the triggers and the backfill
+        DELETE FROM triggereventaccumulator;
+        INSERT INTO triggereventaccumulator(student_id, concept, numerator, denominator, event_ids)
+        SELECT student_id, concept, SUM(weight * value), SUM(weight), array_agg(event_id)
+        FROM triggerevent
+        GROUP BY student_id, concept;
+    END
+    $install$;
+    """
+)
+
+event.listen(SQLModel.metadata, "after_create", _ACCUMULATOR_DDL.execute_if(dialect="postgresql"))
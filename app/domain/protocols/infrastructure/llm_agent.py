@@ -1,4 +1,4 @@
-from typing import Optional, Protocol, List, Dict, Union
+from typing import Any, AsyncIterator, Optional, Protocol, List, Dict, Tuple, Union
 from app.domain.models.llm_agent import ContextCollection, action_options, ContingencyFunctions
 from fastapi import UploadFile, Depends
 
@@ -12,6 +12,12 @@ class LLMAgent(Protocol):
     def process_files(self, content_files) -> Union[List[str], None]:
         ...
 
+    async def aprocess_files(self, content_files) -> Union[List[str], None]:
+        """
+        Extracts the text of the PDF files without blocking the event loop, pages are extracted across a process pool
+        """
+        ...
+
     async def runContingencies(
         self, 
         response: str ,
@@ -19,18 +25,19 @@ class LLMAgent(Protocol):
         action: action_options, 
         contingency_functions: ContingencyFunctions,
         params: Dict, 
-        add_cycles: int
+        add_cycles: int,
+        reask=None
     ):
         """
         A Contingency System for validating and reformating the output of the LLM using a dictionary of callback functions called "Contingency Functions". 
 
         The system Operates in two stages: 
-        - First it iterates over 'validator' functions to verify some aspect of the llm response and returns a PASS/FAIL status and a response which is passed to subsequent contingency functions.
-        - Finally it runs a 'formatter' function which uses the result of the validation loop to either return the LLM response in its final data structure or an ErrorResponse.
+        - First it runs the 'validator' functions, once each in dependency order, to verify some aspect of the llm response. Each returns a PASS/FAIL status and a response which is passed to subsequent contingency functions.
+        - Finally it runs a 'formatter' function which uses the result of the validation pass to either return the LLM response in its final data structure or an ErrorResponse.
 
         Contingency Functions are grouped into two types: 
-            - Validators - Callback functions ran within the Validation Loop in ascending order to validate and preprocess the LLM response. 
-            - Formatter -  Callback fucking executed after the Validation Loop, returns the final response.
+            - Validators - Callback functions ran within the Validation Pass in dependency order to validate and preprocess the LLM response. 
+            - Formatter -  Callback fucking executed after the Validation Pass, returns the final response.
 
         
         :param response: The string response of the LLM
@@ -38,18 +45,24 @@ class LLMAgent(Protocol):
         :param action: The action which the LLM Agent performed
         :param contingency_functions: A ContingencyFunctions object containing the 'validator' and 'formatter' functions being executed.
         :param params: A dictionary of optional parameters used to pass any extra data to functions
-        :param add_cycles: An integer which increases the number of validation loops the contingency system will run. Always runs at least two loops, any integer passed adds extra loops.
+        :param add_cycles: An integer which increases the number of times a failed validator without a repair function is re-run on its own output. Always re-runs at least once.
+        :param reask: Optional callable sending a follow up instruction to the LLM with the original prompt as context, passed to repair functions.
 
         
         ---
-        Validation Loop
+        Validation Pass
         ---
 
-        The system first iterates over all 'Validation' functions, these functions are iterated over at least twice. 
-        All functions start out marked as "FAIL" and the loop always executes every failed 'Validator' function in ascending order,
-        if a function passes its marked as a "PASS" and will not be reran in future loops. 
+        Validators declare the validators they depend on by name in 'depends_on', those without it depend on the validators of the next lower 'order'.
+        Every validator runs once after its dependencies, validators whose dependencies failed are skipped and stay marked as "FAIL".
         The response output of every 'validator' function is reassigned to the response variable passed into subsequent functions, propagating any mutations made to the response. 
 
+        A failed validator gets one targeted attempt at recovering:
+            - If it has a 'repair' function and a reask callable was given, the repair function is called, e.g. to re-ask the LLM for just the broken items.
+            - Otherwise it is re-run on the response it returned, completing validators that fix the response as they fail.
+
+        The work done is kept in self.validation_report, next to what the previous validation loop and a full regeneration would have cost.
+
         
         ---
         Validator Functions:
@@ -114,4 +127,21 @@ class LLMAgent(Protocol):
             - Executes ActionExecutor.execute() to construct the final prompt and send it to an LLM.
             - Executes self.runContingencies() to validate, format and ultimately return the LLM response in the desired format.
         """
-        ...
\ No newline at end of file
+        ...
+
+    async def stream(
+        self,
+        action: action_options,
+        contingency_functions: ContingencyFunctions,
+        params: Optional[dict]=None,
+        item_key: str="questions",
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming counterpart of execute for actions whose response is a list of items under item_key, e.g. 'questions'.
+        The LLM response is parsed incrementally and every item runs through the contingency system on its own as soon as it is complete.
+        Yields:
+            - ('item', formatted_item) for each item that passed the contingency system, in order.
+            - ('error', message) for each rejected item.
+            - ('done', no_of_items) once the response is complete.
+        """
+        ...
@@ -1,4 +1,4 @@
-from typing import List, Protocol, Literal, Union
+from typing import List, Protocol, Literal, Union, Optional
 
 from app.domain.models.concept import (
     ConceptCreate, 
@@ -15,6 +15,7 @@ from app.domain.models.concept import (
     ConceptReadVerbose,
     ConceptToModuleDelete,
     ConceptToConceptDelete,
+    ConceptToConceptClosureRead,
     ConceptReadPreformatted
     )
 
@@ -124,6 +125,29 @@ class ConceptToConceptRepository(Protocol):
         """
         ...
 
+    async def get_all(self) -> List[ConceptToConceptRead]:
+        """
+        Returns every ConceptToConcept junction, used to load the ConceptGraph
+        """
+        ...
+
+    async def get_closure(
+            self,
+            concepts: Optional[ConceptBulkRead] = None,
+            module_id: Optional[int] = None,
+            junction_direction: Literal["up", "down"] = "down",
+            max_depth: Optional[int] = None
+    ) -> List[ConceptToConceptClosureRead]:
+        """
+        Returns every junction reachable from the supplied concepts, or the concepts of a module, with a single recursive query.
+        Each junction is returned once, at the depth it is first reached.
+
+        :param junction_direction: ('up', 'down') 'down' follows the prerequisites of the concepts, 'up' their dependents.
+
+        :param max_depth: Longest chain of junctions followed, CONCEPT_CLOSURE_MAX_DEPTH if None.
+        """
+        ...
+
     async def delete(self, junctions: List[ConceptToConceptDelete]):
         """
         Deletes one or many ConceptToConcept junctions
@@ -0,0 +1,22 @@
+from typing import Optional, Protocol
+
+
+class ContentCacheRepository(Protocol):
+    async def get(self, key: str, ttl: float) -> Optional[bytes]:
+        """
+        Returns the value of the entry and marks it as recently used, None if missing or older than ttl seconds
+        """
+        pass
+
+    async def put(self, key: str, kind: str, value: bytes) -> None:
+        """
+        Adds or replaces an entry
+        """
+        pass
+
+    async def prune(self, max_bytes: int, ttl: float) -> int:
+        """
+        Removes the entries older than ttl seconds, then the least recently used ones until the total size is under max_bytes.
+        Returns the number of entries removed
+        """
+        pass
@@ -0,0 +1,49 @@
+from typing import Any, List, Optional, Protocol, Tuple
+
+from app.domain.models.job import JobCreate, JobRead, JobRun, JobFile
+
+
+class JobRepository(Protocol):
+    async def add(self, job: JobCreate, files: List[JobFile]) -> Tuple[JobRead, bool]:
+        """
+        Adds a new queued job with its uploaded files and wakes the workers.
+        If a job with the same idempotency_key exists it is returned instead, the bool is True only when a job was created
+        """
+        pass
+
+    async def get(self, job_id: int, owner: str) -> Optional[JobRead]:
+        """
+        Returns the job if it was queued by owner, None otherwise so other users cannot tell it exists
+        """
+        pass
+
+    async def get_files(self, job_id: int) -> List[JobFile]:
+        """
+        Returns the uploaded files of a job
+        """
+        pass
+
+    async def claim(self, worker: str, stale_after: float) -> Optional[JobRun]:
+        """
+        Leases the oldest queued job, or a running job whose heartbeat is older than stale_after seconds, to the worker.
+        Concurrent workers skip each other's rows, returns None when there is nothing to run
+        """
+        pass
+
+    async def heartbeat(self, job_id: int, worker: str) -> bool:
+        """
+        Refreshes the heartbeat of a job leased to the worker, returns False if the lease was lost
+        """
+        pass
+
+    async def complete(self, job_id: int, worker: str, result: Any) -> None:
+        """
+        Marks a job leased to the worker as succeeded, stores its result and clears its secrets
+        """
+        pass
+
+    async def fail(self, job_id: int, worker: str, error: str, retry: bool) -> None:
+        """
+        Records the error of a job leased to the worker, requeues it while retry is True and attempts remain, marks it failed otherwise
+        """
+        pass
@@ -1,11 +1,14 @@
-from typing import List, Protocol, Literal, Union
+from typing import List, Optional, Protocol, Literal, Union
 from app.domain.models.question import (QuestionCreate, QuestionRead, AnswerCreate, AnswerRead,
-                                        Question)
+                                        Question, QuestionAnswerSelection)
 
 class QuestionRepository(Protocol):
     async def add(self, question: QuestionCreate) -> QuestionRead:
         ...
 
+    async def bulk_add(self, questions: List[QuestionCreate]) -> List[QuestionRead]:
+        ...
+
     async def get_one_by_id(self, id: int) -> Question:
         ...
 
@@ -15,10 +18,19 @@ class QuestionRepository(Protocol):
     async def get_all_by_concept(self, concept_list: List) -> List[QuestionRead]:
         ...
 
+    async def get_with_answers(self, concept_list: Optional[List] = None, id_list: Optional[List] = None) -> List[QuestionAnswerSelection]:
+        ...
+
+    async def delete(self, id: int) -> None:
+        ...
+
 class AnswerRepository(Protocol):
     async def add(self, answer: AnswerCreate) -> AnswerRead:
         ...
 
+    async def bulk_add(self, answers: List[AnswerCreate]) -> List[AnswerRead]:
+        ...
+
     async def get_answer_for_question_id(self, id: int) -> List[AnswerRead]:
         ...
 
@@ -4,6 +4,7 @@ from app.domain.models.student import (
     StudentRead, 
     StudentKnowledgeCreate, 
     StudentKnowledgeRead, 
+    StudentKnowledgeScore,
     StudentToCourseCreate, 
     StudentToCourseRead, 
     )
@@ -19,6 +20,12 @@ class StudentRepository(Protocol):
     async def get(self, canvas_id: str) -> StudentRead:
         ...
 
+    async def bulk_get(self, canvas_ids: List[str]) -> List[StudentRead]:
+        """
+        Returns the students matching any of the canvas_ids, in one query. Unknown canvas_ids are left out
+        """
+        pass
+
 
 class StudentToCourseRepository(Protocol):
     async def add(self, junction: StudentToCourseCreate) -> StudentToCourseRead:
@@ -48,4 +55,22 @@ class StudentKnowledgeRepository(Protocol):
         """
         Updates the concept_score of an existing StudentKnowledge entry matching the student_id and concept_name provided in the StudentKnowledgeCreate object
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def get_all_for_course(self, course_id: int) -> List[StudentKnowledgeScore]:
+        """
+        Returns the scores of every StudentKnowledge entry belonging to a student enrolled in the course, in one query
+        """
+        pass
+
+    async def get_all_for_student(self, student_id: int) -> List[StudentKnowledgeScore]:
+        """
+        Returns the scores of every StudentKnowledge entry of a single student
+        """
+        pass
+
+    async def get_all_for_students(self, student_ids: List[int], concept_list: List[str]) -> List[StudentKnowledgeScore]:
+        """
+        Returns the scores of the StudentKnowledge entries of the students for the concepts in concept_list, in one query
+        """
+        pass
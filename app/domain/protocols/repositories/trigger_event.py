@@ -1,6 +1,7 @@
-from typing import List, Protocol
+from typing import List, Optional, Protocol, Tuple
 
 from app.domain.models.trigger_event import TriggerEventCreate, TriggerEventRead, TriggerEventProcess
+from app.domain.models.student import StudentKnowledgeScore
 
 
 
@@ -17,21 +18,63 @@ class TriggerEventRepository(Protocol):
         """
         pass
     
+    async def bulk_insert(self, events: List[TriggerEventCreate]) -> int:
+        """
+        Adds multiple Trigger Events to the queue with a single multi-row INSERT, without reading the rows back
+        Returns the number of events inserted
+        """
+        pass
+
     async def queue_check(self) -> bool:
         """
-        Checks if data is in the TriggerEvent table
+        Checks if any Trigger Events are pending in the TriggerEventAccumulator table
         Returns True if table has data else returns false
         """
         pass
 
     async def get_queue(self, max_batch_size:int) -> List[TriggerEventProcess]:
         """
-        Pre-processes data from the queue such that rows with matching pairs of concept and student_id values
-        are grouped together, and the weights and values of these groups are aggregated and calculated as the numerator and denominator of the weighted average equation.
+        Reads the queue from the TriggerEventAccumulator table, where rows with matching pairs of concept and student_id values
+        are already grouped together on insert, and the weights and values of these groups are aggregated as the numerator and denominator of the weighted average equation.
         Returns the numerator, denominator, student_id, concept, and list of event_ids for each of these groups up to max_batch_size.
         """
         pass
     
+    async def claim_queue(self, max_batch_size: int, partition_count: int, start_partition: int = 0) -> List[TriggerEventProcess]:
+        """
+        Leases up to max_batch_size accumulated groups from the first unclaimed partition (student_id mod partition_count), starting at start_partition,
+        and returns them like get_queue.
+        The partition is held with a transaction level advisory lock and its rows with FOR UPDATE SKIP LOCKED,
+        both are released when fold_batch commits, so concurrent workers across processes never fold the same events.
+        Returns an empty list if every partition is empty or claimed by another worker.
+        """
+        pass
+
+    async def fold_batch(self, events: List[TriggerEventProcess], prior_numerator: float, prior_denominator: float) -> Tuple[List[StudentKnowledgeScore], List[TriggerEventProcess]]:
+        """
+        Folds a whole batch of pre-processed groups into the StudentKnowledge table with a single INSERT ... ON CONFLICT upsert,
+        existing entries have the group's numerator and denominator added to them, new entries are seeded with the prior_numerator and prior_denominator.
+        The event_ids of the batch are deleted in the same transaction.
+        Returns the resulting StudentKnowledge scores and no unfolded groups,
+        or no scores and the whole batch if a student_id or concept no longer exists, for the caller to fold row by row.
+        """
+        pass
+
+    async def reclaim(self, event: TriggerEventProcess, partition_count: int) -> Optional[TriggerEventProcess]:
+        """
+        Leases a group again after its claim ended without folding it, for the per-row fallback.
+        Waits for the advisory lock of the group's partition, then locks its events that are still pending with FOR UPDATE SKIP LOCKED.
+        Returns the group narrowed to those events with its numerator and denominator recomputed, or None if another worker folded them.
+        The locks are held until bulk_delete commits or release is called.
+        """
+        pass
+
+    async def release(self) -> None:
+        """
+        Ends the current transaction, releasing any lease still held
+        """
+        pass
+
     async def bulk_delete(self, event_ids: list[int]) -> None:
         """
         Deletes all trigger events where its event_id is in the list of event_ids
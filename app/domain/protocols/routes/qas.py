@@ -18,6 +18,8 @@ class PersonalizedQuizProtocol(BaseModel):
     n_questions: int = Field(default=5, ge=1)
     quiz_type: Literal['prereq', 'preview', 'review']
     due_date: datetime = Field(...)
+    # How many prerequisite junctions to follow from the module's concepts when selecting concepts to test
+    prereq_hops: int = Field(default=1, ge=1)
 
 
 class PersonalizedQuestionProtocol(BaseModel):
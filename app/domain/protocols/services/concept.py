@@ -15,6 +15,7 @@ from app.domain.models.concept import (
     ConceptReadVerbose,
     ConceptToModuleDelete,
     ConceptToConceptDelete,
+    ConceptToConceptClosureRead,
     ConceptReadPreformatted
 )
 
@@ -104,10 +105,12 @@ class ConceptToModuleService(Protocol):
         """
         ...
 
-    async def get_all_prereqs_of_module(self, module_id: int)-> ConceptBulkRead:
+    async def get_all_prereqs_of_module(self, module_id: int, hops: Optional[int] = 1)-> ConceptBulkRead:
         """
         Returns all concepts that are direct prerequisites of concepts within a module but are not contained inside the module 
         AKA concepts that are prerequisite to start a module
+
+        :param hops: How many prerequisite junctions to follow, None follows the whole chain. Ordered by distance from the module.
         """
         ...
 
@@ -135,6 +138,53 @@ class ConceptToConceptService(Protocol):
         """
         ...
 
+    async def get_concept_chain(
+            self, 
+            concepts: ConceptBulkRead, 
+            junction_direction: Literal["up", "down"]="down", 
+            hops: Optional[int] = None
+    ) -> ConceptBulkRead:
+        """
+        Returns the concepts reachable from the supplied concepts within hops, ordered by distance
+
+        :param junction_direction: ('up', 'down') 'down' follows prerequisites, 'up' follows dependents.
+
+        :param hops: How many junctions to follow, None follows the whole chain.
+        """
+        ...
+
+    async def get_concept_closure(
+            self, 
+            concepts: ConceptBulkRead, 
+            junction_direction: Literal["up", "down"]="down", 
+            max_depth: Optional[int] = None
+    ) -> List[ConceptToConceptClosureRead]:
+        """
+        Returns every junction reachable from the supplied concepts, computed by the database in one round trip
+
+        :param junction_direction: ('up', 'down') 'down' follows the prerequisites of the concepts, 'up' their dependents.
+
+        :param max_depth: Longest chain of junctions followed, CONCEPT_CLOSURE_MAX_DEPTH if None.
+        """
+        ...
+
+    async def get_module_closure(
+            self, 
+            module_id: int, 
+            junction_direction: Literal["up", "down"]="down", 
+            max_depth: Optional[int] = None
+    ) -> List[ConceptToConceptClosureRead]:
+        """
+        Returns every junction reachable from the concepts of a module, computed by the database in one round trip
+        """
+        ...
+
+    async def get_learning_order(self, concepts: ConceptBulkRead) -> ConceptBulkRead:
+        """
+        Returns the supplied concepts ordered so each one comes after its prerequisites among them
+        """
+        ...
+
     async def delete_junctions(self, junctions: List[ConceptToConceptDelete]):
         """
         Deletes a ConceptToConcept junction.
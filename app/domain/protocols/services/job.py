@@ -0,0 +1,25 @@
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from fastapi import UploadFile
+
+from app.domain.models.job import JobRead
+
+
+class JobService(Protocol):
+    async def enqueue(
+            self,
+            operation: str,
+            payload: Dict[str, Any],
+            files: Optional[List[UploadFile]] = None,
+            idempotency_key: Optional[str] = None,
+            secrets: Optional[Dict[str, Any]] = None,
+            owner: Optional[str] = None
+    ) -> Tuple[JobRead, bool]:
+        """
+        Queues an operation for the background workers, returns the job and whether it was newly created.
+        secrets are stored encrypted apart from the payload and never returned by the job routes.
+        """
+        pass
+
+    async def get_job(self, job_id: int, owner: str) -> Optional[JobRead]:
+        ...
@@ -1,6 +1,7 @@
 """ This file stores the protocols used for the Personalization Service."""
 from typing import Union, Dict, List, Optional
 
+import numpy as np
 from pydantic import BaseModel, Field
 from loguru import logger
 
@@ -11,6 +12,9 @@ class KnowledgeStateParameters(BaseModel):
     """
     concept_list: List = Field(...)
     student_knowledge_state: Dict = Field(...)
+    # Optional scores aligned with concept_list, e.g. a slice of the course's KnowledgeMatrix, NaN where there is no entry.
+    # Takes precedence over student_knowledge_state when provided.
+    student_knowledge_vector: Optional[np.ndarray] = Field(default=None)
     sme_concept_wise_importance: Dict = Field(default={})
     sme_opinion_importance_factor: float = Field(default=0.0, ge=0.0, le=1.0)
 
@@ -25,9 +29,11 @@ class KnowledgeStateParameters(BaseModel):
     #    concepts over personalization to a certain degree. We should keep this in mind.
     default_filler: Optional[float] = Field(default=0.5)
 
-    @property
-    def combined_knowledge_state(self) -> Dict:
-        """ This field combines the SMEs input on concepts and Student's Knowledge state in a
+    class Config:
+        arbitrary_types_allowed = True
+
+    def knowledge_weights(self, scores: np.ndarray) -> np.ndarray:
+        """ This function combines the SMEs input on concepts and Student's Knowledge scores in a
         weighted manner.
 
         Notes:
@@ -38,34 +44,64 @@ class KnowledgeStateParameters(BaseModel):
             time which would mean there is no DB entry for it.
                 In this case, we need a default value to assign to it.
 
+        Args:
+            scores: Understanding scores whose last axis is aligned with 'concept_list', NaN where
+                there is no DB entry. A 2-D array holds one row per student.
+
         Returns:
-            Dict containing the weighted average mean of the student state and the SME's input.
+            Array of the same shape containing the weighted average mean of the student state and
+            the SME's input.
         """
-        output = {}
+        scores = np.where(np.isnan(scores), self.default_filler, scores)
 
-        # Convert the student's concept-understanding score mapping into concept weights.
+        # Convert the student's concept-understanding scores into concept weights.
         # Currently, a weight is defined as 1 - understanding score because higher understanding
         # score indicates higher level of mastery. An addition of 1e-4 is made to this weight to
         # make sure it is never 0.
-        for concept in self.concept_list:
-            logger.debug(self.student_knowledge_state.get(
-                concept, self.default_filler))
-            output[concept] = 1 - self.student_knowledge_state.get(
-                concept, self.default_filler
-            ) + 1e-4
+        weights = 1 - scores + 1e-4
 
         if self.sme_opinion_importance_factor == 0.0 or not self.sme_concept_wise_importance:
             logger.debug("SME's opinion is skipped.")
-            return output
+            return weights
 
         # Here, we take the weighted average between the 'sme_concept_wise_importance' and
-        # concept weights gained in the previous step(stored in output).
+        # concept weights gained in the previous step.
         # This is done using the 'sme_opinion_importance_factor' as the relative weight.
-        for concept in self.concept_list:
-            output[concept] = (output[concept] * (1 - self.sme_opinion_importance_factor)) + (
-                self.sme_concept_wise_importance.get(
-                    concept, self.default_filler
-                ) * self.sme_opinion_importance_factor
-            )
-
-        return output
+        sme_weights = np.fromiter(
+            (self.sme_concept_wise_importance.get(concept, self.default_filler) for concept in self.concept_list),
+            dtype=float,
+            count=len(self.concept_list)
+        )
+        return weights * (1 - self.sme_opinion_importance_factor) + sme_weights * self.sme_opinion_importance_factor
+
+    @property
+    def student_knowledge_scores(self) -> np.ndarray:
+        """ The student's understanding scores as an array aligned with 'concept_list', NaN where
+        there is no DB entry.
+        """
+        if self.student_knowledge_vector is not None:
+            return self.student_knowledge_vector
+        return np.fromiter(
+            (self.student_knowledge_state.get(concept, np.nan) for concept in self.concept_list),
+            dtype=float,
+            count=len(self.concept_list)
+        )
+
+    @property
+    def combined_knowledge_weights(self) -> np.ndarray:
+        """ Weights computed by 'knowledge_weights' for this student, as an array aligned with
+        'concept_list'.
+
+        Returns:
+            Array containing the weighted average mean of the student state and the SME's input.
+        """
+        return self.knowledge_weights(self.student_knowledge_scores)
+
+    @property
+    def combined_knowledge_state(self) -> Dict:
+        """ Mapping of concept to the weight computed by 'combined_knowledge_weights'.
+
+        Returns:
+            Dict containing the weighted average mean of the student state and the SME's input.
+        """
+        return dict(zip(self.concept_list, self.combined_knowledge_weights.tolist()))
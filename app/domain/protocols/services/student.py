@@ -1,4 +1,6 @@
-from typing import  Protocol
+from typing import  Protocol, List
+
+import numpy as np
 
 from app.domain.models.student import StudentCreate, StudentRead, StudentKnowledgeRead, StudentToCourseCreate, StudentToCourseRead
 
@@ -23,4 +25,18 @@ class StudentService(Protocol):
         """
         Returns a single StudentKnowledge entry matching the student_id and concept_name
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def get_student_knowledge_vector(self, course_id: int, student_id: int, concept_list: List[str]) -> np.ndarray:
+        """
+        Returns the student's scores for every concept in concept_list, in order, from the course's cached knowledge matrix.
+        Concepts without a StudentKnowledge entry are NaN
+        """
+        pass
+
+    async def get_students_knowledge_matrix(self, canvas_ids: List[str], concept_list: List[str]) -> np.ndarray:
+        """
+        Returns a students x concepts matrix of scores, rows in the order of canvas_ids and columns in the order of concept_list.
+        Unknown students and concepts without a StudentKnowledge entry are NaN
+        """
+        pass
@@ -12,4 +12,10 @@ class TriggerEventService(Protocol):
         """
         Adds many entrys to the TriggerEvent table 
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def queue_event(self, event: TriggerEventCreate) -> None:
+        """
+        Hands one entry to the write-behind buffer when it is running, otherwise adds it to the TriggerEvent table immediately
+        """
+        pass
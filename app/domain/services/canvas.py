@@ -1,14 +1,23 @@
 """ This file stores the service that allows us conduct read from and write to Canvas. This
 service interacts with API endpoints exposed by Canvas. """
-from typing import List, Union, Dict
+import asyncio
+import random
+import threading
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Union, Dict
 
 from loguru import logger
+import requests
 from canvasapi import Canvas
+from canvasapi.course import Course
+from canvasapi.exceptions import CanvasException, Forbidden, RateLimitExceeded
 from canvasapi.quiz import Quiz
 
+from app.config.environment import get_settings
 from app.domain.models.question import QuestionAnswerSelection
+from app.domain.models.quiz import CanvasQuizPublishResult
 
-_CANVAS_API_URL = "https://canvas.ucsd.edu/"
+_SETTINGS = get_settings()
+_CANVAS_API_URL = _SETTINGS.CANVAS_API_URL
 
 
 def translate_quiz_type(quiz_type: str) -> str:
@@ -20,16 +29,132 @@ def translate_quiz_type(quiz_type: str) -> str:
         return "Preview"
 
 
+def is_retryable_canvas_error(error: Exception, idempotent: bool = True) -> bool:
+    """ This function decides whether a failed Canvas call is worth retrying.
+
+    Notes:
+        - Canvas throttles with a 403 "Rate Limit Exceeded" which canvasapi raises as Forbidden,
+        newer versions answer 429 which is raised as RateLimitExceeded. Throttled requests were
+        rejected before they did anything, so they are always retried.
+        - Connection errors and 5xx responses are treated as transient, but only for idempotent
+        calls. A create that reached Canvas and timed out on the response would be made twice.
+
+    Args:
+        error: Exception raised by the canvasapi call.
+        idempotent: False for calls that create objects in Canvas.
+
+    Returns:
+        True if the call should be retried.
+    """
+    if isinstance(error, RateLimitExceeded):
+        return True
+    if isinstance(error, Forbidden):
+        return "Rate Limit Exceeded" in str(error)
+    if not idempotent:
+        return False
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    # canvasapi raises the base CanvasException for every status code it has no subclass for.
+    return type(error) is CanvasException and "status code 5" in str(error)
+
+
 class CanvasCourseService:
     """ This class serves to interact with the Canvas API endpoints to conduct data extraction
     tasks or creation tasks.
 
     Notes:
         This implementation is built specifically for UC San Diego.
+
+        canvasapi is synchronous, every call is run in a worker thread through '_call' so the
+        event loop is never blocked. At most CANVAS_MAX_CONCURRENCY calls are in flight, calls
+        are held back while Canvas reports a low X-Rate-Limit-Remaining and throttled or
+        transient failures are retried with exponential backoff. Calls creating objects are only
+        retried when throttled.
     """
-    def __init__(self, access_token: str, course_id: int):
-        self.canvas_client = Canvas(base_url=_CANVAS_API_URL, access_token=access_token)
-        self.course = self.canvas_client.get_course(course_id)
+    def __init__(self, access_token: str, course_id: int, base_url: str = _CANVAS_API_URL):
+        self.canvas_client = Canvas(base_url=base_url, access_token=access_token)
+        self.max_concurrency = _SETTINGS.CANVAS_MAX_CONCURRENCY
+        self.max_retries = _SETTINGS.CANVAS_MAX_RETRIES
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._rate_limit_remaining: Optional[float] = None
+        # Each call runs in its own worker thread, the response hook keeps the call's Retry-After here
+        self._local = threading.local()
+
+        # canvasapi does not expose its requester, which is needed to read the response headers
+        # through a hook on its requests session, keeping track of the rate limit bucket.
+        requester = self.canvas_client._Canvas__requester
+        requester._session.hooks["response"].append(self._observe_response)
+
+        # The course endpoints only need its id, building the object avoids a blocking GET here.
+        self.course = Course(requester, {"id": course_id})
+
+    def _observe_response(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        remaining = response.headers.get("X-Rate-Limit-Remaining")
+        if remaining is not None:
+            try:
+                self._rate_limit_remaining = float(remaining)
+            except ValueError:
+                pass
+
+        self._local.retry_after = response.headers.get("Retry-After")
+        return response
+
+    def _run(self, function: Callable, *args, **kwargs) -> Tuple[Any, Optional[Exception], Optional[float]]:
+        """ This function runs in the worker thread of a single call, so the Retry-After it
+        returns is the one of that call's last response, i.e. the failed one.
+
+        Returns:
+            The value returned by the function, the exception it raised and the Retry-After.
+        """
+        self._local.retry_after = None
+        try:
+            return function(*args, **kwargs), None, None
+        except Exception as e:
+            try:
+                retry_after = float(self._local.retry_after) if self._local.retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            return None, e, retry_after
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, _SETTINGS.CANVAS_BACKOFF_MAX_SECONDS)
+
+        # Full jitter so throttled callers do not retry in lockstep.
+        ceiling = min(_SETTINGS.CANVAS_BACKOFF_BASE_SECONDS * 2 ** attempt, _SETTINGS.CANVAS_BACKOFF_MAX_SECONDS)
+        return random.uniform(0, ceiling)
+
+    async def _wait_for_rate_limit(self) -> None:
+        remaining = self._rate_limit_remaining
+        low_water = _SETTINGS.CANVAS_RATE_LIMIT_LOW_WATER
+        if remaining is not None and remaining < low_water:
+            # Canvas refills the bucket over time, the emptier it is the longer we hold back.
+            await asyncio.sleep(_SETTINGS.CANVAS_BACKOFF_BASE_SECONDS * (1 - max(remaining, 0) / low_water))
+
+    async def _call(self, function: Callable, *args, idempotent: bool = True, **kwargs) -> Any:
+        """ This function runs a blocking canvasapi call in a worker thread, bounded by the
+        concurrency limit and retried while Canvas throttles or fails transiently.
+
+        Args:
+            function: canvasapi method, or any callable wrapping several of them.
+            idempotent: False for calls that create objects, see is_retryable_canvas_error.
+
+        Returns:
+            The value returned by the function.
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                await self._wait_for_rate_limit()
+                result, error, retry_after = await asyncio.to_thread(self._run, function, *args, **kwargs)
+                if error is None:
+                    return result
+                if attempt == self.max_retries or not is_retryable_canvas_error(error, idempotent=idempotent):
+                    raise error
+                delay = self._backoff_delay(attempt, retry_after=retry_after)
+                logger.warning(f"Canvas call {getattr(function, '__name__', function)} failed with {error!r}, "
+                               f"retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries}).")
+
+            await asyncio.sleep(delay)
 
     async def get_student_ids_in_course(self) -> List[int]:
         """ This function returns the IDs of the users enrolled in the "student" capacity in the
@@ -38,13 +163,10 @@ class CanvasCourseService:
         Returns:
             A list of IDs.
         """
-        student_ids = []
-
         # The API call returns a paginated result set which needs to be processed.
-        for student_record in self.course.get_users(enrollment_type=['student']):
-            student_ids.append(student_record.id)
-
-        return student_ids
+        return await self._call(
+            lambda: [student_record.id for student_record in self.course.get_users(enrollment_type=['student'])]
+        )
 
     async def create_personalized_practice_quiz(
             self,
@@ -75,7 +197,9 @@ class CanvasCourseService:
         """
         # read the Notes section in the docstrings to understand these steps.
         # TODO: Prof. has asked for the student_id in the quiz title to be anonymized.
-        quiz = self.course.create_quiz(
+        quiz = await self._call(
+            self.course.create_quiz,
+            idempotent=False,
             quiz={
                 'title': f'Module #{module_id} {translate_quiz_type(type_of_quiz)} Quiz',
                 'quiz_type': 'assignment',
@@ -85,21 +209,22 @@ class CanvasCourseService:
         )
 
         # Overriding the quiz so only the assigned student can view the quiz
-        quiz_assignment = self.course.get_assignment(quiz.assignment_id)
+        quiz_assignment = await self._call(self.course.get_assignment, quiz.assignment_id)
         student_override = {
             'student_ids': [student_id],
             'title': f"{quiz.id}'s override"
         }
-        quiz_assignment.create_override(assignment_override=student_override)
+        await self._call(quiz_assignment.create_override, idempotent=False, assignment_override=student_override)
 
-        quiz.edit(quiz={'quiz_type': 'practice_quiz'})
+        await self._call(quiz.edit, quiz={'quiz_type': 'practice_quiz'})
 
         return quiz
 
     async def add_question_to_quiz(
             self,
             quiz: Union[int, Quiz],
-            question: QuestionAnswerSelection
+            question: QuestionAnswerSelection,
+            position: Optional[int] = None
     ) -> None:
         """ This function allows for a question to be added to the quiz.
         A forced typechecking of the dictionary items is conducted to make sure that proper
@@ -108,29 +233,133 @@ class CanvasCourseService:
         Args:
             quiz: Quiz ID or Object.
             question: A QuestionAnswerSelection object that contains Question + its answers.
+            position: Position of the question in the quiz, keeps the order when questions are
+                added concurrently.
 
         Returns:
             None
         """
         # If quiz id is given we get the quiz object
         if isinstance(quiz, int):
-            quiz = self.course.get_quiz(quiz)
+            quiz = await self._call(self.course.get_quiz, quiz)
 
         answer = [answer.__dict__ for answer in question.answers]
 
-        quiz.create_question(
-            question={
-                'question_name': question.question.question_name,
-                'question_text': question.question.question_text,
-                'question_type': question.question.question_type,
-                'points_possible': question.question.points_possible,
-                'correct_comments': question.question.correct_comments,
-                'incorrect_comments': question.question.incorrect_comments,
-                'text_after_answers': question.question.neutral_comments,
-                'answers': answer
-            }
+        question_payload = {
+            'question_name': question.question.question_name,
+            'question_text': question.question.question_text,
+            'question_type': question.question.question_type,
+            'points_possible': question.question.points_possible,
+            # The Question model has no correct/incorrect comments yet.
+            'correct_comments': getattr(question.question, 'correct_comments', None),
+            'incorrect_comments': getattr(question.question, 'incorrect_comments', None),
+            'text_after_answers': question.question.neutral_comments,
+            'answers': answer
+        }
+        if position is not None:
+            question_payload['position'] = position
+
+        await self._call(quiz.create_question, idempotent=False, question=question_payload)
+
+    async def publish_personalized_quiz(
+            self,
+            student_id: int,
+            module_id: int,
+            type_of_quiz: str,
+            questions: List[QuestionAnswerSelection]
+    ) -> CanvasQuizPublishResult:
+        """ This function creates a student's quiz and adds its questions concurrently.
+        Failures are reported in the result instead of being raised so one student does not
+        stop the others.
+
+        Args:
+            student_id: ID of the student
+            module_id: Module ID for which the quiz is made.
+            type_of_quiz: type of quiz. DO NOT CONFUSE WITH 'quiz_type' ARGUMENT IN CANVAS.
+            questions: The student's questions with their answers, in order.
+
+        Returns:
+            CanvasQuizPublishResult of the student.
+        """
+        question_ids = [question.question.id for question in questions]
+        try:
+            quiz = await self.create_personalized_practice_quiz(
+                student_id=student_id,
+                module_id=module_id,
+                type_of_quiz=type_of_quiz
+            )
+        except Exception as e:
+            logger.exception(f"Quiz creation for {student_id} failed.")
+            return CanvasQuizPublishResult(
+                student_id=student_id, question_ids=question_ids, status="failed", error=repr(e)
+            )
+
+        outcomes = await asyncio.gather(
+            *(self.add_question_to_quiz(quiz=quiz, question=question, position=position)
+              for position, question in enumerate(questions, start=1)),
+            return_exceptions=True
+        )
+        errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        for error in errors:
+            logger.error(f"Adding a question to quiz {quiz.id} of {student_id} failed: {error!r}")
+
+        n_published = len(questions) - len(errors)
+        return CanvasQuizPublishResult(
+            student_id=student_id,
+            canvas_quiz_id=quiz.id,
+            question_ids=question_ids,
+            n_published=n_published,
+            status="published" if not errors else "partial" if n_published else "failed",
+            error=repr(errors[0]) if errors else None
         )
 
+    async def publish_personalized_quizzes(
+            self,
+            quizzes: Dict[int, List[QuestionAnswerSelection]],
+            module_id: int,
+            type_of_quiz: str,
+            on_progress: Optional[Callable[[CanvasQuizPublishResult, int, int], Awaitable[None]]] = None
+    ) -> List[CanvasQuizPublishResult]:
+        """ This function publishes the personalized quizzes of many students concurrently.
+
+        Notes:
+            At most CANVAS_MAX_CONCURRENCY students are in progress at once, which keeps the
+            requests of a student close together and progress steady.
+
+        Args:
+            quizzes: Mapping of student ID to the student's questions with their answers.
+            module_id: Module ID for which the quizzes are made.
+            type_of_quiz: type of quiz. DO NOT CONFUSE WITH 'quiz_type' ARGUMENT IN CANVAS.
+            on_progress: Awaited with the result, the no of students completed and the total
+                after each student.
+
+        Returns:
+            A CanvasQuizPublishResult per student, in the order of 'quizzes'.
+        """
+        students_in_progress = asyncio.Semaphore(self.max_concurrency)
+        total = len(quizzes)
+        completed = 0
+
+        async def publish(student_id: int, questions: List[QuestionAnswerSelection]) -> CanvasQuizPublishResult:
+            nonlocal completed
+            async with students_in_progress:
+                result = await self.publish_personalized_quiz(
+                    student_id=student_id,
+                    module_id=module_id,
+                    type_of_quiz=type_of_quiz,
+                    questions=questions
+                )
+
+            completed += 1
+            logger.info(f"Quiz publishing for {student_id} {result.status} ({completed}/{total}).")
+            if on_progress is not None:
+                await on_progress(result, completed, total)
+            return result
+
+        return list(await asyncio.gather(
+            *(publish(student_id, questions) for student_id, questions in quizzes.items())
+        ))
+
     async def get_formatted_submissions_for_quiz(self, quiz: Union[int, Quiz]) -> Dict:
         """ This function returns the latest submission for a given quiz. The function extracts
         the topic of the question and assigns correct/incorrect submission to it.
@@ -146,19 +375,19 @@ class CanvasCourseService:
         """
         # If quiz id is given we get the quiz object
         if isinstance(quiz, int):
-            quiz = self.course.get_quiz(quiz)
+            quiz = await self._call(self.course.get_quiz, quiz)
 
         # This step is needed because Canvas natively renames the Question for Student view. X(
         question_id_to_name_mapping = {}
-        for question in quiz.get_questions():
+        for question in await self._call(lambda: list(quiz.get_questions())):
             question_id_to_name_mapping[question.assessment_question_id] = question.question_name
         logger.debug(question_id_to_name_mapping)
 
         quiz_results = {}
 
         # Now, we formatted the latest submission.
-        submission = list(quiz.get_submissions())[-1]
-        for question in submission.get_submission_questions():
+        submission = (await self._call(lambda: list(quiz.get_submissions())))[-1]
+        for question in await self._call(submission.get_submission_questions):
             concept = question_id_to_name_mapping.get(question.assessment_question_id)
             quiz_results[concept] = quiz_results.get(concept, []) + [int(question.correct)]
 
@@ -16,6 +16,7 @@ from app.domain.models.concept import (
     ConceptReadVerbose,
     ConceptToModuleDelete,
     ConceptToConceptDelete,
+    ConceptToConceptClosureRead,
     ConceptReadPreformatted
     )
 from app.domain.protocols.repositories.concept import (
@@ -36,6 +37,10 @@ from app.infrastructure.database.repositories.concept import (
     ConceptToModuleRepository,
     ConceptToConceptRepository
     )
+from app.infrastructure.cache.concept_graph import ConceptGraphCache
+from app.config.environment import get_settings
+
+_SETTINGS = get_settings()
 
 
 class ConceptService(ConceptServiceProtocol, CToDServiceProtocol, CToMServiceProtocol, CToCServiceProtocol):
@@ -51,6 +56,7 @@ class ConceptService(ConceptServiceProtocol, CToDServiceProtocol, CToMServicePro
         self.c_to_d_repo = c_to_d_repo
         self.c_to_m_repo = c_to_m_repo
         self.c_to_c_repo = c_to_c_repo
+        self.concept_graph = ConceptGraphCache()
     
 
     async def create_concept(self, concept: ConceptCreate) -> ConceptRead:
@@ -143,14 +149,18 @@ class ConceptService(ConceptServiceProtocol, CToDServiceProtocol, CToMServicePro
         return await self.c_to_m_repo.get_all(module_id=module_id)
 
 
-    async def get_all_prereqs_of_module(self, module_id: int)-> ConceptBulkRead:
+    async def get_all_prereqs_of_module(self, module_id: int, hops: Optional[int] = 1)-> ConceptBulkRead:
         module_concepts = await self.c_to_m_repo.get_all(module_id=module_id)
-        module_concept_junctions = await self.c_to_c_repo.get_some(concepts=module_concepts)
-
         module_concept_list = [val.name for val in module_concepts.concepts]
-        prereq_list = list(set([val.prereq_name for val in module_concept_junctions]))
 
-        return ConceptBulkRead(concepts=[ConceptRead(name=val) for val in prereq_list if val not in module_concept_list])
+        if _SETTINGS.CONCEPT_GRAPH_IN_MEMORY:
+            graph = await self.concept_graph.get(c_to_c_repo=self.c_to_c_repo)
+            prereq_list = graph.prerequisite_frontier(module_concepts=module_concept_list, hops=hops)
+        else:
+            closure = await self.c_to_c_repo.get_closure(module_id=module_id, junction_direction="down", max_depth=hops)
+            prereq_list = [val for val in dict.fromkeys(junction.prereq_name for junction in closure) if val not in module_concept_list]
+
+        return ConceptBulkRead(concepts=[ConceptRead(name=val) for val in prereq_list])
 
 
     async def delete_module_junctions(self, junctions: List[ConceptToModuleDelete]):
@@ -159,10 +169,56 @@ class ConceptService(ConceptServiceProtocol, CToDServiceProtocol, CToMServicePro
 
     # ConceptToConcept Service
     async def bulk_create_concept_junctions(self, junctions: List[ConceptToConceptCreate]) -> List[ConceptToConceptRead]:
-        return await self.c_to_c_repo.bulk_add(junctions=junctions)
+        result = await self.c_to_c_repo.bulk_add(junctions=junctions)
+        self.concept_graph.add(junctions=result)
+        return result
     
     async def get_concept_junctions(self, concepts: ConceptBulkRead, junction_direction: Literal["up", "down", "both"]="down") -> List[ConceptToConceptRead]:
-        return await self.c_to_c_repo.get_some(concepts=concepts, junction_direction=junction_direction)
+        if not _SETTINGS.CONCEPT_GRAPH_IN_MEMORY:
+            return await self.c_to_c_repo.get_some(concepts=concepts, junction_direction=junction_direction)
+
+        graph = await self.concept_graph.get(c_to_c_repo=self.c_to_c_repo)
+        return [
+            ConceptToConceptRead(concept_name=concept_name, prereq_name=prereq_name) 
+            for concept_name, prereq_name in graph.junctions(concepts=[val.name for val in concepts.concepts], junction_direction=junction_direction)
+        ]
+
+    async def get_concept_chain(
+            self, 
+            concepts: ConceptBulkRead, 
+            junction_direction: Literal["up", "down"]="down", 
+            hops: Optional[int] = None
+    ) -> ConceptBulkRead:
+        names = [val.name for val in concepts.concepts]
+        if _SETTINGS.CONCEPT_GRAPH_IN_MEMORY:
+            graph = await self.concept_graph.get(c_to_c_repo=self.c_to_c_repo)
+            result = graph.prerequisites(names, hops=hops) if junction_direction == "down" else graph.dependents(names, hops=hops)
+        else:
+            closure = await self.c_to_c_repo.get_closure(concepts=concepts, junction_direction=junction_direction, max_depth=hops)
+            reached = (junction.prereq_name if junction_direction == "down" else junction.concept_name for junction in closure)
+            result = [val for val in dict.fromkeys(reached) if val not in names]
+        return ConceptBulkRead(concepts=[ConceptRead(name=val) for val in result])
+
+    async def get_concept_closure(
+            self, 
+            concepts: ConceptBulkRead, 
+            junction_direction: Literal["up", "down"]="down", 
+            max_depth: Optional[int] = None
+    ) -> List[ConceptToConceptClosureRead]:
+        return await self.c_to_c_repo.get_closure(concepts=concepts, junction_direction=junction_direction, max_depth=max_depth)
+
+    async def get_module_closure(
+            self, 
+            module_id: int, 
+            junction_direction: Literal["up", "down"]="down", 
+            max_depth: Optional[int] = None
+    ) -> List[ConceptToConceptClosureRead]:
+        return await self.c_to_c_repo.get_closure(module_id=module_id, junction_direction=junction_direction, max_depth=max_depth)
+
+    async def get_learning_order(self, concepts: ConceptBulkRead) -> ConceptBulkRead:
+        graph = await self.concept_graph.get(c_to_c_repo=self.c_to_c_repo)
+        return ConceptBulkRead(concepts=[ConceptRead(name=val) for val in graph.learning_order([val.name for val in concepts.concepts])])
 
     async def delete_junctions(self, junctions: List[ConceptToConceptDelete]):
-        await self.c_to_c_repo.delete(junctions=junctions)
\ No newline at end of file
+        await self.c_to_c_repo.delete(junctions=junctions)
+        self.concept_graph.remove(junctions=junctions)
\ No newline at end of file
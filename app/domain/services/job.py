@@ -0,0 +1,54 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Depends, UploadFile
+
+from app.config.environment import get_settings
+from app.domain.models.job import JobCreate, JobRead, JobFile
+from app.domain.protocols.repositories.job import JobRepository as JobRepoProtocol
+from app.domain.protocols.services.job import JobService as JobServiceProtocol
+from app.infrastructure.database.repositories.job import JobRepository
+from app.utils.encryption import encrypt_json
+
+_SETTINGS = get_settings()
+
+
+class JobService(JobServiceProtocol):
+    def __init__(
+            self,
+            job_repo: JobRepoProtocol = Depends(JobRepository)
+    ):
+        self.job_repo = job_repo
+
+    async def enqueue(
+            self,
+            operation: str,
+            payload: Dict[str, Any],
+            files: Optional[List[UploadFile]] = None,
+            idempotency_key: Optional[str] = None,
+            secrets: Optional[Dict[str, Any]] = None,
+            owner: Optional[str] = None
+    ) -> Tuple[JobRead, bool]:
+        job_files = []
+        for upload in files or []:
+            job_files.append(JobFile(
+                job_id=0,
+                filename=upload.filename,
+                content_type=upload.content_type,
+                content=await upload.read()
+            ))
+            await upload.seek(0)
+
+        return await self.job_repo.add(
+            job=JobCreate(
+                operation=operation,
+                payload=payload,
+                idempotency_key=idempotency_key,
+                max_attempts=_SETTINGS.JOB_MAX_ATTEMPTS,
+                secrets=encrypt_json(secrets) if secrets else None,
+                owner=owner
+            ),
+            files=job_files
+        )
+
+    async def get_job(self, job_id: int, owner: str) -> Optional[JobRead]:
+        return await self.job_repo.get(job_id=job_id, owner=owner)
@@ -1,5 +1,5 @@
 """ This file contains the logic to personalize the quiz questions. """
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Optional, Tuple
 
 from loguru import logger
 import numpy as np
@@ -21,15 +21,41 @@ from app.domain.models.question import Question
 from app.domain.protocols.services.personalization import KnowledgeStateParameters
 
 
+def _occurrence_rank(codes: np.ndarray) -> np.ndarray:
+    """ This function numbers the repeated values of an array in order of appearance.
+
+    Args:
+        codes: 1-D integer array.
+
+    Returns:
+        Array where each element holds how many times its value appeared before it, e.g. [3, 1, 3, 3] -> [0, 0, 1, 2].
+    """
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    group_starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, len(codes)])
+
+    ranks = np.empty(len(codes), dtype=np.intp)
+    ranks[order] = np.arange(len(codes)) - np.repeat(group_starts, group_sizes)
+    return ranks
+
+
 class QuestionPersonalizationService:
-    """This class contains the code used to Personalized Questions Selection."""
+    """This class contains the code used to Personalized Questions Selection.
+
+    Selection is vectorized: concept weights are held as a students x concepts NumPy array
+    aligned with the knowledge state's concept list, and all questions of every quiz are drawn
+    in one pass. Pass a seeded Generator (np.random.default_rng(seed)) for reproducible selections.
+    """
     def __init__(
             self,
             knowledge_state: KnowledgeStateParameters,
-            questions: List[Question]
+            questions: List[Question],
+            rng: Optional[np.random.Generator] = None
     ):
         self.knowledge_state = knowledge_state
         self.questions = questions
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     async def _prepare_concept_to_questions_mapping(self) -> Dict:
         """ This is a function that prepares the concept to question mapping.
@@ -40,52 +66,149 @@ class QuestionPersonalizationService:
         concept_to_questions_mapping = {}
         for question in self.questions:
             # question_name field in our database is equivalent to concept name.
-            concept_to_questions_mapping[question.question_name] = concept_to_questions_mapping.get(
-                question.question_name, []
-            ) + [question]
+            concept_to_questions_mapping.setdefault(question.question_name, []).append(question)
         logger.debug(concept_to_questions_mapping)
         return concept_to_questions_mapping
 
-    async def _get_formatted_concept_weights(self, concept_to_questions_mapping: Dict) -> Dict:
-        """ This function formats the concept weights and presents them in a usable format.
+    def _encode_questions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ This function encodes every question by the index of its concept in the knowledge state's concept list.
+
+        Returns:
+            1. Concept index of each question, -1 if its concept is not being tested.
+            2. No of questions available for each concept.
+        """
+        concept_codes = {concept: code for code, concept in enumerate(self.knowledge_state.concept_list)}
+        # question_name field in our database is equivalent to concept name.
+        question_codes = np.fromiter(
+            (concept_codes.get(question.question_name, -1) for question in self.questions),
+            dtype=np.intp,
+            count=len(self.questions)
+        )
+        capacity = np.bincount(
+            question_codes[question_codes >= 0], minlength=len(self.knowledge_state.concept_list)
+        )
+        return question_codes, capacity
+
+    def _draw_concepts(self, weights: np.ndarray, capacity: np.ndarray, n_draws: int) -> np.ndarray:
+        """ This function draws the concept of every question to be selected, for every student.
+
+        Notes:
+            Each draw picks a concept with probability proportional to its weight among the concepts
+            that still have questions left for that student. Drawing in blocks with replacement and
+            rejecting the draws of a concept past its capacity gives exactly that distribution. The
+            weights are renormalized between blocks so exhausted concepts stop being drawn.
+
+        Args:
+            weights: Students x concepts weight matrix, 0 for the concepts that have no questions.
+            capacity: No of questions available for each concept.
+            n_draws: No of concepts to draw per student.
 
         Returns:
-            Mapping of concept to importance.
+            Students x n_draws matrix of concept indices in draw order.
         """
-        # We create a concept to importance mapping.
-        # We additionally remove the concepts that we don't have any entries for in the DB.
-        concept_weights = {}
-        logger.debug(f"Combined Knowledge State: {self.knowledge_state.combined_knowledge_state}")
-        for concept, weight in self.knowledge_state.combined_knowledge_state.items():
-            if len(concept_to_questions_mapping.get(concept, [])) == 0:
-                logger.debug(f'Concept removed: {concept} || Has no questions in DB.')
-            else:
-                concept_weights[concept] = weight
-
-        return concept_weights
-
-    @staticmethod
-    async def _select_a_question_for_concept(
-            questions: List
-    ) -> [Dict, Question]:
-        """ This is a private function that selects a single question given a concept.
+        n_students, n_concepts = weights.shape
+        counts = np.zeros((n_students, n_concepts), dtype=np.intp)
+        draws = np.empty((n_students, n_draws), dtype=np.intp)
+        filled = np.zeros(n_students, dtype=np.intp)
+
+        while (filled < n_draws).any():
+            rows = np.flatnonzero(filled < n_draws)
+            open_weights = np.where(counts[rows] < capacity, weights[rows], 0.0)
+
+            # Inverse CDF sampling of every row at once: offsetting row r's normalised CDF and
+            # uniforms by r lets a single searchsorted over the flattened CDFs serve all rows.
+            offsets = np.arange(len(rows))[:, None]
+            cdf = np.cumsum(open_weights, axis=1)
+            cdf = cdf / cdf[:, -1:] + offsets
+            needed = n_draws - filled[rows]
+            uniforms = self.rng.random((len(rows), needed.max())) + offsets
+            block = np.searchsorted(cdf.ravel(), uniforms.ravel(), side="right").reshape(uniforms.shape)
+            block = np.minimum(block - offsets * n_concepts, n_concepts - 1)
+
+            # Drop the padding of rows that need fewer draws and any pick rounding landed on a
+            # closed concept, then reject the draws past a concept's remaining capacity.
+            valid = (np.arange(uniforms.shape[1]) < needed[:, None]) & (open_weights[offsets, block] > 0)
+            draw_rows = np.broadcast_to(rows[:, None], block.shape)[valid]
+            draw_concepts = block[valid]
+            ranks = _occurrence_rank(draw_rows * n_concepts + draw_concepts)
+            accepted = counts[draw_rows, draw_concepts] + ranks < capacity[draw_concepts]
+
+            draw_rows, draw_concepts = draw_rows[accepted], draw_concepts[accepted]
+            positions = filled[draw_rows] + _occurrence_rank(draw_rows)
+            draws[draw_rows, positions] = draw_concepts
+            np.add.at(counts, (draw_rows, draw_concepts), 1)
+            filled += np.bincount(draw_rows, minlength=n_students)
+
+        return draws
+
+    def _assign_questions(self, question_codes: np.ndarray, concept_draws: np.ndarray) -> np.ndarray:
+        """ This function selects a question for every concept drawn.
 
         Notes:
             Customize the contents of this function to change the question selection mechanism.
+            Currently, questions of a concept are shuffled per student and the k-th draw of a concept
+            takes its k-th question, i.e. a uniformly random question without replacement.
 
         Args:
-            questions: A set of questions to choose from.
+            question_codes: Concept index of each question.
+            concept_draws: Students x n_draws matrix of concept indices in draw order.
 
         Returns:
-            1. questions where the selected question is removed.
-            2. Selected question.
+            Students x n_draws matrix of indices into the question list.
         """
-        # Currently, we randomly select a single question from the list.
-        chosen_idx = np.random.choice(a=range(len(questions)), size=1)[0]
+        n_students, n_draws = concept_draws.shape
+        n_concepts = len(self.knowledge_state.concept_list)
+        keys = self.rng.random((n_students, len(question_codes)))
+        order = np.lexsort((keys, np.broadcast_to(question_codes, keys.shape)))
 
-        selected_question = questions.pop(chosen_idx)
+        concept_starts = np.searchsorted(np.sort(question_codes), concept_draws)
+        student_rows = np.repeat(np.arange(n_students), n_draws)
+        ranks = _occurrence_rank(student_rows * n_concepts + concept_draws.ravel()).reshape(concept_draws.shape)
+        return np.take_along_axis(order, concept_starts + ranks, axis=1)
 
-        return [questions, selected_question]
+    async def get_personalized_quizzes(
+            self,
+            student_knowledge_matrix: np.ndarray,
+            n_questions: int,
+            chunk_size: int = 1000
+    ) -> List[List[Question]]:
+        """ This function conducts the selection of questions for many students at once, sharing
+        the question list and the SME input of the knowledge state.
+
+        Args:
+            student_knowledge_matrix: Students x concepts understanding scores aligned with the
+                knowledge state's concept list, NaN where there is no DB entry.
+            n_questions: No of questions to be selected for each student.
+            chunk_size: No of students sampled together, bounds memory to chunk_size x questions.
+
+        Returns:
+            A list of personalized questions for every row of the matrix, in order.
+        """
+        n_students = student_knowledge_matrix.shape[0]
+        if n_questions > len(self.questions):
+            raise ValueError("No of questions requested for quiz is more than the questions "
+                             "present in the database.")
+        if n_questions <= 0 or n_students == 0:
+            return [[] for _ in range(n_students)]
+
+        question_codes, capacity = self._encode_questions()
+        # We remove the concepts that we don't have any entries for in the DB.
+        weights = np.where(
+            capacity > 0, self.knowledge_state.knowledge_weights(student_knowledge_matrix), 0.0
+        )
+        if n_questions > np.where(weights > 0, capacity, 0).sum(axis=1).min():
+            raise ValueError("No of questions requested for quiz is more than the questions "
+                             "present in the database for the concepts being tested.")
+
+        quizzes = []
+        for start in range(0, n_students, chunk_size):
+            chunk = weights[start:start + chunk_size]
+            concept_draws = self._draw_concepts(weights=chunk, capacity=capacity, n_draws=n_questions)
+            selected = self._assign_questions(question_codes=question_codes, concept_draws=concept_draws)
+            quizzes.extend([self.questions[index] for index in row] for row in selected.tolist())
+
+        logger.debug(f"Selected {n_questions} questions for {n_students} students.")
+        return quizzes
 
     async def get_personalized_questions(self, n_questions: int) -> List[Question]:
         """ This function conducts the selection of questions from the given list based on
@@ -97,36 +220,11 @@ class QuestionPersonalizationService:
         Returns:
             A list of personalized questions.
         """
-        if n_questions > len(self.questions):
-            raise ValueError("No of questions requested for quiz is more than the questions "
-                             "present in the database.")
-
-        concept_to_questions_mapping = await self._prepare_concept_to_questions_mapping()
-
-        concept_weights = await self._get_formatted_concept_weights(concept_to_questions_mapping)
-
-        # Select the questions
-        selected_questions = []
-        for _ in range(n_questions):
-            selected_concept = np.random.choice(
-                a=list(concept_weights.keys()),
-                size=1,
-                # This is done because the function only takes probability values.
-                p=[raw_val / sum(concept_weights.values()) for raw_val in concept_weights.values()]
-            )[0]
-            new_question_list, selected_question = await self._select_a_question_for_concept(
-                questions=concept_to_questions_mapping.get(selected_concept)
-            )
-
-            selected_questions.append(selected_question)
-            if len(new_question_list) == 0:
-                logger.debug(f"Question for {selected_concept} added. No questions remain.")
-                concept_weights.pop(selected_concept)
-            else:
-                logger.debug(f"Question for {selected_concept} added.")
-                concept_to_questions_mapping[selected_concept] = new_question_list
-
-        return selected_questions
+        quizzes = await self.get_personalized_quizzes(
+            student_knowledge_matrix=self.knowledge_state.student_knowledge_scores[None, :],
+            n_questions=n_questions
+        )
+        return quizzes[0]
 
     async def get_one_question(self) -> Question:
         """ This function selects a single function from the given list.
@@ -134,25 +232,7 @@ class QuestionPersonalizationService:
         Returns:
             1 personalized question is returned.
         """
-        concept_to_questions_mapping = await self._prepare_concept_to_questions_mapping()
-
-        concept_weights = await self._get_formatted_concept_weights(concept_to_questions_mapping)
-
-        selected_concept = np.random.choice(
-            a=list(concept_weights.keys()),
-            size=1,
-            # This is done because the function only takes probability values.
-            p=[raw_val / sum(concept_weights.values()) for raw_val in concept_weights.values()]
-        )[0]
-        new_question_list, selected_question = await self._select_a_question_for_concept(
-            questions=concept_to_questions_mapping.get(selected_concept)
-        )
-
         # TODO: Adjust session information.
-
-        if len(new_question_list) == 0:
-            logger.debug(f"Question for {selected_concept} added. No questions remain.")
-        else:
-            logger.debug(f"Question for {selected_concept} added.")
-
+        selected_question = (await self.get_personalized_questions(n_questions=1))[0]
+        logger.debug(f"Question for {selected_question.question_name} added.")
         return selected_question
@@ -5,6 +5,7 @@ from fastapi_lti1p3 import PlatformConfigSettings
 from fastapi_lti1p3.errors import ClientIdError
 
 from app.domain.models.platform_config import PlatformConfigCreate, PlatformConfigRead
+from app.infrastructure.database.db import get_db
 from app.infrastructure.database.repositories.platform_config import PlatformConfigRepository
 from app.domain.protocols.repositories.platform_config import PlatformConfigRepository as PlatformConfigRepoProtocol
 from app.domain.protocols.services.platform_config import PlatformConfigService as PlatformConfigServiceProtocol
@@ -28,9 +29,10 @@ class PlatformConfigService(PlatformConfigServiceProtocol):
     
 
 async def get_config_lti_adapter(client_id: str) -> PlatformConfigSettings:
-    platform_config_repo = PlatformConfigRepository()
+    # Called by the LTI adapter outside of FastAPI's dependency injection, so the repository gets its own session
     try:
-        settings = await platform_config_repo.get(client_id=client_id)
+        async with get_db() as db:
+            settings = await PlatformConfigRepository(db=db).get(client_id=client_id)
         
     except Exception as e:
         raise ClientIdError(message="Unauthorized Client ID", status_code=403) from e
@@ -1,13 +1,13 @@
 # app/domain/services/prompt.py
 from typing import List, Optional
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Depends
 from app.domain.models.prompt import PromptCreate, PromptRead, PromptUpdate
 from app.infrastructure.database.repositories.prompt import PromptRepository
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.db import get_session
 
 class PromptService:
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_session)):
         self.prompt_repository = PromptRepository(db)
 
     async def create_prompt(self, id: str, editable_part: str, fixed_part: str) -> PromptRead:
@@ -6,6 +6,7 @@ from app.domain.protocols.repositories.question import QuestionRepository as Que
 from app.domain.protocols.services.question import QuestionService as QuestionServiceProtocol
 from app.infrastructure.database.repositories.question import QuestionRepository, AnswerRepository
 from app.domain.models.question import QuestionCreate, AnswerCreate
+from app.infrastructure.cache.question_bank import QuestionBankCache
 
 class QuestionService(QuestionServiceProtocol):
     def __init__(
@@ -15,40 +16,44 @@ class QuestionService(QuestionServiceProtocol):
     ):
         self.question_repo = question_repo
         self.answer_repo = answer_repo
+        self.question_bank = QuestionBankCache()
 
     async def create_question(self, question: QuestionAnswerInput) -> QuestionRead:
         ...
 
     async def create_questions(self, questions: List[QuestionAnswerInput]) -> List[QuestionRead]:
         
-        result_list = []
-        for entry in questions:
-            result = await self.question_repo.add(entry.question)
-            result_list.append(result)
-            for answer in entry.answers:
-                answer = AnswerCreate(**answer.dict(), question_id=result.id)
-                await self.answer_repo.add(answer)  
+        # Two COPYs for the whole list, one for the questions and one for their answers
+        result_list = await self.question_repo.bulk_add(questions=[entry.question for entry in questions])
+        await self.answer_repo.bulk_add(answers=[
+            AnswerCreate(**answer.dict(), question_id=result.id)
+            for entry, result in zip(questions, result_list)
+            for answer in entry.answers
+        ])
+        self.question_bank.invalidate_concepts(concepts={result.question_name for result in result_list})
             
         return result_list
 
+    # Reads are served by the question bank cache, which only queries for concepts and questions it does not hold yet
     async def get_question(self, question_id: int) -> QuestionRead:
-        return await self.question_repo.get_one_by_id(id=question_id)
+        questions = await self.question_bank.questions_by_id(question_ids=[question_id], question_repo=self.question_repo)
+        return questions[0] if questions else None
 
     async def get_questions_by_id(self, id_list: List) -> List[QuestionRead]:
-        return await self.question_repo.bulk_get_by_id(id_list=id_list)
+        return await self.question_bank.questions_by_id(question_ids=id_list, question_repo=self.question_repo)
 
     async def get_all_questions_for_concepts(self, concept_list: List) -> List[QuestionRead]:
-        # TODO: Discuss with team how to organize this logic better using the ORM.
-        return await self.question_repo.get_all_by_concept(concept_list=concept_list)
+        return await self.question_bank.questions_for_concepts(concept_list=concept_list, question_repo=self.question_repo)
 
     async def get_answers_for_questions(self, question_ids: List) -> List[AnswerRead]:
-        return await self.answer_repo.get_answers_by_question_ids(question_ids=question_ids)
+        return await self.question_bank.answers_for_questions(question_ids=question_ids, question_repo=self.question_repo)
 
     async def get_answers_for_one_question(self, question_id: int)-> AnswerRead:
-        return await self.answer_repo.get_answer_for_question_id(question_id)
+        return await self.question_bank.answers_for_questions(question_ids=[question_id], question_repo=self.question_repo)
 
     # async def update_question(self, question_id: int, question_update: QuestionUpdate) -> QuestionRead:
     #     ...
 
     async def delete_question(self, question_id: int) -> None:
-        ...
\ No newline at end of file
+        await self.question_repo.delete(id=question_id)
+        self.question_bank.invalidate_questions(question_ids=[question_id])
\ No newline at end of file
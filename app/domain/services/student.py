@@ -1,4 +1,5 @@
 from typing import List
+import numpy as np
 from fastapi import Depends
 
 from app.domain.models.student import StudentCreate, StudentRead, StudentKnowledgeRead, StudentToCourseCreate, StudentToCourseRead
@@ -9,6 +10,7 @@ from app.domain.protocols.repositories.student import (
     StudentToCourseRepository as SToCRepoProtocol
     )
 from app.domain.protocols.services.student import StudentService as StudentServiceProtocol
+from app.infrastructure.cache.knowledge_matrix import KnowledgeMatrixCache
 
 from app.domain.models.concept import ConceptBulkRead
 
@@ -24,6 +26,7 @@ class StudentService(StudentServiceProtocol):
         self.student_repo = student_repo
         self.s_k_repo = s_k_repo
         self.s_to_c_repo = s_to_c_repo
+        self.knowledge_cache = KnowledgeMatrixCache()
 
     async def add_student(self, student: StudentCreate) -> StudentRead:
         return await self.student_repo.add(student=student)
@@ -40,3 +43,28 @@ class StudentService(StudentServiceProtocol):
     
     async def get_student_model_from_concepts(self, concepts: ConceptBulkRead, student_id: int):
         return await self.s_k_repo.get_many(concepts=concepts, student_id=student_id)
+
+    async def get_student_knowledge_vector(self, course_id: int, student_id: int, concept_list: List[str]) -> np.ndarray:
+        return await self.knowledge_cache.get_vector(
+            course_id=course_id,
+            student_id=student_id,
+            concepts=concept_list,
+            s_k_repo=self.s_k_repo
+        )
+
+    async def get_students_knowledge_matrix(self, canvas_ids: List[str], concept_list: List[str]) -> np.ndarray:
+        matrix = np.full((len(canvas_ids), len(concept_list)), np.nan)
+        students = await self.student_repo.bulk_get(canvas_ids=canvas_ids)
+        if not students:
+            return matrix
+
+        canvas_rows = {canvas_id: row for row, canvas_id in enumerate(canvas_ids)}
+        student_rows = {student.id: canvas_rows[student.canvas_id] for student in students}
+        concept_cols = {concept: col for col, concept in enumerate(concept_list)}
+
+        scores = await self.s_k_repo.get_all_for_students(student_ids=list(student_rows), concept_list=concept_list)
+        if scores:
+            rows = np.fromiter((student_rows[score.student_id] for score in scores), dtype=np.intp, count=len(scores))
+            cols = np.fromiter((concept_cols[score.concept_name] for score in scores), dtype=np.intp, count=len(scores))
+            matrix[rows, cols] = np.fromiter((score.score for score in scores), dtype=float, count=len(scores))
+        return matrix
@@ -2,6 +2,7 @@ from typing import List
 from fastapi import Depends
 
 from app.infrastructure.database.repositories.trigger_event import TriggerEventRepository
+from app.infrastructure.event_processor.buffer import TriggerEventBuffer
 from app.domain.protocols.repositories.trigger_event import TriggerEventRepository as TriggerEventRepoProtocol
 from app.domain.protocols.services.trigger_event import TriggerEventService as TriggerEventServiceProtocol
 from app.domain.models.trigger_event import TriggerEventCreate, TriggerEventRead
@@ -12,9 +13,16 @@ class TriggerEventService(TriggerEventServiceProtocol):
         trigger_event_repo: TriggerEventRepoProtocol = Depends(TriggerEventRepository)
     ):
         self.trigger_event_repo = trigger_event_repo
+        self.event_buffer = TriggerEventBuffer()
 
     async def add_event(self, event: TriggerEventCreate) -> TriggerEventRead:
         return await self.trigger_event_repo.add(event=event)
     
     async def bulk_add_events(self, events: List[TriggerEventCreate]) -> List[TriggerEventRead]:
         return await self.trigger_event_repo.bulk_add(events=events)
+
+    async def queue_event(self, event: TriggerEventCreate) -> None:
+        if self.event_buffer.running:
+            await self.event_buffer.append(event=event)
+        else:
+            await self.add_event(event=event)
@@ -1,7 +1,3 @@
-import os
-import fitz
-import shutil 
-
 from typing import Optional, List, Union, Dict
 from fastapi import UploadFile, Depends
 
@@ -10,6 +6,7 @@ from app.domain.models.llm_agent import ContextCollection
 from app.domain.models.errors import ErrorResponse
 from app.domain.protocols.services.concept import ConceptService as ConceptServiceProtocol
 from app.domain.services.concept import ConceptService
+from .pdf_extraction import extract_pdf_text
 
 
 register = Register()
@@ -42,21 +39,9 @@ class ActionConstructor:
 
         for file in content_files:
             if file.filename.endswith('.pdf'):
-                # Save the temporary file to disk to open it with fitz
-                temp_file_path = f"temp_{file.filename}"
-                with open(temp_file_path, 'wb') as out_file:
-                    shutil.copyfileobj(file.file, out_file)
-                
-                # Open the PDF and extract text
-                doc = fitz.open(temp_file_path)
-                text = ''
-                for page in doc:
-                    text += page.get_text("text")
-                content.append(text)
-                
-                # Close the document and remove the temporary file
-                doc.close()
-                os.remove(temp_file_path)
+                file.file.seek(0)
+                content.append(extract_pdf_text(file.file.read()))
+                file.file.seek(0)
         return content
     
 
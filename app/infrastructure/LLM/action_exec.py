@@ -1,43 +1,59 @@
 import os
+import asyncio
 import fitz
 import shutil
 import json
-import httpx
-from typing import Optional, List, Union, Dict
+from typing import Optional, List, Union, Dict, Callable, Tuple, AsyncIterator
 from fastapi import UploadFile, Depends
 import logging
-from sqlmodel import select
 
-from app.infrastructure.database.db import get_db
 from app.infrastructure.decorators.register import Register
 from app.domain.models.llm_agent import ContextCollection
 from app.domain.models.errors import ErrorResponse
 from app.domain.protocols.services.concept import ConceptService as ConceptServiceProtocol
 from app.domain.services.concept import ConceptService
-from app.domain.models.prompt import Prompt
 
-from langchain_community.chat_models.openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from app.config.environment import get_settings
+from app.infrastructure.cache.content_cache import ContentCache
+from app.infrastructure.cache.prompts import PromptCache
+from .clients import get_clients, provider_of
+from .chunking import count_tokens, fits, pack_by_tokens
+from .telemetry import CallTimer, current_action, log_payload
+
 load_dotenv()
 
+_SETTINGS = get_settings()
+
 register = Register()
+_EMPTY_PROMPT = {"editable_part": "", "fixed_part": "", "text": ""}
+# Actions that can stream their response, see ActionExecutor.stream
+stream_register = Register()
+
+
+def _json_object(response: str) -> Optional[dict]:
+    """
+    Returns the parsed response if it is a JSON object, None otherwise
+    """
+    try:
+        parsed = json.loads(response)
+    except (TypeError, ValueError):
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
 
 class ActionExecutor:
 
     def __init__(self):
         self.prompts = {}
-        self.db = get_db()
 
-    def fetch_prompts(self):
+    async def fetch_prompts(self):
         """
-        Fetches the prompts from the database and stores them in a dictionary.
+        Points self.prompts at the process wide prompt cache, which only queries the database if a prompt changed since it was loaded.
         """
-        prompts_list = self.db.exec(select(Prompt)).all()
-        self.prompts = {prompt.id: {"editable_part": prompt.editable_part, "fixed_part": prompt.fixed_part} for prompt in prompts_list}
-        logging.debug(f"Fetched prompts: {self.prompts}")
+        self.prompts = await PromptCache().get_all()
 
     def get_prompt_by_id(self, prompt_id: str) -> dict:
         """
@@ -45,9 +61,14 @@ class ActionExecutor:
         Inputs:
             prompt_id (str): The ID of the prompt to retrieve.
         Output:
-            dict: The prompt dictionary containing editable_part and fixed_part.
+            dict: The prompt dictionary containing editable_part, fixed_part and their concatenation as text.
+                  Empty parts if there is no such prompt.
         """
-        return self.prompts.get(prompt_id, "")
+        prompt = self.prompts.get(prompt_id)
+        if prompt is None:
+            logging.warning(f"No prompt with id: {prompt_id}, using an empty prompt")
+            return _EMPTY_PROMPT
+        return prompt
 
     async def executePrompt(self, context_prompt, action_prompt, model_name):
         """
@@ -60,61 +81,236 @@ class ActionExecutor:
 
         Output:
             str: The result from the model.
+
+        Calls go through the loop's long lived provider clients, see clients.py, and wait while LLM_MAX_CONCURRENCY calls to the provider are in flight.
         """
-        base_prompt = self.get_prompt_by_id("base-prompt")
-        base_prompt = base_prompt["editable_part"] + base_prompt["fixed_part"] + " json"
+        provider = provider_of(model_name)
+        clients = get_clients()
+        timer = CallTimer(model=model_name, provider=provider, prompt_tokens=self._prompt_tokens(context_prompt, action_prompt))
+        log_payload("prompt", f"{context_prompt}\n{action_prompt}")
 
-        if 'gpt' in model_name:
-            chain_gpt = ChatOpenAI(model=model_name, openai_api_key=os.getenv("OPENAI_API_KEY"), model_kwargs={"response_format": {"type": "json_object"}})
-            messages=[
-                {"role": "system", "content": base_prompt},
-                {"role": "assistant", "content": context_prompt},
-                {"role": "user", "content": action_prompt}
-            ]
-            result = await chain_gpt.ainvoke(messages)
-            return result.content
+        result = None
+        try:
+            async with clients.limit(provider):
+                timer.start()
+                result = await self._send_prompt(provider, clients, context_prompt, action_prompt, model_name)
+        finally:
+            timer.finish(response_tokens=count_tokens(result) if result else 0, status="ok" if result is not None else "error")
 
-        elif 'gemini' in model_name:    
-            chain_gemini = ChatGoogleGenerativeAI(model=model_name, google_api_key=os.getenv("GOOGLE_API_KEY"))
-            messages=[
-                HumanMessage(content=f"{action_prompt}+ Please perform the action based on the base prompt: {base_prompt}+ context_prompt{context_prompt}")
-            ]
-            result = await chain_gemini.ainvoke(messages)
+        log_payload("response", result)
+        return result
+
+    async def _send_prompt(self, provider: str, clients, context_prompt: str, action_prompt: str, model_name: str) -> str:
+        if provider == "llama":
+            response = await clients.http_client(provider).post(
+                _SETTINGS.LLAMA_API_URL,
+                headers=self._llama_headers(),
+                json=self._llama_payload(context_prompt, action_prompt, stream=False)
+            )
+            response.raise_for_status()
+            result = response.json()
+            return result["choices"][0]["message"]["content"]
+
+        result = await clients.chat_model(model_name).ainvoke(self._chat_messages(provider, context_prompt, action_prompt))
+        if provider == "gemini":
             res = result.content
             start_index = res.find('{')
             end_index = res.rfind('}')
             res = res[start_index:end_index+1]
             return res.strip()
+        return result.content
 
-        elif 'llama' in model_name:
-            url = "https://traip13.dsmlp.ucsd.edu/v1/chat/completions"
-            api_key = os.getenv('TRITON_API_KEY')
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}"
-            }
-            payload = {
-                "messages": [
-                    {"role": "system", "content": base_prompt},
-                    {"role": "user", "content": context_prompt + "\n" + action_prompt}
-                ],
-                "model": "llama-3",
-                "max_tokens": 768,
-                "stream": False,
-                "n": 1,
-                "temperature": 0.2,
-                "frequency_penalty": 0.1,
-                "presence_penalty": 0.1
-            }
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(url, headers=headers, json=payload)
+    async def streamPrompt(self, context_prompt, action_prompt, model_name) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of executePrompt, yields the pieces of the model's response as they arrive.
+        Unlike executePrompt the gemini response is not trimmed to its outermost braces, readers of the stream skip any text around the JSON.
+        """
+        provider = provider_of(model_name)
+        clients = get_clients()
+        timer = CallTimer(model=model_name, provider=provider, prompt_tokens=self._prompt_tokens(context_prompt, action_prompt), streamed=True)
+        log_payload("prompt", f"{context_prompt}\n{action_prompt}")
+
+        pieces = []
+        completed = False
+        try:
+            async with clients.limit(provider):
+                timer.start()
+                async for delta in self._stream_prompt(provider, clients, context_prompt, action_prompt, model_name):
+                    pieces.append(delta)
+                    yield delta
+            completed = True
+        finally:
+            response = "".join(pieces)
+            timer.finish(response_tokens=count_tokens(response), status="ok" if completed else "error")
+            log_payload("response", response)
+
+    async def _stream_prompt(self, provider: str, clients, context_prompt: str, action_prompt: str, model_name: str) -> AsyncIterator[str]:
+        if provider == "llama":
+            async with clients.http_client(provider).stream(
+                "POST",
+                _SETTINGS.LLAMA_API_URL,
+                headers=self._llama_headers(),
+                json=self._llama_payload(context_prompt, action_prompt, stream=True)
+            ) as response:
                 response.raise_for_status()
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+            return
+
+        async for chunk in clients.chat_model(model_name).astream(self._chat_messages(provider, context_prompt, action_prompt)):
+            if chunk.content:
+                yield chunk.content
+
+    def _prompt_tokens(self, context_prompt: str, action_prompt: str) -> int:
+        return count_tokens(self._base_prompt()) + count_tokens(context_prompt) + count_tokens(action_prompt)
+
+    def _base_prompt(self) -> str:
+        return self.get_prompt_by_id("base-prompt")["text"] + " json"
+
+    def _chat_messages(self, provider: str, context_prompt: str, action_prompt: str) -> list:
+        base_prompt = self._base_prompt()
+        if provider == "gemini":
+            return [
+                HumanMessage(content=f"{action_prompt}+ Please perform the action based on the base prompt: {base_prompt}+ context_prompt{context_prompt}")
+            ]
+        return [
+            {"role": "system", "content": base_prompt},
+            {"role": "assistant", "content": context_prompt},
+            {"role": "user", "content": action_prompt}
+        ]
+
+    def _llama_headers(self) -> dict:
+        api_key = os.getenv('TRITON_API_KEY')
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        }
+
+    def _llama_payload(self, context_prompt: str, action_prompt: str, stream: bool) -> dict:
+        return {
+            "messages": [
+                {"role": "system", "content": self._base_prompt()},
+                {"role": "user", "content": context_prompt + "\n" + action_prompt}
+            ],
+            "model": "llama-3",
+            "max_tokens": 768,
+            "stream": stream,
+            "n": 1,
+            "temperature": 0.2,
+            "frequency_penalty": 0.1,
+            "presence_penalty": 0.1
+        }
+
+    async def cached_prompt(self, action: str, context_prompt: str, action_prompt: str, model_name: str) -> str:
+        """
+        Executes the prompt unless the same prompt was answered before with a JSON object, see ContentCache.prompt_key.
+        """
+        content_cache = ContentCache()
+        key = content_cache.prompt_key(
+            action=action,
+            model_name=model_name,
+            prompt=json.dumps([self.get_prompt_by_id("base-prompt"), context_prompt, action_prompt])
+        )
+        result = await content_cache.get(key)
+        if result is None:
+            result = await self.executePrompt(context_prompt, action_prompt, model_name)
+            if _json_object(result) is not None:
+                await content_cache.put(key, kind="chunk", value=result)
+        return result
+
+    async def map_chunks(
+            self,
+            action: str,
+            chunks: List[str],
+            build_prompts: Callable[[str], Tuple[str, str]],
+            model_name: str
+    ) -> List[str]:
+        """
+        Sends one prompt per chunk concurrently, at most LLM_MAP_CONCURRENCY at a time.
+        Inputs:
+            action (str): The action being executed, scopes the chunk cache.
+            chunks (List[str]): The chunks of material.
+            build_prompts (Callable): Returns the context and action prompt for a chunk.
+            model_name (str): The name of the model to be used.
+        Output:
+            List[str]: The model's response for each chunk, in order.
+        """
+        semaphore = asyncio.Semaphore(_SETTINGS.LLM_MAP_CONCURRENCY)
+
+        async def run(chunk: str) -> str:
+            context_prompt, action_prompt = build_prompts(chunk)
+            async with semaphore:
+                return await self.cached_prompt(action, context_prompt, action_prompt, model_name)
+
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks), return_exceptions=True)
+        failed = [result for result in results if isinstance(result, BaseException)]
+        if failed:
+            logging.error(f"{len(failed)} of {len(chunks)} chunks failed for action: {action}, the completed chunks are cached for a retry")
+            raise failed[0]
+        return results
+
+    async def summarize_map_reduce(self, texts: List[str], action_prompt: str, model_name: str) -> Tuple[str, str]:
+        """
+        Summarizes materials too large for a single prompt. The chunks are summarized concurrently, then the partial
+        summaries are packed and summarized again, level by level, until they fit into the final prompt.
+        Output:
+            tuple: The final prompt and the model's response.
+        """
+        async def summarize_chunks(chunks: List[str]) -> List[str]:
+            partials = await self.map_chunks(
+                action="summarize",
+                chunks=chunks,
+                build_prompts=lambda chunk: (
+                    f"The following is one part of the materials being taught in the course. Summarize only this part: {chunk}",
+                    action_prompt
+                ),
+                model_name=model_name
+            )
+            return [(_json_object(partial) or {}).get("summary") or partial for partial in partials]
+
+        summaries = await summarize_chunks(pack_by_tokens(texts, model_name))
+        while not fits(summaries, model_name):
+            chunks = pack_by_tokens(summaries, model_name)
+            # Stop once the summaries can not be packed any tighter, the final prompt is then sent as is
+            if len(chunks) >= len(summaries):
+                break
+            summaries = await summarize_chunks(chunks)
+
+        context_prompt = f"The following is context related to the course being taught. These are summaries of consecutive parts of the materials being taught: {summaries}"
+        result = await self.executePrompt(context_prompt, action_prompt, model_name)
+        return f"{context_prompt}\n{action_prompt}", result
+
+    async def concepts_map_reduce(self, texts: List[str], context_concepts, action_prompt: str, model_name: str) -> Tuple[str, str]:
+        """
+        Extracts concepts from materials too large for a single prompt. Concepts are extracted from the chunks concurrently
+        and the lists are merged in order of first appearance, dropping case insensitive duplicates, without a further LLM call.
+        Output:
+            tuple: The prompt template sent for each chunk and a JSON response in the format of a single call.
+        """
+        context_template = "The following is context related to the course being taught. These are the materials being taught: {chunk}, These are the concepts in the database already: {context_concepts}"
+        partials = await self.map_chunks(
+            action="domain-concepts",
+            chunks=pack_by_tokens(texts, model_name),
+            build_prompts=lambda chunk: (context_template.format(chunk=chunk, context_concepts=context_concepts), action_prompt),
+            model_name=model_name
+        )
+
+        concepts, seen = [], set()
+        for partial in partials:
+            for concept in (_json_object(partial) or {}).get("concepts") or []:
+                if isinstance(concept, str) and concept.strip().lower() not in seen:
+                    seen.add(concept.strip().lower())
+                    concepts.append(concept)
+
+        return f"{context_template}\n{action_prompt}", json.dumps({"concepts": concepts})
 
-        else:
-            raise ValueError("Unsupported AI provider")
-        
     @register.add(action="summarize")
     async def summarize_contents(self, context:Union[ContextCollection, ErrorResponse], params = Dict):
         """
@@ -130,12 +326,13 @@ class ActionExecutor:
             return
         model_name = params.get('model_name')
         summarize_prompt = self.get_prompt_by_id("summarize")
-        context_prompt = f"The following is context related to the course being taught. These are the materials being taught: {context.file_contents}"      
         action_prompt = ( params.get('prompt') or '')+ summarize_prompt["fixed_part"]
-        print("The action prompt is: ", action_prompt)
+        if not fits(context.file_contents, model_name):
+            return await self.summarize_map_reduce(texts=context.file_contents, action_prompt=action_prompt, model_name=model_name)
+
+        context_prompt = f"The following is context related to the course being taught. These are the materials being taught: {context.file_contents}"      
         result = await self.executePrompt(context_prompt, action_prompt, model_name)
         built_prompt = f"{context_prompt}\n{action_prompt}"
-        print(built_prompt)
         return built_prompt, result
 
     @register.add(action="domain-concepts")
@@ -153,11 +350,18 @@ class ActionExecutor:
             return
         model_name = params.get('model_name')
         createconcepts_prompt = self.get_prompt_by_id("create-concepts")
-        context_prompt = f"The following is context related to the course being taught. These are the materials being taught: {context.file_contents}, These are the concepts in the database already: {context.context_concepts}" 
         action_prompt = createconcepts_prompt["editable_part"] + createconcepts_prompt["fixed_part"]
+        if not fits(context.file_contents, model_name):
+            return await self.concepts_map_reduce(
+                texts=context.file_contents,
+                context_concepts=context.context_concepts,
+                action_prompt=action_prompt,
+                model_name=model_name
+            )
+
+        context_prompt = f"The following is context related to the course being taught. These are the materials being taught: {context.file_contents}, These are the concepts in the database already: {context.context_concepts}" 
         result = await self.executePrompt(context_prompt, action_prompt, model_name)
         built_prompt = f"{context_prompt}\n{action_prompt}"
-        print(built_prompt)
         return built_prompt, result
     
     @register.add(action="module-concepts-alone")
@@ -188,7 +392,6 @@ class ActionExecutor:
             return ErrorResponse(code=404, type="ValidationError", message="The module concepts were not returned in the proper format.")
         
         built_prompt = f"{context_prompt}\n{action_prompt}"
-        print(built_prompt)
         return built_prompt, module_concepts
 
     @register.add(action="module-concepts")
@@ -229,28 +432,16 @@ class ActionExecutor:
             'module_concepts': module_concepts
         }
         built_prompt = f"{context_prompt}\n{action_prompt}"
-        print(built_prompt)
         return built_prompt, concepts
 
-    @register.add(action="questions")
-    async def quiz_questions(self, context:Union[ContextCollection, ErrorResponse], params: dict):
+    def quiz_question_prompts(self, context: ContextCollection, params: dict) -> Tuple[str, str]:
         """
-        Generates quiz questions based on the focus concepts provided in the context.
-        Inputs:
-            context (ContextCollection): Includes the base prompt and focus concepts.
-            params (dict, optional): Additional parameters (not currently used).
-        Output:
-            str: List of quiz questions for each focus concept, usually in a text format.
+        Builds the context and action prompts of the 'questions' action.
         """
-        if isinstance(context, ErrorResponse):
-            print(f"Error: {context}")
-            return
-        model_name = params.get('model_name')
         quiz_type = params.get('quiz_type')
         prereq_question_prompt = self.get_prompt_by_id("prereq-questions")
         preview_question_prompt = self.get_prompt_by_id("preview-questions")
         review_question_prompt = self.get_prompt_by_id("review-questions")
-        print(model_name)
         context_prompt = f"The following is context related to the action you will be asked to take.These are the concepts that we are focusing on: {context.focus_concepts}"
         if quiz_type == "prereq":
             action_prompt = f"Please generate {params.get('num_questions')} questions based on the focus concepts provided." + params.get('prompt') + prereq_question_prompt["fixed_part"]
@@ -260,19 +451,62 @@ class ActionExecutor:
             action_prompt = f"Please generate {params.get('num_questions')} questions based on the focus concepts provided." + params.get('prompt') + review_question_prompt["fixed_part"]    
         else:
             print("Invalid quiz type")
+        return context_prompt, action_prompt
+
+    @register.add(action="questions")
+    async def quiz_questions(self, context:Union[ContextCollection, ErrorResponse], params: dict):
+        """
+        Generates quiz questions based on the focus concepts provided in the context.
+        Inputs:
+            context (ContextCollection): Includes the base prompt and focus concepts.
+            params (dict, optional): Additional parameters (not currently used).
+        Output:
+            str: List of quiz questions for each focus concept, usually in a text format.
+        """
+        if isinstance(context, ErrorResponse):
+            print(f"Error: {context}")
+            return
+        model_name = params.get('model_name')
+        context_prompt, action_prompt = self.quiz_question_prompts(context, params)
         result = await self.executePrompt(context_prompt, action_prompt, model_name)
         built_prompt = f"{context_prompt}\n{action_prompt}"
-        print(built_prompt)
         return built_prompt, result
 
-    async def execute(self, context: Union[ContextCollection, ErrorResponse], action: str, params: Optional[Dict]=None):
+    @stream_register.add(action="questions")
+    async def stream_quiz_questions(self, context: ContextCollection, params: dict) -> Tuple[str, AsyncIterator[str]]:
+        """
+        Streaming counterpart of quiz_questions.
+        Output:
+            tuple: The built prompt and an async iterator over the pieces of the model's response.
+        """
+        context_prompt, action_prompt = self.quiz_question_prompts(context, params)
+        built_prompt = f"{context_prompt}\n{action_prompt}"
+        return built_prompt, self.streamPrompt(context_prompt, action_prompt, params.get('model_name'))
+
+    async def execute(self, context: Union[ContextCollection, ErrorResponse], action: str, params: Optional[Dict]=None, fetch_prompts: bool=True):
         """
         Dispatches the request to the appropriate function based on the action parameter.
         Inputs:
             action (str): Action name to identify the function to be executed.
             params (dict, optional): Parameters for the action function.
+            fetch_prompts (bool, optional): Refetches the prompts first, pass False if fetch_prompts() was just called.
         Output:
             any: Result of the function execution, varies based on the action.
         """
-        self.fetch_prompts()
+        if fetch_prompts:
+            await self.fetch_prompts()
+        current_action.set(action)
         return await register.registered_fn[action](self=self, context=context, params=params)
+
+    async def stream(self, context: ContextCollection, action: str, params: Optional[Dict]=None, fetch_prompts: bool=True):
+        """
+        Streaming counterpart of execute, only the actions registered with stream_register support it.
+        Output:
+            tuple: The built prompt and an async iterator over the pieces of the model's response.
+        """
+        if action not in stream_register.registered_fn:
+            raise ValueError(f"Action: {action} does not support streaming")
+        if fetch_prompts:
+            await self.fetch_prompts()
+        current_action.set(action)
+        return await stream_register.registered_fn[action](self=self, context=context, params=params)
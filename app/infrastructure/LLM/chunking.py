@@ -0,0 +1,80 @@
+import logging
+from functools import lru_cache
+from typing import List
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.config.environment import get_settings
+from .clients import provider_of
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # Falls back to the ~4 characters per token rule of thumb
+    tiktoken = None
+
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of text under cl100k_base, close enough for the other providers' tokenizers when sizing chunks
+    """
+    if tiktoken is None:
+        return len(text) // _CHARS_PER_TOKEN + 1
+    return len(_encoding().encode(text, disallowed_special=()))
+
+
+def token_budget(model_name: str) -> int:
+    """
+    No of tokens of material a single prompt to the model may carry, leaving room for the prompts and the response
+    """
+    return _SETTINGS.LLM_CHUNK_TOKENS[provider_of(model_name)]
+
+
+@lru_cache
+def _splitter(chunk_tokens: int) -> RecursiveCharacterTextSplitter:
+    overlap = min(_SETTINGS.LLM_CHUNK_OVERLAP_TOKENS, chunk_tokens // 4)
+    if tiktoken is None:
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_tokens * _CHARS_PER_TOKEN,
+            chunk_overlap=overlap * _CHARS_PER_TOKEN
+        )
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name="cl100k_base", chunk_size=chunk_tokens, chunk_overlap=overlap
+    )
+
+
+def fits(texts: List[str], model_name: str) -> bool:
+    return sum(count_tokens(text) for text in texts) <= token_budget(model_name)
+
+
+def pack_by_tokens(texts: List[str], model_name: str) -> List[str]:
+    """
+    Groups the texts into as few chunks as the model's token budget allows, keeping their order.
+    Texts over the budget are first split on paragraphs, then lines, then words.
+    """
+    budget = token_budget(model_name)
+    chunks, current, current_tokens = [], [], 0
+    for text in texts:
+        pieces = [text] if count_tokens(text) <= budget else _splitter(budget).split_text(text)
+        for piece in pieces:
+            tokens = count_tokens(piece)
+            if current and current_tokens + tokens > budget:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+
+    logger.debug(f"Packed {len(texts)} texts into {len(chunks)} chunks of at most {budget} tokens")
+    return chunks
@@ -0,0 +1,121 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict
+
+import httpx
+from openai import AsyncOpenAI
+from langchain_community.chat_models.openai import ChatOpenAI
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.config.environment import get_settings
+
+_SETTINGS = get_settings()
+
+# Same reasoning as the db engines: httpx connections and asyncio semaphores belong to the loop that created them,
+# so the request handlers share the server loop's clients and each worker thread's loop gets its own.
+_CLIENTS: Dict[asyncio.AbstractEventLoop, "LoopClients"] = {}
+_CLIENTS_LOCK = Lock()
+
+
+def provider_of(model_name: str) -> str:
+    if 'gpt' in model_name:
+        return "openai"
+    elif 'gemini' in model_name:
+        return "gemini"
+    elif 'llama' in model_name:
+        return "llama"
+    raise ValueError("Unsupported AI provider")
+
+
+def _http_client() -> httpx.AsyncClient:
+    """
+    Keep-alive connection pool, sized to the provider's concurrency limit so a waiting call never opens an extra connection
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(_SETTINGS.LLM_REQUEST_TIMEOUT_SECONDS, connect=_SETTINGS.LLM_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=_SETTINGS.LLM_MAX_CONCURRENCY,
+            max_keepalive_connections=_SETTINGS.LLM_MAX_CONCURRENCY,
+            keepalive_expiry=_SETTINGS.LLM_KEEPALIVE_SECONDS
+        )
+    )
+
+
+@dataclass
+class LoopClients:
+    """
+    The long lived clients of one event loop: a pooled http client and a concurrency limit per provider
+    and a chat model per model_name.
+    """
+    http: Dict[str, httpx.AsyncClient] = field(default_factory=dict)
+    limits: Dict[str, asyncio.Semaphore] = field(default_factory=dict)
+    models: Dict[str, Any] = field(default_factory=dict)
+
+    def http_client(self, provider: str) -> httpx.AsyncClient:
+        if provider not in self.http:
+            self.http[provider] = _http_client()
+        return self.http[provider]
+
+    def limit(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self.limits:
+            self.limits[provider] = asyncio.Semaphore(_SETTINGS.LLM_MAX_CONCURRENCY)
+        return self.limits[provider]
+
+    def chat_model(self, model_name: str) -> Any:
+        if model_name in self.models:
+            return self.models[model_name]
+
+        provider = provider_of(model_name)
+        if provider == "openai":
+            openai_client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=_SETTINGS.OPENAI_API_URL,
+                max_retries=_SETTINGS.LLM_MAX_RETRIES,
+                http_client=self.http_client(provider)
+            )
+            model = ChatOpenAI(
+                model=model_name,
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                async_client=openai_client.chat.completions,
+                model_kwargs={"response_format": {"type": "json_object"}}
+            )
+        elif provider == "gemini":
+            model = ChatGoogleGenerativeAI(
+                model=model_name,
+                google_api_key=os.getenv("GOOGLE_API_KEY"),
+                timeout=_SETTINGS.LLM_REQUEST_TIMEOUT_SECONDS,
+                max_retries=_SETTINGS.LLM_MAX_RETRIES
+            )
+        else:
+            raise ValueError(f"No chat model for provider: {provider}")
+
+        self.models[model_name] = model
+        return model
+
+    async def aclose(self) -> None:
+        for client in self.http.values():
+            await client.aclose()
+
+
+def get_clients() -> LoopClients:
+    """
+    Returns the LLM clients of the running loop, creating them on first use
+    """
+    loop = asyncio.get_running_loop()
+    with _CLIENTS_LOCK:
+        clients = _CLIENTS.get(loop)
+        if clients is None:
+            clients = _CLIENTS[loop] = LoopClients()
+    return clients
+
+
+async def close_clients() -> None:
+    """
+    Closes the pooled connections of the running loop's LLM clients
+    """
+    with _CLIENTS_LOCK:
+        clients = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if clients is not None:
+        await clients.aclose()
@@ -19,9 +19,14 @@ from app.domain.protocols.repositories.course import CourseRepository as CourseR
 from app.infrastructure.database.repositories.concept import ConceptRepository, ConceptToDomainRepository, ConceptToModuleRepository, ConceptToConceptRepository
 
 from app.infrastructure.database.repositories.course import CourseRepository
+from app.infrastructure.database.db import get_db
+from app.infrastructure.cache.concept_graph import ConceptGraphCache
+from app.config.environment import get_settings
 
 
 
+_SETTINGS = get_settings()
+
 register = Register()
 
 
@@ -35,11 +40,12 @@ class ContextConstructor:
         self.course_id = course_id
         self.module_id = module_id
         self.file_contents = content_files
-        self.concept_repo: ConceptRepositoryProtocol = ConceptRepository()
-        self.c_to_d_repo: CToDRepoProtocol = ConceptToDomainRepository()
-        self.c_to_m_repo: CToMRepoProtocol = ConceptToModuleRepository()
-        self.c_to_c_repo: CToCRepoProtocol = ConceptToConceptRepository()
-        self.course_repo: CourseRepoProtocol = CourseRepository()
+        # Bound to a session only while construct() runs, see there
+        self.concept_repo: Optional[ConceptRepositoryProtocol] = None
+        self.c_to_d_repo: Optional[CToDRepoProtocol] = None
+        self.c_to_m_repo: Optional[CToMRepoProtocol] = None
+        self.c_to_c_repo: Optional[CToCRepoProtocol] = None
+        self.course_repo: Optional[CourseRepoProtocol] = None
     
 
     @register.add(action="summarize")
@@ -100,12 +106,14 @@ class ContextConstructor:
         if params.get("quiz_type") == "prereq":
             #TODO: error handling for when module_id invalid/get_all_module_prereqs() fails
             module_concepts = await self.c_to_m_repo.get_all(module_id=self.module_id)
-            concept_junctions = await self.c_to_c_repo.get_some(concepts=module_concepts)
-
             module_concept_list = [val.name for val in module_concepts.concepts]
-            prereq_list = list(set([val.prereq_name for val in concept_junctions]))
 
-            concepts = [val for val in prereq_list if val not in module_concept_list]
+            if _SETTINGS.CONCEPT_GRAPH_IN_MEMORY:
+                graph = await ConceptGraphCache().get(c_to_c_repo=self.c_to_c_repo)
+                concepts = graph.prerequisite_frontier(module_concepts=module_concept_list, hops=params.get("hops", 1))
+            else:
+                closure = await self.c_to_c_repo.get_closure(module_id=self.module_id, max_depth=params.get("hops", 1))
+                concepts = [val for val in dict.fromkeys(junction.prereq_name for junction in closure) if val not in module_concept_list]
 
         else:
             #TODO: error handling for when module_id invalid/get_all_concepts_in_module() fails
@@ -119,4 +127,12 @@ class ContextConstructor:
 
 
     async def construct(self, action: str, params: Optional[Dict]={}) -> ContextCollection:
-        return await register.registered_fn[action](self=self, params=params)
\ No newline at end of file
+        # The context is read before the LLM call, closing the session here returns its connection to the pool instead of
+        # holding it idle in transaction for the length of the call
+        async with get_db() as db:
+            self.concept_repo = ConceptRepository(db=db)
+            self.c_to_d_repo = ConceptToDomainRepository(db=db)
+            self.c_to_m_repo = ConceptToModuleRepository(db=db)
+            self.c_to_c_repo = ConceptToConceptRepository(db=db)
+            self.course_repo = CourseRepository(db=db)
+            return await register.registered_fn[action](self=self, params=params)
\ No newline at end of file
@@ -9,10 +9,12 @@ logger = logging.getLogger(__name__)
 async def format_questions(response, validator_status, params):
     try:
         questions = []
+        # Streamed items are formatted one at a time, the offset keeps their positions in order
+        position_offset = (params or {}).get("position_offset", 0)
         for index, question in enumerate(response['questions']):
             question_obj = QuestionCreate(
                     **question, 
-                    position=index+1, 
+                    position=position_offset+index+1, 
                     question_type="multiple_choice_question",
                     points_possible=5
                     )
@@ -32,7 +34,7 @@ async def format_questions(response, validator_status, params):
             )
 
 
-async def check_answer(response, index, item):
+async def check_answer(item):
     # Expected structure for answers
     expected_answers = {
         "answer_text": str,
@@ -42,13 +44,14 @@ async def check_answer(response, index, item):
 
     answer_list = item.get("answers")
 
-    # If there are no answers or the answers are not a list, remove the question
+    # If there are no answers or the answers are not a list, the caller removes the question
     if not answer_list or not isinstance(answer_list, list):
-        response["questions"].pop(index)
-        return
+        return "FAIL", item
 
     # Loop through each answer and check its structure
     for a_index, answer in enumerate(answer_list):
+        if not isinstance(answer, dict):
+            return "FAIL", item
         if all(expected_answers[key] == type(answer.get(key)) for key in expected_answers):
             continue
         else:
@@ -67,10 +70,9 @@ async def check_answer(response, index, item):
                     elif key == "answer_feedback":
                         new_answer[key] = value if isinstance(value, str) else "No feedback provided"
 
-            response["questions"][index]["answers"][a_index] = new_answer
-
-    return "PASS", response
+            answer_list[a_index] = new_answer
 
+    return "PASS", item
 
 
 async def check_contents_question_list(self, response, validator_status, prompt, action, params):
@@ -90,14 +92,15 @@ async def check_contents_question_list(self, response, validator_status, prompt,
     | Response is not a dictionary with the key 'questions' | Safe | No Effect |
     | Value at key 'questions' is not a list | Safe | No Effect |
     | List is empty | Deadly | LLMResponseError |
-    | List value not a dictionary | Safe | Checks if value is unprocessed JSON, processes if it is, otherwise it is removed |
-    | Object is missing a required key | Safe | Adds the key and value either with an alternative value from the object not already assigned to a correct key or with a placeholder |
+    | List value not a dictionary | Safe | Checks if value is unprocessed JSON, processes if it is, otherwise it is removed and kept in failed_items |
+    | Object is missing a required key or has no valid answers | Safe | Removed and kept in failed_items for repair_question_list |
+    | Answer is missing a key | Safe | Adds the key with a placeholder value |
     """
     
     if not isinstance(response, dict) or 'questions' not in response:
         self.error_response = "Response is not a dictionary with the key 'questions'"
-    print("check_contents_question_list: FAIL - No 'questions' key")
-    return "FAIL", response
+        print("check_contents_question_list: FAIL - No 'questions' key")
+        return "FAIL", response
     
     if not isinstance(response["questions"], list):
         self.error_response = f"Response value at key 'questions' is not a list. Received: {type(response['questions'])}"
@@ -122,15 +125,22 @@ async def check_contents_question_list(self, response, validator_status, prompt,
         "answers": list
     }
 
+    # Single pass, invalid items are left out of the new list rather than removed while iterating
+    valid_items = []
+    self.failed_items = []
+    errors = []
     for index, item in enumerate(response['questions']):
         if not isinstance(item, dict):
             try:
                 item = json.loads(item)
-                response['questions'][index] = item
             except (TypeError, json.JSONDecodeError):
-                self.error_response = f"Item at index {index} is not a valid dictionary or JSON"
+                errors.append(f"Item at index {index} is not a valid dictionary or JSON")
                 print(f"check_contents_question_list: FAIL - Invalid dict/JSON at index {index}")
-                response["questions"].remove(item)
+                self.failed_items.append(item)
+                continue
+            if not isinstance(item, dict):
+                errors.append(f"Item at index {index} is not a valid dictionary or JSON")
+                self.failed_items.append(item)
                 continue
 
         # Remove correct_comments and incorrect_comments if they exist
@@ -139,19 +149,65 @@ async def check_contents_question_list(self, response, validator_status, prompt,
 
         dict_check = {key: isinstance(item.get(key), expected_keys[key]) for key in expected_keys}
         if all(dict_check.values()):
-            status, response = await check_answer(response, index, item)
-            if status == "FAIL":
-                print(f"check_contents_question_list: FAIL - Answers check failed at index {index}")
-                response["questions"].remove(item)
+            status, item = await check_answer(item)
+            if status == "PASS":
+                valid_items.append(item)
+                continue
+            errors.append(f"Item at index {index} has no valid answers")
+            print(f"check_contents_question_list: FAIL - Answers check failed at index {index}")
         else:
-            self.error_response = f"Item at index {index} is missing required keys or has incorrect types"
+            errors.append(f"Item at index {index} is missing required keys or has incorrect types")
             print(f"check_contents_question_list: FAIL - Missing/incorrect keys at index {index}")
-            response["questions"].remove(item)
+        self.failed_items.append(item)
+
+    response['questions'] = valid_items
+    if self.failed_items:
+        self.error_response = " - ".join(errors)
+        return "FAIL", response
 
     print("check_contents_question_list: PASS")
     return "PASS", response
 
 
+async def repair_question_list(self, response, validator_status, prompt, action, params, reask):
+    """
+    ---
+    Repair Function
+    ---
+
+    Repairs a failed check_contents_question_list by re-asking the LLM for replacements of just the items it dropped,
+    in the context of the original prompt, instead of regenerating every question.
+    The replacements are validated by check_contents_question_list and the valid ones appended to the response.
+    Fails if any replacement is still invalid, the valid questions are kept either way.
+    """
+    failed_items = self.failed_items
+    if not failed_items:
+        return await check_contents_question_list(self=self, response=response, validator_status=validator_status, prompt=prompt, action=action, params=params)
+
+    instruction = (
+        f"The following {len(failed_items)} questions you generated are malformed: {json.dumps(failed_items, default=str)}. "
+        f"Generate exactly {len(failed_items)} replacement questions on the same concepts, in the same JSON format with the key 'questions', "
+        f"without repeating these questions which were kept: {json.dumps([item.get('question_text') for item in response['questions']])}"
+    )
+    try:
+        replacement = json.loads(await reask(instruction))
+    except Exception:
+        logger.exception(msg="Failed to re-ask the LLM for malformed questions")
+        self.error_response = f"Dropped {len(failed_items)} malformed questions, re-asking the LLM failed"
+        return "FAIL", response
+
+    kept = response['questions']
+    if not isinstance(replacement, dict) or not isinstance(replacement.get('questions'), list) or not replacement['questions']:
+        self.error_response = f"Dropped {len(failed_items)} malformed questions, the LLM returned no replacements"
+        return "FAIL", response
+
+    status, replacement = await check_contents_question_list(
+        self=self, response=replacement, validator_status=validator_status, prompt=prompt, action=action, params=params
+    )
+    response['questions'] = kept + replacement['questions'][:len(failed_items)]
+    return status, response
+
+
 async def check_has_key_questions(self, response, validator_status, prompt, action, params):
     """
     ---
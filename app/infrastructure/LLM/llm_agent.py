@@ -1,21 +1,28 @@
-from typing import List, Optional, Dict, Union
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, List, Optional, Dict, Tuple, Union
 from fastapi import UploadFile
-import os
 from dotenv import load_dotenv
-import fitz  # Import PyMuPDF
-import shutil 
 
 from app.app.errors.file_process_error import FileProcessError
+from app.app.errors.llm_response_error import LLMResponseError
 
-from app.domain.models.llm_agent import action_options, ContingencyFunctions
+from app.domain.models.llm_agent import action_options, ContingencyFunctions, ContextCollection
 from app.domain.protocols.infrastructure.llm_agent import LLMAgent as LLMAgentProtocol
 from app.domain.models.errors import ErrorResponse
 
 from .action_exec import ActionExecutor
 from .context_constructor import ContextConstructor
+from .pdf_extraction import extract_pdf_text, aextract_pdf_text
+from .streaming import JSONItemStream
+from .validation import ValidationEngine, Reask
+from .telemetry import LLMTelemetry
+from app.infrastructure.cache.content_cache import ContentCache, sha256_hex
+from app.infrastructure.cache.prompts import PromptCache
 load_dotenv()
 
-
+logger = logging.getLogger(__name__)
 
 
 class LLMAgent(LLMAgentProtocol):
@@ -32,44 +39,79 @@ class LLMAgent(LLMAgentProtocol):
 
         self.course_id = course_id
         self.module_id = module_id
-        self.content_files = self.process_files(content_files)
+        # Extracted on the first execute() so the PDFs are read off the event loop
+        self.pending_files = content_files
+        self.content_files = None
+        # SHA-256 of each processed PDF, identifies the documents in the content cache keys
+        self.file_hashes = []
+        self.content_cache = ContentCache()
         self.context_constructor = ContextConstructor(content_files=self.content_files, course_id=self.course_id, module_id=self.module_id)
         self.action_executor = ActionExecutor()
+        # ValidationReport of the last response run through the contingency system
+        self.validation_report = None
 
 
     def process_files(self, content_files) -> Union[List[str], None]:
         """
         Process PDF files in content_files, extracting text and storing it in processed_text.
         Each call to this method resets and repopulates processed_text with new content.
+        PDFs are read from the upload stream in memory and their pages extracted across the PDF extraction pool.
         """
         # Initialize or reset processed_text each time the method is called
         content = []
+        file_hashes = []
         if not content_files:
-            print("No files to process.")
+            logger.info("No files to process.")
             return None
         
         for file in content_files:
             try:
                 if file.filename.endswith('.pdf'):
-                    # Save the temporary file to disk to open it with fitz
-                    temp_file_path = f"temp_{file.filename}"
-                    with open(temp_file_path, 'wb') as out_file:
-                        shutil.copyfileobj(file.file, out_file)
-                    
-                    # Open the PDF and extract text
-                    doc = fitz.open(temp_file_path)
-                    text = ''
-                    for page in doc:
-                        text += page.get_text("text")
-                    content.append(text)
-                    
-                    # Close the document and remove the temporary file
-                    doc.close()
-                    os.remove(temp_file_path)
+                    file.file.seek(0)
+                    data = file.file.read()
+                    file_hashes.append(sha256_hex(data))
+                    content.append(extract_pdf_text(data))
+                    file.file.seek(0)
             except Exception as e:
                 raise FileProcessError(message=str(e), file=file)
+        self.file_hashes = file_hashes
         return content
 
+    async def aprocess_files(self, content_files) -> Union[List[str], None]:
+        """
+        Async counterpart of process_files, the files are extracted concurrently without blocking the event loop.
+        The text of a file whose bytes were extracted before is read from the content cache instead.
+        """
+        if not content_files:
+            logger.info("No files to process.")
+            return None
+
+        async def extract(file: UploadFile) -> Optional[tuple]:
+            if not file.filename.endswith('.pdf'):
+                return None
+            try:
+                await file.seek(0)
+                data = await file.read()
+                await file.seek(0)
+                file_hash = sha256_hex(data)
+                text = await self.content_cache.get_text(file_hash)
+                if text is None:
+                    text = await aextract_pdf_text(data)
+                    await self.content_cache.put_text(file_hash, text)
+                return file_hash, text
+            except Exception as e:
+                raise FileProcessError(message=str(e), file=file)
+
+        extracted = [result for result in await asyncio.gather(*(extract(file) for file in content_files)) if result is not None]
+        self.file_hashes = [file_hash for file_hash, _ in extracted]
+        return [text for _, text in extracted]
+
+    async def process_pending_files(self) -> None:
+        if self.pending_files:
+            self.content_files = await self.aprocess_files(content_files=self.pending_files)
+            self.context_constructor.file_contents = self.content_files
+            self.pending_files = None
+
 
     async def add_param(
             self, 
@@ -79,7 +121,9 @@ class LLMAgent(LLMAgentProtocol):
         ) -> None:
         self.course_id = course_id if course_id else self.course_id
         self.module_id = module_id if module_id else self.module_id
-        self.content_files = self.process_files(content_files=content_files) if content_files else self.content_files
+        if content_files:
+            self.content_files = await self.aprocess_files(content_files=content_files)
+            self.pending_files = None
 
         self.context_constructor = ContextConstructor(
             content_files=self.content_files, 
@@ -95,41 +139,28 @@ class LLMAgent(LLMAgentProtocol):
         action: action_options, 
         contingency_functions: ContingencyFunctions,
         params: Dict, 
-        add_cycles: int
+        add_cycles: int,
+        reask: Optional[Reask] = None
         ):
         
-        validation_response = response
-
-        max_cycles = add_cycles + 2
-        cycles = 0
-
-        while cycles != max_cycles:
-            # filter for only failed validators and sort by order
-            sorted_validators = [validator for validator in contingency_functions.validators if validator.status == "FAIL"]
-            sorted_validators.sort(key=lambda x: x.order)
-            if not sorted_validators:
-                cycles = max_cycles
-                break
-            else:
-                for validator in sorted_validators:
-                    status, new_response = await validator.function(
-                        self=validator, 
-                        response=validation_response,
-                        validator_status=contingency_functions.validators, 
-                        prompt=prompt, 
-                        action=action, 
-                        params=params
-                        )
-                    validator.status = status
-                    validation_response = new_response
+        result, self.validation_report = await ValidationEngine(
+            contingency_functions=contingency_functions,
+            add_cycles=add_cycles
+        ).run(response=response, prompt=prompt, action=action, params=params, reask=reask)
+        LLMTelemetry().record_validation(self.validation_report)
+        return result
 
-            cycles += 1
+    def reask_for(self, prompt: str, params: Optional[Dict]) -> Optional[Reask]:
+        """
+        Returns a callable that sends a follow up instruction to the model of the action, with the original prompt as its context
+        """
+        model_name = (params or {}).get('model_name')
+        if not model_name:
+            return None
 
-        return await contingency_functions.formatter(
-            response=validation_response, 
-            validator_status=contingency_functions.validators, 
-            params=params
-            )
+        async def reask(instruction: str) -> str:
+            return await self.action_executor.executePrompt(context_prompt=prompt, action_prompt=instruction, model_name=model_name)
+        return reask
                 
 
     async def execute(
@@ -140,18 +171,114 @@ class LLMAgent(LLMAgentProtocol):
         add_cycles:int=0
         ):
         
+        await self.process_pending_files()
         context = await self.context_constructor.construct(action=action, params=params)
-        prompt, response = await self.action_executor.execute(action=action, context=context, params=params)
-        print("The prompt being sent is:", prompt)
-        print("The response being sent is:", response)
+        await self.action_executor.fetch_prompts()
+
+        cache_key = None
+        if isinstance(context, ContextCollection):
+            cache_key = self.content_cache.llm_key(
+                action=action,
+                params=params,
+                context=context,
+                file_hashes=self.file_hashes,
+                prompts_fingerprint=await PromptCache().fingerprint()
+            )
+        cached = await self.content_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        prompt, response = await self.action_executor.execute(action=action, context=context, params=params, fetch_prompts=False)
         response = await self.runContingencies(
             response=response, 
             prompt=prompt, 
             action=action, 
             contingency_functions=contingency_functions, 
             params=params,
-            add_cycles=add_cycles
+            add_cycles=add_cycles,
+            reask=self.reask_for(prompt=prompt, params=params)
             )
-        
-        print(response)
+
+        # Only outputs that passed every validator are reused
+        if not isinstance(response, ErrorResponse) and all(validator.status == "PASS" for validator in contingency_functions.validators):
+            await self.content_cache.put(cache_key, kind="llm", value=response)
+
         return response
+
+    async def validate_item(
+        self,
+        item: Any,
+        item_key: str,
+        position_offset: int,
+        prompt: str,
+        action: action_options,
+        contingency_functions: ContingencyFunctions,
+        params: Dict
+    ) -> List:
+        """
+        Runs the contingency system on a single streamed item as if it were the only one in the response.
+        Each item gets its own copy of the validators so their statuses don't leak between items.
+        """
+        return await self.runContingencies(
+            response=json.dumps({item_key: [item]}),
+            prompt=prompt,
+            action=action,
+            contingency_functions=contingency_functions.copy(deep=True),
+            params={**(params or {}), "position_offset": position_offset},
+            add_cycles=0
+        ) or []
+
+    async def stream(
+        self,
+        action: action_options,
+        contingency_functions: ContingencyFunctions,
+        params: Optional[dict]=None,
+        item_key: str="questions"
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming counterpart of execute, yields ('item', formatted_item) as soon as each item of the response list closes,
+        ('error', message) for items the contingency system rejects and finally ('done', no_of_items).
+        A response in which no item could be streamed is validated as a whole once complete, like execute does.
+        """
+        await self.process_pending_files()
+        context = await self.context_constructor.construct(action=action, params=params)
+        prompt, deltas = await self.action_executor.stream(action=action, context=context, params=params)
+
+        parser = JSONItemStream()
+        emitted = 0
+        async for delta in deltas:
+            for item in parser.feed(delta):
+                try:
+                    formatted = await self.validate_item(
+                        item=item,
+                        item_key=item_key,
+                        position_offset=emitted,
+                        prompt=prompt,
+                        action=action,
+                        contingency_functions=contingency_functions,
+                        params=params
+                    )
+                except LLMResponseError as e:
+                    yield "error", str(e)
+                    continue
+
+                if not formatted:
+                    yield "error", f"Dropped an invalid item from the response: {json.dumps(item)[:200]}"
+                for result in formatted:
+                    emitted += 1
+                    yield "item", result
+
+        if not emitted:
+            formatted = await self.runContingencies(
+                response=parser.response,
+                prompt=prompt,
+                action=action,
+                contingency_functions=contingency_functions.copy(deep=True),
+                params=params,
+                add_cycles=0
+            )
+            for result in formatted or []:
+                emitted += 1
+                yield "item", result
+
+        yield "done", emitted
@@ -0,0 +1,101 @@
+"""
+PDF text extraction for uploaded content files.
+
+PDFs are opened straight from memory and their pages are split into contiguous ranges extracted across a process pool,
+so large documents neither block the event loop nor hold the GIL. Page chunks are yielded in document order as they
+complete, callers that need the whole text join them with extract_pdf_text/aextract_pdf_text.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from app.config.environment import get_settings
+from .pdf_worker import count_pages, extract_page_range
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            workers = _SETTINGS.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+            # Spawned rather than forked, forking a process that runs worker threads and event loops is unsafe
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Started PDF extraction pool with {workers} processes")
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+def page_ranges(page_count: int) -> List[Tuple[int, int]]:
+    """
+    Splits the pages into about two ranges per pool process, each at least PDF_PAGES_PER_TASK pages long
+    as every task receives its own copy of the document
+    """
+    workers = _SETTINGS.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+    size = max(_SETTINGS.PDF_PAGES_PER_TASK, -(-page_count // (workers * 2)), 1)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def iter_pdf_pages(data: bytes) -> Iterator[str]:
+    """
+    Yields the text of the PDF one page chunk at a time, in order. Documents of up to PDF_PAGES_PER_TASK pages are
+    extracted in the calling thread as the pool overhead outweighs the work
+    """
+    page_count = count_pages(data)
+    if page_count <= _SETTINGS.PDF_PAGES_PER_TASK:
+        yield extract_page_range(data, 0, page_count)
+        return
+
+    pool = get_pool()
+    futures = [pool.submit(extract_page_range, data, start, stop) for start, stop in page_ranges(page_count)]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+async def aiter_pdf_pages(data: bytes) -> AsyncIterator[str]:
+    """
+    Async counterpart of iter_pdf_pages, the event loop stays free while the pages are extracted
+    """
+    page_count = await asyncio.to_thread(count_pages, data)
+    if page_count <= _SETTINGS.PDF_PAGES_PER_TASK:
+        yield await asyncio.to_thread(extract_page_range, data, 0, page_count)
+        return
+
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    futures = [loop.run_in_executor(pool, extract_page_range, data, start, stop) for start, stop in page_ranges(page_count)]
+    try:
+        for future in futures:
+            yield await future
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_text(data: bytes) -> str:
+    return "".join(iter_pdf_pages(data))
+
+
+async def aextract_pdf_text(data: bytes) -> str:
+    return "".join([chunk async for chunk in aiter_pdf_pages(data)])
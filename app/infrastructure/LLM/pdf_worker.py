@@ -0,0 +1,19 @@
+"""
+Functions run in the PDF extraction pool processes.
+
+Spawned processes import this module to unpickle the tasks, so it only imports PyMuPDF, never the app or its settings.
+"""
+import fitz  # Import PyMuPDF
+
+
+def extract_page_range(data: bytes, start: int, stop: int) -> str:
+    """
+    Returns the text of pages [start, stop) of the PDF. Runs in the pool processes, so it only takes picklable arguments
+    """
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "".join([doc[page].get_text("text") for page in range(start, stop)])
+
+
+def count_pages(data: bytes) -> int:
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return doc.page_count
@@ -0,0 +1,79 @@
+import json
+import logging
+from typing import Any, List
+
+logger = logging.getLogger(__name__)
+
+
+class JSONItemStream:
+    """
+    Incremental JSON scanner for responses shaped like {"questions": [{...}, {...}]}.
+
+    Text is fed as it streams in and every object that is an element of an array held by the top level object is returned
+    as soon as its closing brace arrives, e.g. each questions[i]. Text before the first '{' is skipped so providers that
+    wrap the JSON in prose or code fences still stream. Each character is scanned once.
+    """
+    def __init__(self):
+        self.text = []
+        self._buffer = ""
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+        self._started = False
+
+    def feed(self, delta: str) -> List[Any]:
+        """
+        Scans the next piece of the response, returns the items it completed in order
+        """
+        self.text.append(delta)
+        offset = len(self._buffer)
+        self._buffer += delta
+        items = []
+
+        for index in range(offset, len(self._buffer)):
+            char = self._buffer[index]
+            if not self._started:
+                if char != '{':
+                    continue
+                self._started = True
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                # An item is an object directly inside an array directly inside the top level object
+                if char == '{' and self._stack == ['{', '[']:
+                    self._item_start = index
+                self._stack.append(char)
+            elif char in '}]' and self._stack:
+                self._stack.pop()
+                if char == '}' and self._stack == ['{', '['] and self._item_start is not None:
+                    item = self._buffer[self._item_start:index + 1]
+                    self._item_start = None
+                    try:
+                        items.append(json.loads(item))
+                    except ValueError:
+                        logger.warning(f"Skipped unparsable streamed item: {item[:200]}")
+
+        # Only the item in progress is needed for further scanning
+        keep_from = self._item_start if self._item_start is not None else len(self._buffer)
+        if self._item_start is not None:
+            self._item_start = 0
+        self._buffer = self._buffer[keep_from:]
+        return items
+
+    @property
+    def response(self) -> str:
+        """
+        The full response received so far
+        """
+        return "".join(self.text)
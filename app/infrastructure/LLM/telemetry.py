@@ -0,0 +1,222 @@
+import json
+import logging
+import random
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict, field
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from app.config.environment import get_settings
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# Action being executed by the running task, set by ActionExecutor so executePrompt can label its calls
+current_action: ContextVar[str] = ContextVar("llm_action", default="unknown")
+# LLM calls made while handling the current request, started by LLMTraceMiddleware
+current_trace: ContextVar[Optional["LLMTrace"]] = ContextVar("llm_trace", default=None)
+
+_LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+_WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+@dataclass
+class LLMCall:
+    action: str
+    model: str
+    provider: str
+    prompt_tokens: int
+    response_tokens: int
+    # Time spent waiting for the provider's concurrency limit
+    queue_wait_seconds: float
+    latency_seconds: float
+    status: str = "ok"
+    streamed: bool = False
+    cost_usd: float = 0.0
+
+
+@dataclass
+class LLMTrace:
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    calls: List[LLMCall] = field(default_factory=list)
+    validator_runs: int = 0
+    reasked_items: int = 0
+
+    def summary(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "calls": len(self.calls),
+            "prompt_tokens": sum(call.prompt_tokens for call in self.calls),
+            "response_tokens": sum(call.response_tokens for call in self.calls),
+            "queue_wait_seconds": round(sum(call.queue_wait_seconds for call in self.calls), 3),
+            "latency_seconds": round(sum(call.latency_seconds for call in self.calls), 3),
+            "cost_usd": round(sum(call.cost_usd for call in self.calls), 6),
+            "validator_runs": self.validator_runs,
+            "reasked_items": self.reasked_items,
+        }
+
+    def log(self, description: str) -> Dict:
+        """
+        Logs the trace with every call in it, returns its summary
+        """
+        summary = self.summary()
+        logger.info(f"LLM trace {description} {json.dumps({**summary, 'calls': [asdict(call) for call in self.calls]})}")
+        return summary
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class LLMTelemetry:
+    """
+    In process LLM call metrics following the Singleton pattern, rendered in the Prometheus text format by render().
+    Series are labelled by action, model and provider. Retries made inside the provider SDKs are not visible here,
+    re-asks made by repair functions are counted as reasked items.
+    """
+    _telemetry = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._telemetry:
+            cls._telemetry = super(LLMTelemetry, cls).__new__(cls, *args, **kwargs)
+        return cls._telemetry
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self._lock = Lock()
+            self.calls: Dict[Tuple[str, ...], int] = {}
+            self.prompt_tokens: Dict[Tuple[str, ...], int] = {}
+            self.response_tokens: Dict[Tuple[str, ...], int] = {}
+            self.cost: Dict[Tuple[str, ...], float] = {}
+            self.latency: Dict[Tuple[str, ...], _Histogram] = {}
+            self.queue_wait: Dict[Tuple[str, ...], _Histogram] = {}
+            self.validator_runs: Dict[str, int] = {}
+            self.loop_validator_runs: Dict[str, int] = {}
+            self.reasked_items: Dict[str, int] = {}
+            self.initialized = True
+
+    def record_call(self, call: LLMCall) -> None:
+        labels = (call.action, call.model, call.provider)
+        with self._lock:
+            self.calls[labels + (call.status,)] = self.calls.get(labels + (call.status,), 0) + 1
+            self.prompt_tokens[labels] = self.prompt_tokens.get(labels, 0) + call.prompt_tokens
+            self.response_tokens[labels] = self.response_tokens.get(labels, 0) + call.response_tokens
+            self.cost[labels] = self.cost.get(labels, 0.0) + call.cost_usd
+            self.latency.setdefault(labels, _Histogram(_LATENCY_BUCKETS)).observe(call.latency_seconds)
+            self.queue_wait.setdefault(labels, _Histogram(_WAIT_BUCKETS)).observe(call.queue_wait_seconds)
+
+        trace = current_trace.get()
+        if trace is not None:
+            trace.calls.append(call)
+        logger.info(f"LLM call {json.dumps(asdict(call))}")
+
+    def record_validation(self, report) -> None:
+        """
+        Records a ValidationReport of the contingency system
+        """
+        with self._lock:
+            self.validator_runs[report.action] = self.validator_runs.get(report.action, 0) + report.validator_runs
+            self.loop_validator_runs[report.action] = self.loop_validator_runs.get(report.action, 0) + report.loop_validator_runs
+            self.reasked_items[report.action] = self.reasked_items.get(report.action, 0) + report.reasked_items
+
+        trace = current_trace.get()
+        if trace is not None:
+            trace.validator_runs += report.validator_runs
+            trace.reasked_items += report.reasked_items
+
+    def render(self) -> str:
+        lines = []
+
+        def labels(names, values) -> str:
+            return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+        def counter(name, help_text, series, names):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} counter"])
+            lines.extend(f"{name}{{{labels(names, key if isinstance(key, tuple) else (key,))}}} {value}" for key, value in series.items())
+
+        def histogram(name, help_text, series):
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} histogram"])
+            for key, hist in series.items():
+                base = labels(("action", "model", "provider"), key)
+                cumulative = 0
+                for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{base},le="{"+Inf" if bound == float("inf") else bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{base}}} {hist.sum}")
+                lines.append(f"{name}_count{{{base}}} {cumulative}")
+
+        with self._lock:
+            counter("aspire_llm_calls_total", "LLM calls by outcome.", self.calls, ("action", "model", "provider", "status"))
+            counter("aspire_llm_prompt_tokens_total", "Tokens sent to the LLM.", self.prompt_tokens, ("action", "model", "provider"))
+            counter("aspire_llm_response_tokens_total", "Tokens received from the LLM.", self.response_tokens, ("action", "model", "provider"))
+            counter("aspire_llm_cost_usd_total", "Estimated cost of LLM calls from LLM_TOKEN_PRICES.", self.cost, ("action", "model", "provider"))
+            histogram("aspire_llm_latency_seconds", "Provider latency of LLM calls.", self.latency)
+            histogram("aspire_llm_queue_wait_seconds", "Time LLM calls waited for the provider concurrency limit.", self.queue_wait)
+            counter("aspire_llm_validator_runs_total", "Validator runs of the contingency system.", self.validator_runs, ("action",))
+            counter("aspire_llm_loop_validator_runs_total", "Validator runs the previous validation loop would have made.", self.loop_validator_runs, ("action",))
+            counter("aspire_llm_reasked_items_total", "Items re-asked from the LLM by repair functions.", self.reasked_items, ("action",))
+
+        return "\n".join(lines) + "\n"
+
+
+def log_payload(label: str, text) -> None:
+    """
+    Logs a prompt or response for LLM_LOG_SAMPLE_RATE of the calls, cut to LLM_LOG_MAX_CHARS.
+    Replaces printing whole prompts, which for large materials cost more than the rest of the request handling.
+    """
+    if random.random() >= _SETTINGS.LLM_LOG_SAMPLE_RATE:
+        return
+    text = text if isinstance(text, str) else str(text)
+    cut = text[:_SETTINGS.LLM_LOG_MAX_CHARS]
+    logger.info(json.dumps({
+        "label": label,
+        "action": current_action.get(),
+        "chars": len(text),
+        "truncated": len(text) > len(cut),
+        "text": cut,
+    }))
+
+
+class CallTimer:
+    """
+    Measures one LLM call: the wait for the provider's concurrency limit, then the provider latency.
+    """
+    def __init__(self, model: str, provider: str, prompt_tokens: int, streamed: bool = False):
+        self.model = model
+        self.provider = provider
+        self.prompt_tokens = prompt_tokens
+        self.streamed = streamed
+        self.created = time.perf_counter()
+        self.acquired = None
+
+    def start(self) -> None:
+        self.acquired = time.perf_counter()
+
+    def finish(self, response_tokens: int, status: str = "ok") -> None:
+        now = time.perf_counter()
+        acquired = self.acquired if self.acquired is not None else now
+        prices = _SETTINGS.LLM_TOKEN_PRICES.get(self.model, {})
+        cost = (self.prompt_tokens * prices.get("prompt", 0.0) + response_tokens * prices.get("response", 0.0)) / 1e6
+        LLMTelemetry().record_call(LLMCall(
+            action=current_action.get(),
+            model=self.model,
+            provider=self.provider,
+            prompt_tokens=self.prompt_tokens,
+            response_tokens=response_tokens,
+            queue_wait_seconds=acquired - self.created,
+            latency_seconds=now - acquired,
+            status=status,
+            streamed=self.streamed,
+            cost_usd=cost
+        ))
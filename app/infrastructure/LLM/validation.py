@@ -0,0 +1,149 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.domain.models.llm_agent import ContingencyFunctions, Validator
+
+from .chunking import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Re-asks the LLM with a follow up instruction in the context of the original prompt, returns the raw response
+Reask = Callable[[str], Awaitable[str]]
+
+
+@dataclass
+class ValidationReport:
+    """
+    Work done validating one response, next to what the cycle loop it replaces would have done.
+    """
+    action: str
+    validator_runs: int = 0
+    # Runs the previous loop would have made: every validator once, then every failed one again in each of add_cycles + 2 cycles
+    loop_validator_runs: int = 0
+    reasked_items: int = 0
+    reask_tokens: int = 0
+    # Tokens of the original prompt and response, i.e. the cost of regenerating the whole response instead
+    regeneration_tokens: int = 0
+    failed_validators: List[str] = field(default_factory=list)
+
+    def __str__(self):
+        return (
+            f"action: {self.action} | validator runs: {self.validator_runs} (cycle loop: {self.loop_validator_runs}) | "
+            f"re-asked items: {self.reasked_items} using ~{self.reask_tokens} tokens (full regeneration: ~{self.regeneration_tokens}) | "
+            f"failed: {self.failed_validators}"
+        )
+
+
+def resolve_order(validators: List[Validator]) -> Tuple[List[Validator], Dict[str, List[str]]]:
+    """
+    Sorts the validators so each one comes after its dependencies, ties are broken by order. Also returns the dependencies by validator name.
+    A validator without depends_on depends on the validators of the next lower order, which keeps the chains declared before dependencies existed.
+    """
+    by_name = {validator.name: validator for validator in validators}
+    dependencies: Dict[str, List[str]] = {}
+    for validator in validators:
+        if validator.depends_on is not None:
+            unknown = [name for name in validator.depends_on if name not in by_name]
+            if unknown:
+                raise ValueError(f"Validator: {validator.name} depends on unknown validator(s): {unknown}")
+            dependencies[validator.name] = list(validator.depends_on)
+        else:
+            lower = [other.order for other in validators if other.order < validator.order]
+            dependencies[validator.name] = [other.name for other in validators if lower and other.order == max(lower)]
+
+    ordered, done = [], set()
+    pending = sorted(validators, key=lambda validator: validator.order)
+    while pending:
+        ready = [validator for validator in pending if all(name in done for name in dependencies[validator.name])]
+        if not ready:
+            raise ValueError(f"Validators have circular dependencies: {[validator.name for validator in pending]}")
+        ordered.append(ready[0])
+        done.add(ready[0].name)
+        pending.remove(ready[0])
+    return ordered, dependencies
+
+
+class ValidationEngine:
+    """
+    Runs the contingency system in a single pass: each validator runs once, after its dependencies, on the response
+    as left by the validators before it. Validators whose dependencies failed are skipped.
+
+    A failed validator gets one targeted attempt at recovering:
+        - With a repair function and a reask callable, the repair function is called, e.g. to re-ask the LLM for the broken items only.
+        - Otherwise the validator is re-run on the response it returned, which completes validators that fix the response as they fail.
+          add_cycles allows that many further re-runs.
+    """
+    def __init__(self, contingency_functions: ContingencyFunctions, add_cycles: int = 0):
+        self.contingency_functions = contingency_functions
+        self.add_cycles = add_cycles
+        self.validators, self.dependencies = resolve_order(contingency_functions.validators)
+
+    async def run(
+        self,
+        response: Any,
+        prompt: str,
+        action: str,
+        params: Dict,
+        reask: Optional[Reask] = None
+    ) -> tuple:
+        """
+        Returns the formatter's result and a ValidationReport
+        """
+        report = ValidationReport(action=action)
+        if isinstance(response, str):
+            report.regeneration_tokens = count_tokens(prompt or "") + count_tokens(response)
+
+        if reask is not None:
+            reask = self._metered(reask, prompt, report)
+
+        validator_status = self.contingency_functions.validators
+        for validator in validator_status:
+            validator.status = "FAIL"
+            validator.failed_items = []
+
+        cycles = self.add_cycles + 2
+        by_name = {validator.name: validator for validator in self.validators}
+        for validator in self.validators:
+            failed_dependencies = [name for name in self.dependencies[validator.name] if by_name[name].status != "PASS"]
+            if failed_dependencies:
+                validator.error_response = f"Skipped, depends on failed validator(s): {failed_dependencies}"
+                report.loop_validator_runs += cycles
+                continue
+
+            runs = 1
+            status, response = await validator.function(
+                self=validator, response=response, validator_status=validator_status, prompt=prompt, action=action, params=params
+            )
+
+            if status == "FAIL" and validator.repair is not None and reask is not None:
+                runs += 1
+                report.reasked_items += len(validator.failed_items)
+                status, response = await validator.repair(
+                    self=validator, response=response, validator_status=validator_status, prompt=prompt, action=action, params=params, reask=reask
+                )
+            else:
+                while status == "FAIL" and runs < cycles:
+                    runs += 1
+                    status, response = await validator.function(
+                        self=validator, response=response, validator_status=validator_status, prompt=prompt, action=action, params=params
+                    )
+
+            validator.status = status
+            report.validator_runs += runs
+            report.loop_validator_runs += runs if status == "PASS" else cycles
+            if status == "FAIL":
+                report.failed_validators.append(validator.name)
+
+        logger.info(f"Validated LLM response | {report}")
+        result = await self.contingency_functions.formatter(response=response, validator_status=validator_status, params=params)
+        return result, report
+
+    @staticmethod
+    def _metered(reask: Reask, prompt: str, report: ValidationReport) -> Reask:
+        async def metered(instruction: str) -> str:
+            result = await reask(instruction)
+            # The original prompt is resent as context of the instruction
+            report.reask_tokens += count_tokens(prompt or "") + count_tokens(instruction) + count_tokens(result or "")
+            return result
+        return metered
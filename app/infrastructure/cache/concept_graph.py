@@ -0,0 +1,278 @@
+import heapq
+import logging
+import time
+from threading import Lock
+from typing import Dict, Iterable, List, Literal, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config.environment import get_settings
+from app.domain.models.concept import ConceptToConceptBase, ConceptToConceptRead
+from app.domain.protocols.repositories.concept import ConceptToConceptRepository as CToCRepoProtocol
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+def _csr(source: np.ndarray, target: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the indptr and indices arrays of the edges source -> target, the targets of node i are indices[indptr[i]:indptr[i + 1]]
+    """
+    order = np.argsort(source, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=size), out=indptr[1:])
+    return indptr, target[order]
+
+
+def _neighbours(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """
+    Gathers the targets of every node in a single fancy-indexed slice
+    """
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return indices[positions]
+
+
+class ConceptGraph:
+    """
+    Index of the concepttoconcept junctions, concept names are mapped to integer ids and the edges held as CSR arrays
+    in both directions: concept -> its prerequisites and prerequisite -> its dependents.
+
+    Edges are added and removed on a set of id pairs, the CSR arrays are rebuilt from it on the next query without going
+    back to the database. Queries and updates are guarded by a lock as the job workers create junctions from their own threads.
+    """
+    def __init__(self) -> None:
+        self.concept_index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self._edges: Set[Tuple[int, int]] = set()
+        self._built = False
+        self.loaded_at = time.monotonic()
+        self._lock = Lock()
+
+    @classmethod
+    def from_junctions(cls, junctions: Iterable[ConceptToConceptRead]) -> "ConceptGraph":
+        graph = cls()
+        graph.add_edges(junctions)
+        return graph
+
+    def expired(self, ttl: float) -> bool:
+        return time.monotonic() - self.loaded_at > ttl
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edges)
+
+    def _id(self, name: str) -> int:
+        index = self.concept_index.setdefault(name, len(self.concept_index))
+        if index == len(self.names):
+            self.names.append(name)
+        return index
+
+    def _ids(self, names: Iterable[str]) -> np.ndarray:
+        """
+        Ids of the known concepts among names, unknown concepts have no junctions and are left out
+        """
+        return np.array(sorted({self.concept_index[name] for name in names if name in self.concept_index}), dtype=np.int64)
+
+    def add_edges(self, junctions: Iterable[ConceptToConceptBase]) -> None:
+        with self._lock:
+            for junction in junctions:
+                self._edges.add((self._id(junction.concept_name), self._id(junction.prereq_name)))
+            self._built = False
+
+    def remove_edges(self, junctions: Iterable[ConceptToConceptBase]) -> None:
+        with self._lock:
+            for junction in junctions:
+                concept, prereq = self.concept_index.get(junction.concept_name), self.concept_index.get(junction.prereq_name)
+                self._edges.discard((concept, prereq))
+            self._built = False
+
+    def _build(self) -> None:
+        if self._built:
+            return
+
+        size = len(self.names)
+        edges = np.array(sorted(self._edges), dtype=np.int64).reshape(-1, 2)
+        self.concepts, self.prereqs = edges[:, 0], edges[:, 1]
+        self.prereq_indptr, self.prereq_indices = _csr(self.concepts, self.prereqs, size)
+        self.dependent_indptr, self.dependent_indices = _csr(self.prereqs, self.concepts, size)
+        self._built = True
+
+    def _traverse(self, indptr: np.ndarray, indices: np.ndarray, concepts: Iterable[str], hops: Optional[int]) -> List[str]:
+        """
+        Breadth first search from the concepts, one frontier per hop. The concepts themselves are not part of the result.
+        """
+        frontier = self._ids(concepts)
+        distance = np.full(len(self.names), -1, dtype=np.int64)
+        distance[frontier] = 0
+
+        depth = 0
+        while frontier.size and (hops is None or depth < hops):
+            depth += 1
+            reached = np.unique(_neighbours(indptr, indices, frontier))
+            frontier = reached[distance[reached] < 0]
+            distance[frontier] = depth
+
+        found = np.flatnonzero(distance > 0)
+        return [self.names[i] for i in sorted(found, key=lambda i: (distance[i], self.names[i]))]
+
+    def prerequisites(self, concepts: Iterable[str], hops: Optional[int] = None) -> List[str]:
+        """
+        Returns the concepts reachable through prerequisite junctions within hops, all of them if hops is None.
+        Ordered by distance, then name.
+        """
+        with self._lock:
+            self._build()
+            return self._traverse(self.prereq_indptr, self.prereq_indices, concepts, hops)
+
+    def dependents(self, concepts: Iterable[str], hops: Optional[int] = None) -> List[str]:
+        """
+        Returns the concepts depending on the concepts within hops, all of them if hops is None.
+        Ordered by distance, then name.
+        """
+        with self._lock:
+            self._build()
+            return self._traverse(self.dependent_indptr, self.dependent_indices, concepts, hops)
+
+    def prerequisite_frontier(self, module_concepts: Iterable[str], hops: Optional[int] = 1) -> List[str]:
+        """
+        Returns the prerequisites within hops of a module's concepts that are not part of the module,
+        with hops=1 the concepts that are prerequisite to start the module
+        """
+        return self.prerequisites(module_concepts, hops=hops)
+
+    def junctions(self, concepts: Iterable[str], junction_direction: Literal["up", "down", "both"] = "down") -> List[Tuple[str, str]]:
+        """
+        Returns the (concept_name, prereq_name) pairs of the junctions one hop away from the concepts, as ConceptToConceptRepository.get_some
+        """
+        with self._lock:
+            self._build()
+            ids = self._ids(concepts)
+            pairs: Set[Tuple[int, int]] = set()
+            if junction_direction in ("down", "both"):
+                counts = self.prereq_indptr[ids + 1] - self.prereq_indptr[ids]
+                pairs.update(zip(np.repeat(ids, counts).tolist(), _neighbours(self.prereq_indptr, self.prereq_indices, ids).tolist()))
+            if junction_direction in ("up", "both"):
+                counts = self.dependent_indptr[ids + 1] - self.dependent_indptr[ids]
+                pairs.update(zip(_neighbours(self.dependent_indptr, self.dependent_indices, ids).tolist(), np.repeat(ids, counts).tolist()))
+            return [(self.names[concept], self.names[prereq]) for concept, prereq in sorted(pairs)]
+
+    def _reachable(self, indptr: np.ndarray, indices: np.ndarray, start: int) -> np.ndarray:
+        """
+        Ids of every concept reachable from start, start itself is left out even when it lies on a cycle
+        """
+        seen = np.zeros(len(self.names), dtype=bool)
+        frontier = np.array([start], dtype=np.int64)
+        while frontier.size:
+            reached = np.unique(_neighbours(indptr, indices, frontier))
+            frontier = reached[~seen[reached]]
+            seen[frontier] = True
+        seen[start] = False
+        return np.flatnonzero(seen)
+
+    def learning_order(self, concepts: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Orders the concepts, all known concepts if None, so every concept comes after its prerequisites among them.
+        Prerequisites reached through concepts that are not selected count as well, with a -> m -> z, a comes after z.
+        Ties are broken by name. Concepts on a prerequisite cycle cannot be ordered and are appended by name.
+        """
+        with self._lock:
+            self._build()
+            size = len(self.names)
+            if concepts is None:
+                ids = np.arange(size, dtype=np.int64)
+                unknown = []
+                # Every concept is selected, the direct junctions already order them
+                successors = {
+                    i: self.dependent_indices[self.dependent_indptr[i]:self.dependent_indptr[i + 1]].tolist()
+                    for i in ids.tolist()
+                }
+            else:
+                concepts = list(dict.fromkeys(concepts))
+                ids = self._ids(concepts)
+                unknown = sorted(name for name in concepts if name not in self.concept_index)
+                selected = np.zeros(size, dtype=bool)
+                selected[ids] = True
+                # The selected concepts depending on each selected concept, directly or through unselected ones
+                successors = {}
+                for i in ids.tolist():
+                    reached = self._reachable(self.dependent_indptr, self.dependent_indices, i)
+                    successors[i] = reached[selected[reached]].tolist()
+
+            pending = np.zeros(size, dtype=np.int64)
+            for dependents in successors.values():
+                np.add.at(pending, dependents, 1)
+
+            ready = [(self.names[i], i) for i in ids.tolist() if not pending[i]]
+            heapq.heapify(ready)
+            order = []
+            while ready:
+                name, i = heapq.heappop(ready)
+                order.append(name)
+                for dependent in successors[i]:
+                    pending[dependent] -= 1
+                    if not pending[dependent]:
+                        heapq.heappush(ready, (self.names[dependent], dependent))
+
+            cyclic = sorted(self.names[i] for i in ids.tolist() if pending[i] > 0)
+            if cyclic:
+                logger.warning(f"Concepts on a prerequisite cycle left unordered: {cyclic}")
+
+            # Concepts without junctions have no prerequisites and come first
+            return unknown + order + cyclic
+
+
+class ConceptGraphCache:
+    """
+    In memory cache following the Singleton pattern, holds the ConceptGraph of every concepttoconcept junction.
+
+    The graph is loaded with a single query on first use and reloaded once older than CONCEPT_GRAPH_TTL_SECONDS,
+    in between ConceptService writes the junctions it creates and deletes through add() and remove().
+    The TTL bounds staleness from junctions changed by other replicas.
+    """
+    _cache = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._cache:
+            cls._cache = super(ConceptGraphCache, cls).__new__(cls, *args, **kwargs)
+        return cls._cache
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.ttl = _SETTINGS.CONCEPT_GRAPH_TTL_SECONDS
+            self._graph: Optional[ConceptGraph] = None
+            self._lock = Lock()
+            self.initialized = True
+
+    async def get(self, c_to_c_repo: CToCRepoProtocol) -> ConceptGraph:
+        with self._lock:
+            graph = self._graph
+
+        if graph is None or graph.expired(self.ttl):
+            graph = ConceptGraph.from_junctions(await c_to_c_repo.get_all())
+            logger.info(f"Loaded concept graph, {len(graph.names)} concepts x {graph.edge_count} junctions")
+            with self._lock:
+                self._graph = graph
+
+        return graph
+
+    def add(self, junctions: Iterable[ConceptToConceptBase]) -> None:
+        with self._lock:
+            graph = self._graph
+        if graph is not None:
+            graph.add_edges(junctions)
+
+    def remove(self, junctions: Iterable[ConceptToConceptBase]) -> None:
+        with self._lock:
+            graph = self._graph
+        if graph is not None:
+            graph.remove_edges(junctions)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._graph = None
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from app.config.environment import get_settings
+from app.infrastructure.database.db import get_db
+from app.infrastructure.database.repositories.content_cache import ContentCacheRepository
+from app.domain.models.llm_agent import ContextCollection
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _stable_json(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, default=str).encode()
+
+
+class ContentCache:
+    """
+    Content addressed cache following the Singleton pattern, backed by the contentcacheentry table so every replica shares it.
+
+    Holds three kinds of entries:
+        - 'text': the extracted text of a document, keyed by the SHA-256 of its bytes.
+        - 'llm': the validated output of an LLM action, keyed by the SHA-256 of the action, model_name, remaining params,
+          the hashes of the documents and concepts in its context and the prompts used to build it.
+          Editing a prompt therefore misses the cache instead of serving outputs of the old prompt.
+        - 'chunk': the raw LLM response to one map step of a chunked action, keyed by the exact prompt sent,
+          so a run that failed part way only resends the chunks that did not complete.
+
+    Values are stored as UTF-8 JSON, every cached value is a str, dict or list, rows are never deserialized into arbitrary objects.
+    Entries expire CONTENT_CACHE_TTL_SECONDS after being written, the least recently read ones are evicted once the table
+    grows past CONTENT_CACHE_MAX_BYTES. Cache failures, including rows that do not decode, are logged and treated as misses
+    so they never fail a request.
+    """
+    _cache = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._cache:
+            cls._cache = super(ContentCache, cls).__new__(cls, *args, **kwargs)
+        return cls._cache
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.enabled = _SETTINGS.CONTENT_CACHE_ENABLED
+            self.ttl = _SETTINGS.CONTENT_CACHE_TTL_SECONDS
+            self.max_bytes = _SETTINGS.CONTENT_CACHE_MAX_BYTES
+            self.prune_every = _SETTINGS.CONTENT_CACHE_PRUNE_EVERY
+            self.llm_actions = set(_SETTINGS.CONTENT_CACHE_LLM_ACTIONS)
+            self._puts = 0
+            self._lock = Lock()
+            self.initialized = True
+
+    def llm_key(
+            self,
+            action: str,
+            params: Optional[Dict],
+            context: ContextCollection,
+            file_hashes: List[str],
+            prompts_fingerprint: str
+    ) -> Optional[str]:
+        """
+        Returns the cache key of an LLM action, None if the action's outputs are not cached
+        """
+        if not self.enabled or action not in self.llm_actions:
+            return None
+
+        params = dict(params or {})
+        fingerprint = {
+            "action": action,
+            "model_name": params.pop("model_name", None),
+            "params": params,
+            "files": file_hashes,
+            "context_concepts": context.context_concepts,
+            "focus_concepts": context.focus_concepts,
+            "prompts": prompts_fingerprint,
+        }
+        return "llm:" + sha256_hex(_stable_json(fingerprint))
+
+    def prompt_key(self, action: str, model_name: str, prompt: str) -> Optional[str]:
+        """
+        Returns the cache key of a single prompt sent while running an action, e.g. one chunk of a map-reduce summary
+        """
+        if not self.enabled or action not in self.llm_actions:
+            return None
+        return "prompt:" + sha256_hex(_stable_json({"action": action, "model_name": model_name, "prompt": sha256_hex(prompt.encode())}))
+
+    @staticmethod
+    def text_key(file_hash: str) -> str:
+        return "text:" + file_hash
+
+    async def get_text(self, file_hash: str) -> Optional[str]:
+        return await self.get(self.text_key(file_hash))
+
+    async def put_text(self, file_hash: str, text: str) -> None:
+        await self.put(self.text_key(file_hash), kind="text", value=text)
+
+    async def get(self, key: Optional[str]) -> Optional[Any]:
+        if not self.enabled or key is None:
+            return None
+        try:
+            async with get_db() as db:
+                value = await ContentCacheRepository(db=db).get(key=key, ttl=self.ttl)
+            if value is None:
+                return None
+            value = json.loads(value)
+        except Exception:
+            logger.exception(f"Content cache read failed, treating as a miss: {key}")
+            return None
+
+        logger.debug(f"Content cache hit: {key}")
+        return value
+
+    async def put(self, key: Optional[str], kind: str, value: Any) -> None:
+        if not self.enabled or key is None:
+            return
+        try:
+            async with get_db() as db:
+                await ContentCacheRepository(db=db).put(key=key, kind=kind, value=json.dumps(value, separators=(",", ":")).encode())
+                with self._lock:
+                    self._puts += 1
+                    prune = self._puts % self.prune_every == 0
+                if prune:
+                    removed = await ContentCacheRepository(db=db).prune(max_bytes=self.max_bytes, ttl=self.ttl)
+                    logger.info(f"Pruned {removed} content cache entries")
+        except Exception:
+            logger.exception(f"Content cache write failed: {key}")
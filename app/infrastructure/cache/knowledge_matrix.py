@@ -0,0 +1,186 @@
+import logging
+import time
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.config.environment import get_settings
+from app.domain.models.student import StudentKnowledgeScore
+from app.domain.protocols.repositories.student import StudentKnowledgeRepository as StudentKnowledgeRepoProtocol
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeMatrix:
+    """
+    Dense students x concepts arrays holding the score, numerator and denominator of one course's StudentKnowledge entries,
+    with student_id -> row and concept name -> column maps.
+
+    Cells without a StudentKnowledge entry hold NaN. The arrays grow by doubling when a new student or concept is set.
+    Reads and writes are guarded by a lock as the trigger event workers update the matrix from their own threads.
+    """
+    FIELDS = ("score", "numerator", "denominator")
+
+    def __init__(self, course_id: int, student_capacity: int = 64, concept_capacity: int = 64) -> None:
+        self.course_id = course_id
+        self.student_index: Dict[int, int] = {}
+        self.concept_index: Dict[str, int] = {}
+        self.score = np.full((student_capacity, concept_capacity), np.nan)
+        self.numerator = np.full((student_capacity, concept_capacity), np.nan)
+        self.denominator = np.full((student_capacity, concept_capacity), np.nan)
+        self.loaded_at = time.monotonic()
+        self._lock = Lock()
+
+    @classmethod
+    def from_scores(cls, course_id: int, scores: List[StudentKnowledgeScore]) -> "KnowledgeMatrix":
+        student_ids = list(dict.fromkeys(score.student_id for score in scores))
+        concepts = list(dict.fromkeys(score.concept_name for score in scores))
+
+        matrix = cls(course_id=course_id, student_capacity=max(len(student_ids), 64), concept_capacity=max(len(concepts), 64))
+        matrix.student_index = {student_id: row for row, student_id in enumerate(student_ids)}
+        matrix.concept_index = {concept: col for col, concept in enumerate(concepts)}
+
+        if scores:
+            rows = np.fromiter((matrix.student_index[score.student_id] for score in scores), dtype=np.intp, count=len(scores))
+            cols = np.fromiter((matrix.concept_index[score.concept_name] for score in scores), dtype=np.intp, count=len(scores))
+            for field in cls.FIELDS:
+                getattr(matrix, field)[rows, cols] = np.fromiter((getattr(score, field) for score in scores), dtype=float, count=len(scores))
+
+        return matrix
+
+    def expired(self, ttl: float) -> bool:
+        return time.monotonic() - self.loaded_at > ttl
+
+    def has_student(self, student_id: int) -> bool:
+        return student_id in self.student_index
+
+    def _grow(self, rows: int, cols: int) -> None:
+        capacity_rows, capacity_cols = self.score.shape
+        if rows <= capacity_rows and cols <= capacity_cols:
+            return
+
+        new_shape = (max(rows, capacity_rows * 2) if rows > capacity_rows else capacity_rows,
+                     max(cols, capacity_cols * 2) if cols > capacity_cols else capacity_cols)
+        for field in self.FIELDS:
+            grown = np.full(new_shape, np.nan)
+            grown[:capacity_rows, :capacity_cols] = getattr(self, field)
+            setattr(self, field, grown)
+
+    def _index_of(self, student_id: int, concept_name: str) -> tuple:
+        row = self.student_index.setdefault(student_id, len(self.student_index))
+        col = self.concept_index.setdefault(concept_name, len(self.concept_index))
+        self._grow(rows=len(self.student_index), cols=len(self.concept_index))
+        return row, col
+
+    def add_student(self, student_id: int, scores: List[StudentKnowledgeScore]) -> None:
+        """
+        Adds a student row, left all NaN if scores is empty
+        """
+        with self._lock:
+            self.student_index.setdefault(student_id, len(self.student_index))
+            self._grow(rows=len(self.student_index), cols=len(self.concept_index))
+            for score in scores:
+                self._set(score)
+
+    def _set(self, score: StudentKnowledgeScore) -> None:
+        row, col = self._index_of(score.student_id, score.concept_name)
+        self.score[row, col] = score.score
+        self.numerator[row, col] = score.numerator
+        self.denominator[row, col] = score.denominator
+
+    def set(self, score: StudentKnowledgeScore) -> None:
+        with self._lock:
+            self._set(score)
+
+    def vector(self, student_id: int, concepts: List[str], field: str = "score") -> np.ndarray:
+        """
+        Returns the student's values for the concepts, in the order given, as a single fancy-indexed slice.
+        Concepts the student has no entry for, or an unknown student, come back as NaN.
+        """
+        values = np.full(len(concepts), np.nan)
+        with self._lock:
+            row = self.student_index.get(student_id)
+            if row is None:
+                return values
+
+            cols = np.fromiter((self.concept_index.get(concept, -1) for concept in concepts), dtype=np.intp, count=len(concepts))
+            known = cols >= 0
+            values[known] = getattr(self, field)[row, cols[known]]
+        return values
+
+
+class KnowledgeMatrixCache:
+    """
+    In memory cache following the Singleton pattern, holds one KnowledgeMatrix per course.
+
+    A course's matrix is loaded with a single query on first use and reloaded once older than KNOWLEDGE_MATRIX_TTL_SECONDS,
+    in between the trigger event workers of this process write every folded StudentKnowledge entry through apply().
+    The TTL bounds staleness from entries folded by workers in other replicas.
+    """
+    _cache = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._cache:
+            cls._cache = super(KnowledgeMatrixCache, cls).__new__(cls, *args, **kwargs)
+        return cls._cache
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.ttl = _SETTINGS.KNOWLEDGE_MATRIX_TTL_SECONDS
+            self._matrices: Dict[int, KnowledgeMatrix] = {}
+            self._lock = Lock()
+            self.initialized = True
+
+    async def get(self, course_id: int, s_k_repo: StudentKnowledgeRepoProtocol) -> KnowledgeMatrix:
+        with self._lock:
+            matrix = self._matrices.get(course_id)
+
+        if matrix is None or matrix.expired(self.ttl):
+            scores = await s_k_repo.get_all_for_course(course_id=course_id)
+            matrix = KnowledgeMatrix.from_scores(course_id=course_id, scores=scores)
+            logger.info(f"Loaded knowledge matrix for course_id: {course_id}, {len(matrix.student_index)} students x {len(matrix.concept_index)} concepts")
+            with self._lock:
+                self._matrices[course_id] = matrix
+
+        return matrix
+
+    async def get_vector(
+            self,
+            course_id: int,
+            student_id: int,
+            concepts: List[str],
+            s_k_repo: StudentKnowledgeRepoProtocol
+    ) -> np.ndarray:
+        """
+        Returns the student's scores for the concepts, NaN where the student has no entry yet.
+        A student missing from the matrix, e.g. enrolled after it was loaded, is fetched on its own and added.
+        """
+        matrix = await self.get(course_id=course_id, s_k_repo=s_k_repo)
+        if not matrix.has_student(student_id):
+            matrix.add_student(student_id=student_id, scores=await s_k_repo.get_all_for_student(student_id=student_id))
+
+        return matrix.vector(student_id=student_id, concepts=concepts)
+
+    def apply(self, scores: Iterable[StudentKnowledgeScore]) -> None:
+        """
+        Writes updated StudentKnowledge entries into every cached matrix the student belongs to
+        """
+        with self._lock:
+            matrices = list(self._matrices.values())
+        if not matrices:
+            return
+
+        for score in scores:
+            for matrix in matrices:
+                if matrix.has_student(score.student_id):
+                    matrix.set(score)
+
+    def invalidate(self, course_id: Optional[int] = None) -> None:
+        with self._lock:
+            if course_id is None:
+                self._matrices.clear()
+            else:
+                self._matrices.pop(course_id, None)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import logging
+from threading import Lock
+from typing import Dict, Optional
+
+from app.infrastructure.database.db import get_db
+from app.infrastructure.database.repositories.prompt import PromptRepository
+from app.infrastructure.event_processor.notifier import PromptNotifier, start_pg_listener
+from app.config.environment import get_settings
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class PromptCache:
+    """
+    In memory cache of the prompt templates following the Singleton pattern, shared by every ActionExecutor of the process.
+
+    Templates are loaded once and precompiled, each entry holds its editable_part, fixed_part and their concatenation as 'text'.
+    PromptRepository notifies PromptNotifier after every create or update, locally and through Postgres NOTIFY for other replicas,
+    the cache then reloads on its next use. Lookups in between make no DB round trips.
+    """
+    _cache = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._cache:
+            cls._cache = super(PromptCache, cls).__new__(cls, *args, **kwargs)
+        return cls._cache
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.notifier = PromptNotifier()
+            self._prompts: Dict[str, Dict[str, str]] = {}
+            self._fingerprint = ""
+            self._version: Optional[int] = None
+            self._lock = Lock()
+            self.initialized = True
+
+    @property
+    def stale(self) -> bool:
+        return self._version != self.notifier.version
+
+    async def load(self) -> None:
+        # Read before loading so a change committed while loading leaves the cache stale
+        version = self.notifier.version
+        db = get_db()
+        try:
+            prompts = await PromptRepository(db=db).list()
+        finally:
+            await db.close()
+        compiled = {
+            prompt.id: {
+                "editable_part": prompt.editable_part,
+                "fixed_part": prompt.fixed_part,
+                "text": prompt.editable_part + prompt.fixed_part
+            }
+            for prompt in prompts
+        }
+        fingerprint = hashlib.sha256(json.dumps(compiled, sort_keys=True).encode()).hexdigest()
+
+        with self._lock:
+            self._prompts, self._fingerprint, self._version = compiled, fingerprint, version
+        logger.info(f"Loaded {len(compiled)} prompt templates, version: {version}")
+
+    async def get_all(self) -> Dict[str, Dict[str, str]]:
+        """
+        Returns the templates by prompt id, reloading them first if a prompt changed since they were loaded.
+        The dict is replaced rather than mutated on reload so callers can hold on to it.
+        """
+        if self.stale:
+            await self.load()
+        return self._prompts
+
+    async def fingerprint(self) -> str:
+        """
+        SHA-256 of every template, changes whenever a prompt does
+        """
+        if self.stale:
+            await self.load()
+        return self._fingerprint
+
+
+async def start_prompt_cache():
+    await PromptCache().load()
+    if _SETTINGS.PROMPT_LISTEN:
+        start_pg_listener(notifier=PromptNotifier())
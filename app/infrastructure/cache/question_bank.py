@@ -0,0 +1,186 @@
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple
+
+from app.config.environment import get_settings
+from app.domain.models.question import Answer, Question, QuestionAnswerSelection
+from app.domain.protocols.repositories.question import QuestionRepository as QuestionRepoProtocol
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# Field order of the tuples questions and answers are held as
+QUESTION_FIELDS = ("id", "position", "question_name", "question_type", "question_text", "points_possible", "neutral_comments")
+ANSWER_FIELDS = ("id", "answer_text", "answer_weight", "question_id")
+
+
+class _Entry:
+    __slots__ = ("loaded_at", "question", "answers")
+
+    def __init__(self, loaded_at: float, question: tuple, answers: Tuple[tuple, ...]) -> None:
+        self.loaded_at = loaded_at
+        self.question = question
+        self.answers = answers
+
+
+class QuestionBankCache:
+    """
+    Read-through cache of the question bank following the Singleton pattern.
+
+    Questions are grouped by concept (their question_name) and held as tuples along with their answers, both read with a single
+    joined query the first time a concept or question id is asked for. Entries are reloaded once older than QUESTION_BANK_TTL_SECONDS,
+    QuestionService drops the concepts and questions it creates or deletes, the TTL bounds staleness from changes made by other replicas.
+    Every load purges expired entries and evicts the least recently used questions past QUESTION_BANK_MAX_QUESTIONS,
+    along with their concepts so a concept is never served with part of its questions.
+    """
+    _cache = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._cache:
+            cls._cache = super(QuestionBankCache, cls).__new__(cls, *args, **kwargs)
+        return cls._cache
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.ttl = _SETTINGS.QUESTION_BANK_TTL_SECONDS
+            self.max_questions = _SETTINGS.QUESTION_BANK_MAX_QUESTIONS
+            self._concepts: Dict[str, Tuple[float, Tuple[int, ...]]] = {}
+            # Least recently used first
+            self._questions: "OrderedDict[int, _Entry]" = OrderedDict()
+            self._lock = Lock()
+            self.initialized = True
+
+    def _fresh(self, loaded_at: float, now: float) -> bool:
+        return now - loaded_at <= self.ttl
+
+    def _store(self, selections: List[QuestionAnswerSelection], loaded_at: float) -> None:
+        for selection in selections:
+            self._questions[selection.question.id] = _Entry(
+                loaded_at=loaded_at,
+                question=tuple(getattr(selection.question, field) for field in QUESTION_FIELDS),
+                answers=tuple(tuple(getattr(answer, field) for field in ANSWER_FIELDS) for answer in selection.answers)
+            )
+            self._questions.move_to_end(selection.question.id)
+
+    def _drop_question(self, question_id: int) -> None:
+        entry = self._questions.pop(question_id, None)
+        if entry is not None:
+            self._concepts.pop(entry.question[QUESTION_FIELDS.index("question_name")], None)
+
+    def _evict(self, loaded_at: float) -> None:
+        """
+        Purges expired entries, then evicts the least recently used questions until max_questions remain.
+        Entries of the load at loaded_at are kept so the caller can still read them.
+        """
+        for concept in [concept for concept, (concept_loaded_at, _) in self._concepts.items() if not self._fresh(concept_loaded_at, loaded_at)]:
+            del self._concepts[concept]
+        for question_id in [question_id for question_id, entry in self._questions.items() if not self._fresh(entry.loaded_at, loaded_at)]:
+            self._drop_question(question_id)
+
+        evicted = 0
+        while len(self._questions) > self.max_questions:
+            question_id, entry = next(iter(self._questions.items()))
+            if entry.loaded_at == loaded_at:
+                break
+            self._drop_question(question_id)
+            evicted += 1
+        if evicted:
+            logger.debug(f"Evicted {evicted} questions from the question bank cache")
+
+    def _touch(self, question_ids: Iterable[int]) -> None:
+        for question_id in question_ids:
+            if question_id in self._questions:
+                self._questions.move_to_end(question_id)
+
+    async def _load_concepts(self, concepts: List[str], question_repo: QuestionRepoProtocol) -> None:
+        now = time.monotonic()
+        with self._lock:
+            missing = [concept for concept in concepts if not (concept in self._concepts and self._fresh(self._concepts[concept][0], now))]
+        if not missing:
+            return
+
+        selections = await question_repo.get_with_answers(concept_list=missing)
+        grouped: Dict[str, List[int]] = {concept: [] for concept in missing}
+        for selection in selections:
+            grouped.setdefault(selection.question.question_name, []).append(selection.question.id)
+
+        with self._lock:
+            self._store(selections, loaded_at=now)
+            for concept, question_ids in grouped.items():
+                self._concepts[concept] = (now, tuple(question_ids))
+            self._evict(loaded_at=now)
+        logger.debug(f"Loaded {len(selections)} questions of {len(missing)} concepts into the question bank cache")
+
+    async def _load_questions(self, question_ids: List[int], question_repo: QuestionRepoProtocol) -> None:
+        now = time.monotonic()
+        with self._lock:
+            missing = [question_id for question_id in question_ids if not (question_id in self._questions and self._fresh(self._questions[question_id].loaded_at, now))]
+        if not missing:
+            return
+
+        selections = await question_repo.get_with_answers(id_list=missing)
+        with self._lock:
+            self._store(selections, loaded_at=now)
+            self._evict(loaded_at=now)
+        logger.debug(f"Loaded {len(selections)} of {len(missing)} question ids into the question bank cache")
+
+    def _question(self, entry: _Entry) -> Question:
+        return Question(**dict(zip(QUESTION_FIELDS, entry.question)))
+
+    def _answers(self, entry: _Entry) -> List[Answer]:
+        return [Answer(**dict(zip(ANSWER_FIELDS, answer))) for answer in entry.answers]
+
+    async def questions_for_concepts(self, concept_list: List[str], question_repo: QuestionRepoProtocol) -> List[Question]:
+        """
+        Returns the questions of every concept, grouped in the order of concept_list
+        """
+        concepts = list(dict.fromkeys(concept_list))
+        await self._load_concepts(concepts, question_repo=question_repo)
+        with self._lock:
+            question_ids = [question_id for concept in concepts for question_id in self._concepts.get(concept, (0.0, ()))[1]]
+            self._touch(question_ids)
+            entries = [self._questions[question_id] for question_id in question_ids if question_id in self._questions]
+        return [self._question(entry) for entry in entries]
+
+    async def questions_by_id(self, question_ids: List[int], question_repo: QuestionRepoProtocol) -> List[Question]:
+        """
+        Returns the questions in the order of question_ids, unknown ids are left out
+        """
+        await self._load_questions(question_ids, question_repo=question_repo)
+        with self._lock:
+            self._touch(question_ids)
+            entries = [self._questions[question_id] for question_id in question_ids if question_id in self._questions]
+        return [self._question(entry) for entry in entries]
+
+    async def answers_for_questions(self, question_ids: List[int], question_repo: QuestionRepoProtocol) -> List[Answer]:
+        """
+        Returns the answers of every question, grouped in the order of question_ids
+        """
+        await self._load_questions(question_ids, question_repo=question_repo)
+        with self._lock:
+            self._touch(question_ids)
+            entries = [self._questions[question_id] for question_id in question_ids if question_id in self._questions]
+        return [answer for entry in entries for answer in self._answers(entry)]
+
+    def invalidate_concepts(self, concepts: Iterable[str]) -> None:
+        with self._lock:
+            for concept in concepts:
+                _, question_ids = self._concepts.pop(concept, (0.0, ()))
+                for question_id in question_ids:
+                    self._questions.pop(question_id, None)
+
+    def invalidate_questions(self, question_ids: Iterable[int]) -> None:
+        """
+        Drops the questions along with the concepts they belong to
+        """
+        with self._lock:
+            for question_id in question_ids:
+                self._drop_question(question_id)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._concepts.clear()
+            self._questions.clear()
@@ -0,0 +1,47 @@
+from typing import Any, List, Sequence, Tuple
+
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+async def _driver_connection(db: AsyncSession):
+    """
+    Returns the asyncpg connection behind the session's current transaction
+    """
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    return raw.driver_connection
+
+
+async def copy_records(db: AsyncSession, table: str, columns: Sequence[str], records: List[Tuple[Any, ...]]) -> None:
+    """
+    Streams the records into the table with a single COPY, inside the session's transaction
+    """
+    if not records:
+        return
+    driver_connection = await _driver_connection(db)
+    await driver_connection.copy_records_to_table(table, records=records, columns=list(columns))
+
+
+async def copy_to_staging(db: AsyncSession, staging: str, like: str, columns: Sequence[str], records: List[Tuple[Any, ...]]) -> None:
+    """
+    Creates a temporary table shaped like the table `like`, dropped when the transaction ends, and COPYs the records into it.
+    The staging table has no unique constraints, so conflicts are left to the INSERT ... SELECT from it.
+    """
+    # Also opens the transaction, the COPY has to run inside it for the table to still exist
+    await db.exec(statement=text(f"CREATE TEMP TABLE {staging} (LIKE {like} INCLUDING DEFAULTS) ON COMMIT DROP"))
+    await copy_records(db=db, table=staging, columns=columns, records=records)
+
+
+async def allocate_ids(db: AsyncSession, table: str, count: int, column: str = "id") -> List[int]:
+    """
+    Draws count values from the serial sequence of table.column in one round trip, so rows and rows referencing them
+    can be COPYed with their ids already known
+    """
+    if not count:
+        return []
+    result = await db.exec(
+        statement=text("SELECT nextval(pg_get_serial_sequence(:table, :column)) FROM generate_series(1, :count)"),
+        params={"table": table, "column": column, "count": count}
+    )
+    return list(result.scalars().all())
@@ -1,24 +1,151 @@
-from typing import Generator
+import asyncio
+import time
+from functools import lru_cache
+from threading import Lock
+from typing import Any, AsyncIterator, Dict, List
 
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.config.environment import get_settings
 from app.infrastructure.database.seeds import run as seed_db
 
 _SETTINGS = get_settings()
 
-# TODO implement your own database connection(s)
+# One pooled engine per event loop, asyncpg connections can only be used from the loop that opened them.
+# The request handlers share the engine of the server loop, each trigger event worker thread gets its own.
+_ENGINES: Dict[asyncio.AbstractEventLoop, AsyncEngine] = {}
+_ENGINES_LOCK = Lock()
 
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a connection, including time spent opening a new one.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+
+@lru_cache
 def get_engine():
+    """
+    Synchronous psycopg2 engine, only used for DDL and seeding at startup. Built once per process and shared.
+    """
     return create_engine(_SETTINGS.DATABASE1_URL, echo=False)
 
+def get_async_url() -> URL:
+    """
+    DATABASE1_URL with its driver swapped for asyncpg
+    """
+    return make_url(_SETTINGS.DATABASE1_URL).set(drivername="postgresql+asyncpg")
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Returns the pooled engine of the running event loop, creating it on first use.
+    Must be called from inside a running loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(loop)
+        if engine is None:
+            for closed_loop in [key for key in _ENGINES if key.is_closed()]:
+                del _ENGINES[closed_loop]
+
+            engine = create_async_engine(
+                get_async_url(),
+                echo=False,
+                poolclass=TimedQueuePool,
+                pool_size=_SETTINGS.DATABASE_POOL_SIZE,
+                max_overflow=_SETTINGS.DATABASE_POOL_MAX_OVERFLOW,
+                pool_timeout=_SETTINGS.DATABASE_POOL_TIMEOUT,
+                pool_recycle=_SETTINGS.DATABASE_POOL_RECYCLE,
+                pool_pre_ping=_SETTINGS.DATABASE_POOL_PRE_PING
+            )
+            _ENGINES[loop] = engine
+        return engine
+
+
+class LoopBoundSession(Session):
+    """
+    Resolves its engine when a connection is first needed rather than when the session is created,
+    so a repository built on one loop and used from a worker thread's loop still gets a connection from the right pool.
+    """
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return get_async_engine().sync_engine
+
+
 def init_db():
     SQLModel.metadata.bind = get_engine()
 
-def get_db() -> Generator:
-    with Session(get_engine()) as db:
-        return db
-        
+def get_db() -> AsyncSession:
+    """
+    Returns a new session for code running outside a request, the caller is responsible for closing it,
+    preferably with 'async with get_db() as db:' so a session left in a transaction does not hold on to its pooled connection.
+    """
+    # Rows are read back after commit, expiring them would need a lazy load which AsyncSession does not allow
+    return AsyncSession(sync_session_class=LoopBoundSession, expire_on_commit=False)
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    FastAPI dependency yielding a request scoped session, closed once the response is sent so its connection goes back to the pool.
+    Repositories depend on it with use_cache=False so each keeps its own session and transaction, as before.
+    """
+    async with get_db() as db:
+        yield db
+
+def get_pool_metrics() -> List[Dict[str, Any]]:
+    """
+    Returns a snapshot of every engine's connection pool, one entry per event loop.
+    """
+    with _ENGINES_LOCK:
+        pools = [engine.pool for engine in _ENGINES.values()]
+
+    return [
+        {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": pool.checkouts,
+            "timeouts": pool.timeouts,
+            "wait_seconds_total": pool.wait_total,
+            "wait_seconds_avg": pool.wait_total / pool.checkouts if pool.checkouts else 0.0,
+            "wait_seconds_max": pool.wait_max
+        }
+        for pool in pools
+    ]
+
+async def dispose_db() -> None:
+    """
+    Closes the pooled connections of the running loop's engine
+    """
+    with _ENGINES_LOCK:
+        engine = _ENGINES.pop(asyncio.get_running_loop(), None)
+    if engine is not None:
+        await engine.dispose()
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(bind=get_engine())
-    seed_db(get_db())
\ No newline at end of file
+    with Session(get_engine()) as db:
+        seed_db(db)
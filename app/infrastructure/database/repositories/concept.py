@@ -1,12 +1,15 @@
 import logging
 
-from typing import List, Union, Literal
+from typing import List, Union, Literal, Optional
 
-from psycopg2.errors import  ForeignKeyViolation
-from sqlalchemy.exc import IntegrityError, StatementError
-from sqlmodel import Session, text, bindparam, select, join, alias 
+from sqlalchemy.exc import IntegrityError
+from fastapi import Depends
+from sqlmodel import text, bindparam, select, join, alias 
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.infrastructure.database.db import get_db
+from app.config.environment import get_settings
+from app.infrastructure.database.db import get_session
+from app.infrastructure.database.bulk import copy_to_staging
 
 from app.app.errors.db_error import DBError
 from app.domain.models.errors import DBError as DBErrorObj
@@ -34,6 +37,7 @@ from app.domain.models.concept import (
     ConceptReadVerbose,
     ConceptToModuleDelete,
     ConceptToConceptDelete,
+    ConceptToConceptClosureRead,
     ConceptReadPreformatted
     )
 from app.domain.protocols.repositories.concept import (
@@ -43,13 +47,18 @@ from app.domain.protocols.repositories.concept import (
     ConceptToConceptRepository as CToCRepoProtocol
     )
 
+_SETTINGS = get_settings()
+
 logger = logging.getLogger(__name__)
 
+# SQLSTATE raised by both psycopg2 and asyncpg for a foreign key violation
+FOREIGN_KEY_VIOLATION = "23503"
+
 class ConceptRepository(ConceptRepositoryProtocol):
-    db: Session
+    db: AsyncSession
 
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
     async def add(self, concept: ConceptCreate) -> ConceptRead:
         """
@@ -70,16 +79,16 @@ class ConceptRepository(ConceptRepositoryProtocol):
         query_params = dict(concept)
 
         try:
-            result = self.db.exec(statement=compiled_query, params=query_params)
+            result = await self.db.exec(statement=compiled_query, params=query_params)
             result = ConceptRead(**result.mappings().all()[0])
-            self.db.commit()
+            await self.db.commit()
             return result
         
         except IntegrityError as e:
             logger.exception(msg="Failed to add Concept object direct result")
             raise DBError(
                 origin="ConceptRepository.add", 
-                type="ForeignKeyViolation" if isinstance(e.orig, ForeignKeyViolation) else "UniqueViolation",
+                type="ForeignKeyViolation" if getattr(e.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION else "UniqueViolation",
                 status_code=400,
                 message=str(e.orig)
                 ) from e
@@ -89,55 +98,75 @@ class ConceptRepository(ConceptRepositoryProtocol):
         """
         Creates a new Concept entry in the DB for each item in the list of concepts.
         Ignores and logs any unique value violations.
+
+        The concepts are COPYed into a staging table and inserted from it with ON CONFLICT DO NOTHING, one round trip for the whole list.
         """
-        with self.db.begin():
-            query_template = """
-                INSERT INTO concept(name, subject, difficulty) 
-                VALUES(:name, :subject, :difficulty) 
-                RETURNING name
-                """
-
-            compiled_query = text(query_template)
-
-            failed_inserts = []
-            successful_inserts = []
-
-            for obj in concepts:
-                query_params = dict(obj)
-                nested = self.db.begin_nested()
-
-                try:   
-                    results = self.db.exec(statement=compiled_query, params=query_params)
-                    successful_inserts.extend([ConceptRead(**val) for val in results.mappings().fetchall()])
-                    nested.commit()
-
-                except IntegrityError as e:
-                    failed_inserts.append(
-                        DBErrorObj(
-                            cause="UniqueViolation", 
-                            object_id=obj.name
-                            )
+        failed_inserts = []
+        valid_concepts = []
+        for obj in concepts:
+            if obj.name is None or obj.subject is None or obj.difficulty is None:
+                logger.warn(msg=f"Concept Formatting Error, missing required value(s): {obj}")
+                failed_inserts.append(
+                    DBErrorObj(
+                        cause="StatementError", 
+                        object_id=str(obj)
                         )
-                    nested.rollback()
-                except StatementError as e:
-                    logger.warn(msg=f"Concept Formatting Error, missing required value(s): {obj}")
-                    failed_inserts.append(
-                        DBErrorObj(
-                            cause="StatementError", 
-                            object_id=str(obj)
-                            )
+                    )
+            else:
+                valid_concepts.append(obj)
+
+        inserted = set()
+        if valid_concepts:
+            try:
+                await copy_to_staging(
+                    db=self.db, 
+                    staging="concept_staging", 
+                    like="concept", 
+                    columns=("name", "subject", "difficulty"), 
+                    records=[(obj.name, obj.subject, obj.difficulty) for obj in valid_concepts]
+                )
+                results = await self.db.exec(statement=text("""
+                    INSERT INTO concept(name, subject, difficulty)
+                    SELECT name, subject, difficulty FROM concept_staging
+                    ON CONFLICT DO NOTHING
+                    RETURNING name
+                    """))
+                inserted = set(results.scalars().all())
+                await self.db.commit()
+
+            except Exception as e:
+                await self.db.rollback()
+                logger.exception(msg="Failed to bulk add Concept objects.")
+                raise DBError(
+                    origin="ConceptRepository.bulk_add",
+                    type="QueryExecError",
+                    status_code=500,
+                    message="Failed to add concepts"
+                ) from e
+
+        successful_inserts = []
+        for obj in valid_concepts:
+            # A name repeated in the list is inserted once, its other occurrences are reported as violations
+            if obj.name in inserted:
+                inserted.discard(obj.name)
+                successful_inserts.append(ConceptRead(name=obj.name))
+            else:
+                failed_inserts.append(
+                    DBErrorObj(
+                        cause="UniqueViolation", 
+                        object_id=obj.name
                         )
-                    nested.rollback()
+                    )
 
-            if failed_inserts:
-                logger.warn(msg=f"Failed to add the following Concept object(s):\n{failed_inserts}")
-            return ConceptCreateBulkRead(success=successful_inserts, failed=failed_inserts)
+        if failed_inserts:
+            logger.warn(msg=f"Failed to add the following Concept object(s):\n{failed_inserts}")
+        return ConceptCreateBulkRead(success=successful_inserts, failed=failed_inserts)
 
 
     async def get_one(self, concept_name: str, read_mode: Literal["normal", "verbose"] = "normal") -> Union[ConceptRead, ConceptReadVerbose]:
         try:
             query_stmt = text("SELECT * FROM concept WHERE name = :name")
-            results = self.db.exec(statement=query_stmt, params={"name": concept_name})
+            results = await self.db.exec(statement=query_stmt, params={"name": concept_name})
 
             if read_mode == "normal":
                 return ConceptRead(**results.mappings().fetchone())
@@ -194,7 +223,7 @@ class ConceptRepository(ConceptRepositoryProtocol):
                     statement = statement.where(column==filter_clause)
 
         try:
-            results = self.db.exec(statement=statement)
+            results = await self.db.exec(statement=statement)
             if read_mode == "normal":
                 return [ConceptRead.from_orm(v) for v in results.fetchall()]
             
@@ -212,18 +241,18 @@ class ConceptRepository(ConceptRepositoryProtocol):
 
 
 class ConceptToDomainRepository(CToDRepoProtocol):
-    db: Session
+    db: AsyncSession
 
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
 
     async def add(self, junction: ConceptToDomainCreate) -> ConceptToDomainRead:
         try:
             db_junction = ConceptToDomain.from_orm(junction)
             self.db.add(db_junction)
-            self.db.commit()
-            self.db.refresh(db_junction)
+            await self.db.commit()
+            await self.db.refresh(db_junction)
             return ConceptToDomainRead(**dict(db_junction))
         
         except Exception as e:
@@ -237,46 +266,61 @@ class ConceptToDomainRepository(CToDRepoProtocol):
 
 
     async def bulk_add(self, junctions: List[ConceptToDomainCreate]) -> List[ConceptToDomainRead]:
-        with self.db.begin():
-            query_stmt = """
+        """
+        Adds the junctions of existing concepts, COPYed into a staging table and inserted from it in one round trip.
+        Junctions of concepts that do not exist and junctions already present are skipped and logged.
+        """
+        if not junctions:
+            return []
+
+        try:
+            await copy_to_staging(
+                db=self.db, 
+                staging="concepttodomain_staging", 
+                like="concepttodomain", 
+                columns=("concept_name", "domain_id"), 
+                records=[(obj.concept_name, obj.domain_id) for obj in junctions]
+            )
+            results = await self.db.exec(statement=text("""
                 INSERT INTO concepttodomain(concept_name, domain_id)
-                SELECT name as concept_name, :domain_id FROM concept WHERE name = :concept_name
-                RETURNING concept_name, domain_id 
-                """
-            compiled_query = text(query_stmt)
-
-            failed_inserts = []
-            successful_inserts = []
-
-            for obj in junctions:
-                query_params = dict(obj)
-                nested = self.db.begin_nested()
-
-                try:   
-                    results = self.db.exec(statement=compiled_query, params=query_params)
-                    successful_inserts.extend([ConceptToDomainRead(**val) for val in results.mappings().fetchall()])
-                    nested.commit()
-
-                except IntegrityError:
-                    failed_inserts.append(
-                        DBErrorObj(
-                            cause="UniqueViolation", 
-                            object_id=obj.concept_name
-                            )
-                        )
-                    nested.rollback()
+                SELECT s.concept_name, s.domain_id FROM concepttodomain_staging s
+                JOIN concept c ON c.name = s.concept_name
+                ON CONFLICT DO NOTHING
+                RETURNING concept_name, domain_id
+                """))
+            successful_inserts = [ConceptToDomainRead(**val) for val in results.mappings().fetchall()]
+            missing = await self.db.exec(statement=text("""
+                SELECT DISTINCT s.concept_name FROM concepttodomain_staging s
+                WHERE NOT EXISTS (SELECT 1 FROM concept c WHERE c.name = s.concept_name)
+                """))
+            missing_concepts = set(missing.scalars().all())
+            await self.db.commit()
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg="Failed to bulk add ConceptToDomain objects.")
+            raise DBError(
+                origin="ConceptToDomainRepository.bulk_add",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to add domain junctions"
+            ) from e
 
-            if failed_inserts:
-                logger.warn(msg=f"Failed to add the following ConceptToDomain object(s):\n{failed_inserts}")
+        inserted = {(val.concept_name, val.domain_id) for val in successful_inserts}
+        failed_inserts = [
+            DBErrorObj(cause="ForeignKeyViolation" if obj.concept_name in missing_concepts else "UniqueViolation", object_id=obj.concept_name)
+            for obj in junctions if (obj.concept_name, obj.domain_id) not in inserted
+        ]
+        if failed_inserts:
+            logger.warn(msg=f"Failed to add the following ConceptToDomain object(s):\n{failed_inserts}")
 
-            return successful_inserts
-        
+        return successful_inserts
 
 
     async def get_all(self, domain_id: int) -> ConceptBulkRead:
         try:
             query_stmt = text("SELECT concept_name FROM concepttodomain WHERE domain_id = :domain_id")
-            result = self.db.exec(statement=query_stmt, params={"domain_id": domain_id})
+            result = await self.db.exec(statement=query_stmt, params={"domain_id": domain_id})
             result = ConceptBulkRead(concepts=[ConceptRead(name=val["concept_name"]) for val in result.mappings().fetchall()])
 
             if not result:
@@ -299,18 +343,18 @@ class ConceptToDomainRepository(CToDRepoProtocol):
             ) from e
 
 class ConceptToModuleRepository(CToMRepoProtocol):
-    db: Session
+    db: AsyncSession
 
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
 
     async def add(self, junction: ConceptToModuleCreate) -> ConceptToModuleRead:
         try:
             db_junction = ConceptToModule.from_orm(junction)
             self.db.add(db_junction)
-            self.db.commit()
-            self.db.refresh(db_junction)
+            await self.db.commit()
+            await self.db.refresh(db_junction)
 
             return ConceptToDomainRead(**dict(db_junction))
         
@@ -328,7 +372,7 @@ class ConceptToModuleRepository(CToMRepoProtocol):
             db_junctions = [ConceptToModule(**junction.dict()) for junction in junctions]
             
             self.db.add_all(db_junctions)
-            self.db.commit()
+            await self.db.commit()
 
         except Exception as e:
             logger.exception(msg=f"Failed to add ConceptToModule object(s).")
@@ -341,7 +385,7 @@ class ConceptToModuleRepository(CToMRepoProtocol):
         
         try:
             for object in db_junctions:
-                self.db.refresh(object)
+                await self.db.refresh(object)
 
             return [ConceptToModuleRead(**dict(val)) for val in db_junctions]
         
@@ -358,7 +402,7 @@ class ConceptToModuleRepository(CToMRepoProtocol):
     async def get_all(self, module_id: int) -> ConceptBulkRead:
         try:
             query_stmt = text("SELECT concept_name FROM concepttomodule WHERE module_id = :module_id")
-            result = self.db.exec(statement=query_stmt, params={"module_id": module_id})
+            result = await self.db.exec(statement=query_stmt, params={"module_id": module_id})
             result = result.mappings().fetchall()
             if not result:
                 raise DBError(
@@ -384,8 +428,8 @@ class ConceptToModuleRepository(CToMRepoProtocol):
 
         for item in junctions:
             try: 
-                self.db.exec(statement=query_stmt, params=item.dict())
-                self.db.commit()
+                await self.db.exec(statement=query_stmt, params=item.dict())
+                await self.db.commit()
 
             except Exception as e:
                 logger.exception(msg=f"Failed to delete ConceptToModule object(s): {item}.")
@@ -398,10 +442,10 @@ class ConceptToModuleRepository(CToMRepoProtocol):
 
 
 class ConceptToConceptRepository(CToCRepoProtocol):
-    db: Session
+    db: AsyncSession
 
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
 
     async def add(self, junction: ConceptToConceptCreate) -> ConceptToConceptRead:
@@ -409,8 +453,8 @@ class ConceptToConceptRepository(CToCRepoProtocol):
             db_junction = ConceptToConcept.from_orm(junction)
 
             self.db.add(db_junction)
-            self.db.commit()
-            self.db.refresh(db_junction)
+            await self.db.commit()
+            await self.db.refresh(db_junction)
 
             return ConceptToConceptRead(**dict(db_junction))
         
@@ -425,25 +469,41 @@ class ConceptToConceptRepository(CToCRepoProtocol):
 
 
     async def bulk_add(self, junctions: List[ConceptToConceptCreate]) -> List[ConceptToConceptRead]:
+        """
+        Adds the junctions between existing concepts, COPYed into a staging table and inserted from it in one round trip.
+        Returns the supplied junctions that exist afterwards, newly inserted or already present.
+        """
+        if not junctions:
+            return []
+
         try:
-            with self.db.no_autoflush as session:
-                db_junctions = [ConceptToConcept.from_orm(junction) for junction in junctions]
-                with session.begin(nested=True):
-                    for obj in db_junctions:
-                        nested = session.begin_nested()
-                        try:
-                            session.add(obj)
-                            nested.commit()
-                            session.refresh(obj)
-                            
-                        except IntegrityError as e:
-                            nested.rollback()
-                            
-                result = [ConceptToConceptRead(**val.dict()) for val in db_junctions]
-                session.commit()
-                return result
+            await copy_to_staging(
+                db=self.db, 
+                staging="concepttoconcept_staging", 
+                like="concepttoconcept", 
+                columns=("concept_name", "prereq_name"), 
+                records=[(obj.concept_name, obj.prereq_name) for obj in junctions]
+            )
+            results = await self.db.exec(statement=text("""
+                WITH inserted AS (
+                    INSERT INTO concepttoconcept(concept_name, prereq_name)
+                    SELECT s.concept_name, s.prereq_name FROM concepttoconcept_staging s
+                    WHERE EXISTS (SELECT 1 FROM concept c WHERE c.name = s.concept_name)
+                    AND EXISTS (SELECT 1 FROM concept c WHERE c.name = s.prereq_name)
+                    ON CONFLICT DO NOTHING
+                    RETURNING concept_name, prereq_name
+                )
+                SELECT concept_name, prereq_name FROM inserted
+                UNION
+                SELECT s.concept_name, s.prereq_name FROM concepttoconcept_staging s
+                JOIN concepttoconcept c ON c.concept_name = s.concept_name AND c.prereq_name = s.prereq_name
+                """))
+            result = [ConceptToConceptRead(**val) for val in results.mappings().fetchall()]
+            await self.db.commit()
+            return result
         
         except Exception as e:
+            await self.db.rollback()
             logger.exception(msg="Failed to add ConceptToConcept object(s).")
             raise DBError(
                 origin="ConceptToConceptRepository.bulk_add",
@@ -462,8 +522,8 @@ class ConceptToConceptRepository(CToCRepoProtocol):
             }
             query_params = {"concept_names": [val.name for val in concepts.concepts]}
             query_stmt = text(query_stmt_options[junction_direction]).bindparams(bindparam("concept_names", expanding=True))
-            result = self.db.exec(statement=query_stmt, params=query_params)
-            self.db.close()
+            result = await self.db.exec(statement=query_stmt, params=query_params)
+            await self.db.close()
             
             return [ConceptToConceptRead(**val) for val in result.mappings().fetchall()]
         
@@ -477,13 +537,86 @@ class ConceptToConceptRepository(CToCRepoProtocol):
             ) from e    
 
 
+    async def get_all(self) -> List[ConceptToConceptRead]:
+        try:
+            query_stmt = text("SELECT concept_name, prereq_name FROM concepttoconcept;")
+            result = await self.db.exec(statement=query_stmt)
+            await self.db.close()
+
+            return [ConceptToConceptRead(**val) for val in result.mappings().fetchall()]
+
+        except Exception as e:
+            logger.exception(msg="Failed to get all ConceptToConcept objects.")
+            raise DBError(
+                origin="ConceptToConceptRepository.get_all",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to retrieve concept junctions"
+            ) from e
+
+
+    async def get_closure(
+            self,
+            concepts: Optional[ConceptBulkRead] = None,
+            module_id: Optional[int] = None,
+            junction_direction: Literal["up", "down"] = "down",
+            max_depth: Optional[int] = None
+    ) -> List[ConceptToConceptClosureRead]:
+        # 'down' walks from a concept to its prerequisites, 'up' from a prerequisite to its dependents
+        start, step = ("concept_name", "prereq_name") if junction_direction == "down" else ("prereq_name", "concept_name")
+        if module_id is not None:
+            seed = "SELECT concept_name FROM concepttomodule WHERE module_id = :module_id"
+            query_params = {"module_id": module_id}
+        else:
+            seed = ":concept_names"
+            query_params = {"concept_names": [val.name for val in concepts.concepts]}
+        query_params["max_depth"] = max_depth or _SETTINGS.CONCEPT_CLOSURE_MAX_DEPTH
+
+        # UNION keeps each junction once per depth however many paths reach it, so diamonds do not multiply the rows
+        # and the work is bounded by junctions x max_depth. Cycles are cut off by max_depth, MIN keeps the first depth reached.
+        query = f"""
+            WITH RECURSIVE closure(concept_name, prereq_name, depth) AS (
+                SELECT c.concept_name, c.prereq_name, 1
+                FROM concepttoconcept c
+                WHERE c.{start} IN ({seed})
+                UNION
+                SELECT c.concept_name, c.prereq_name, cl.depth + 1
+                FROM closure cl
+                JOIN concepttoconcept c ON c.{start} = cl.{step}
+                WHERE cl.depth < :max_depth
+            )
+            SELECT concept_name, prereq_name, MIN(depth) AS depth
+            FROM closure
+            GROUP BY concept_name, prereq_name
+            ORDER BY depth, concept_name, prereq_name;
+        """
+
+        try:
+            query_stmt = text(query)
+            if module_id is None:
+                query_stmt = query_stmt.bindparams(bindparam("concept_names", expanding=True))
+            result = await self.db.exec(statement=query_stmt, params=query_params)
+            await self.db.close()
+
+            return [ConceptToConceptClosureRead(**val) for val in result.mappings().fetchall()]
+
+        except Exception as e:
+            logger.exception(msg=f"Failed to get ConceptToConcept closure with direction: {junction_direction}.")
+            raise DBError(
+                origin="ConceptToConceptRepository.get_closure",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to retrieve concept junction closure"
+            ) from e
+
+
     async def delete(self, junctions: List[ConceptToConceptDelete]):
         query_stmt = text("DELETE FROM concepttoconcept WHERE prereq_name = :prereq_name AND concept_name = :concept_name")
 
         for item in junctions:
             try: 
-                self.db.exec(statement=query_stmt, params=item.dict())
-                self.db.commit()
+                await self.db.exec(statement=query_stmt, params=item.dict())
+                await self.db.commit()
 
             except Exception as e:
                 logger.exception(msg=f"Failed to delete ConceptToConcept object(s): {item}.")
@@ -0,0 +1,112 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import Depends
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+
+from app.infrastructure.database.db import get_session
+from app.domain.models.content_cache import ContentCacheEntry
+from app.domain.protocols.repositories.content_cache import ContentCacheRepository as ContentCacheRepoProtocol
+
+from app.app.errors.db_error import DBError
+
+logger = logging.getLogger(__name__)
+
+
+class ContentCacheRepository(ContentCacheRepoProtocol):
+    db: AsyncSession
+
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
+
+    async def get(self, key: str, ttl: float) -> Optional[bytes]:
+        stmt = text(
+            """
+            UPDATE contentcacheentry
+            SET accessed_at = :now, hits = COALESCE(hits, 0) + 1
+            WHERE key = :key AND created_at >= :created_after
+            RETURNING value
+            """
+            )
+
+        try:
+            now = datetime.utcnow()
+            value = (await self.db.exec(
+                statement=stmt,
+                params={"key": key, "now": now, "created_after": now - timedelta(seconds=ttl)}
+            )).scalar_one_or_none()
+            await self.db.commit()
+            await self.db.close()
+            return value
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg=f"Failed to read content cache entry: {key}.")
+            raise DBError(
+                origin="ContentCacheRepository.get",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to read content cache entry."
+            ) from e
+
+    async def put(self, key: str, kind: str, value: bytes) -> None:
+        try:
+            now = datetime.utcnow()
+            stmt = insert(ContentCacheEntry).values(
+                key=key, kind=kind, value=value, size_bytes=len(value), created_at=now, accessed_at=now, hits=0
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={"value": stmt.excluded.value, "size_bytes": stmt.excluded.size_bytes,
+                      "created_at": now, "accessed_at": now}
+            )
+            await self.db.exec(statement=stmt)
+            await self.db.commit()
+            await self.db.close()
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg=f"Failed to write content cache entry: {key}.")
+            raise DBError(
+                origin="ContentCacheRepository.put",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to write content cache entry."
+            ) from e
+
+    async def prune(self, max_bytes: int, ttl: float) -> int:
+        stmt = text(
+            """
+            DELETE FROM contentcacheentry
+            WHERE created_at < :created_before
+            OR key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size_bytes) OVER (ORDER BY accessed_at DESC, key) AS retained_bytes
+                    FROM contentcacheentry
+                ) ranked
+                WHERE retained_bytes > :max_bytes
+            )
+            """
+            )
+
+        try:
+            result = await self.db.exec(
+                statement=stmt,
+                params={"created_before": datetime.utcnow() - timedelta(seconds=ttl), "max_bytes": max_bytes}
+            )
+            await self.db.commit()
+            await self.db.close()
+            return result.rowcount
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg="Failed to prune content cache.")
+            raise DBError(
+                origin="ContentCacheRepository.prune",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to prune content cache."
+            ) from e
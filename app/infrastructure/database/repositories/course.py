@@ -2,8 +2,10 @@ import logging
 
 from typing import List, Literal, Union
 
-from sqlmodel import Session, text
-from app.infrastructure.database.db import get_db
+from fastapi import Depends
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.infrastructure.database.db import get_session
 
 from app.app.errors.db_error import DBError
 from app.domain.models.course import Course, CourseRead, CourseCreate, CourseFilter, CourseUpdate, CourseReadVerbose
@@ -17,18 +19,18 @@ class CourseRepository(CourseRepositoryProtocol):
     
     '''
     
-    db: Session
+    db: AsyncSession
     
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
 
     async def add(self, course: CourseCreate) -> CourseRead:
         try:
             db_course = Course.from_orm(course)
             self.db.add(db_course)
-            self.db.commit()
-            self.db.refresh(db_course)
+            await self.db.commit()
+            await self.db.refresh(db_course)
             return CourseRead.from_orm(db_course)
         
         except Exception as e:
@@ -43,8 +45,9 @@ class CourseRepository(CourseRepositoryProtocol):
 
     async def get_one(self, course_id: int, read_mode: Literal["normal", "verbose"] = "normal") -> Union[CourseRead, CourseReadVerbose]:
         query_stmt = text("SELECT * FROM course WHERE course_id = :course_id")
-        result = self.db.exec(statement=query_stmt, params={"course_id": course_id})
+        result = await self.db.exec(statement=query_stmt, params={"course_id": course_id})
         result = result.mappings().fetchone()
+        await self.db.close()
         if not result:
             raise DBError(origin="CourseRepository.get_one", type="ValueError", status_code=404, message=f"Course with ID: {course_id} not found.")
         else:
@@ -85,7 +88,7 @@ class CourseRepository(CourseRepositoryProtocol):
                     params[key] = value
 
             compiled_stmt = " ".join([query_stmt, " AND ".join(join_stmt), "WHERE" if course_where else "", " AND ".join(course_where)])
-            result = self.db.exec(statement=text(compiled_stmt), params=params)
+            result = await self.db.exec(statement=text(compiled_stmt), params=params)
 
             return [CourseReadVerbose(**course) for course in result.mappings().all()]
         
@@ -110,8 +113,8 @@ class CourseRepository(CourseRepositoryProtocol):
             query_stmt = text(" ".join(["UPDATE course SET", " ,".join(set_stmt), "WHERE course_id = :course_id RETURNING *"]))
             params["course_id"] = course_id
 
-            results = self.db.exec(statement=query_stmt, params=params)
-            self.db.commit()
+            results = await self.db.exec(statement=query_stmt, params=params)
+            await self.db.commit()
 
             return CourseReadVerbose(**results.mappings().fetchone())
         
@@ -129,8 +132,8 @@ class CourseRepository(CourseRepositoryProtocol):
         try:
             query_stmt = text("DELETE FROM course WHERE course_id = :course_id")
 
-            results = self.db.exec(statement=query_stmt, params={"course_id": course_id})
-            self.db.commit()
+            results = await self.db.exec(statement=query_stmt, params={"course_id": course_id})
+            await self.db.commit()
 
             # return CourseReadVerbose(**results.mappings().fetchone())
         
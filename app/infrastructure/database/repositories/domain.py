@@ -2,9 +2,10 @@ import logging
 
 from typing import Union
 from fastapi import Depends
-from sqlmodel import Session, text
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.db import get_session
 
 from app.app.errors.db_error import DBError
 
@@ -20,17 +21,17 @@ class DomainRepository(DomainRepoProtocol):
     Provides data access to Domain models.
     '''
     
-    db: Session
+    db: AsyncSession
     
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
         self.db = db
 
     async def add(self, domain: DomainCreate) -> Union[DomainRead, ErrorResponse]:
         try:
             db_domain = Domain.from_orm(domain)
             self.db.add(db_domain)
-            self.db.commit()
-            self.db.refresh(db_domain)
+            await self.db.commit()
+            await self.db.refresh(db_domain)
             return DomainRead(**dict(db_domain))
         
         except Exception as e:
@@ -46,7 +47,7 @@ class DomainRepository(DomainRepoProtocol):
     async def get_one(self, domain_id: int) -> DomainRead:
         try:
             query_stmt = text("SELECT * FROM domain WHERE domain_id = :domain_id")
-            result = self.db.exec(statement=query_stmt, params={"domain_id": domain_id})
+            result = await self.db.exec(statement=query_stmt, params={"domain_id": domain_id})
             return DomainRead(**result.mappings().fetchone())
         
         except Exception as e:
@@ -59,4 +60,4 @@ class DomainRepository(DomainRepoProtocol):
             ) from e
         
         finally:
-            self.db.close()
\ No newline at end of file
+            await self.db.close()
\ No newline at end of file
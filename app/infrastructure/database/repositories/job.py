@@ -0,0 +1,246 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlmodel import select, text, col
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+
+from app.infrastructure.database.db import get_session
+from app.infrastructure.event_processor.notifier import JobNotifier
+from app.domain.models.job import Job, JobCreate, JobRead, JobRun, JobFile
+from app.domain.protocols.repositories.job import JobRepository as JobRepoProtocol
+
+from app.app.errors.db_error import DBError
+
+logger = logging.getLogger(__name__)
+
+
+class JobRepository(JobRepoProtocol):
+    db: AsyncSession
+
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
+        self.notifier = JobNotifier()
+
+    async def _publish(self) -> None:
+        """
+        Queues a NOTIFY on the job channel, Postgres delivers it to listening replicas when the current transaction commits
+        """
+        await self.db.exec(statement=text("SELECT pg_notify(:channel, '')"), params={"channel": self.notifier.channel})
+
+    async def add(self, job: JobCreate, files: List[JobFile]) -> Tuple[JobRead, bool]:
+        try:
+            stmt = insert(Job).values(**job.dict(), status="queued", attempts=0, created_at=datetime.utcnow())
+            if job.idempotency_key is not None:
+                stmt = stmt.on_conflict_do_nothing(index_elements=["idempotency_key"])
+            job_id = (await self.db.exec(statement=stmt.returning(Job.job_id))).scalar_one_or_none()
+
+            if job_id is None:
+                await self.db.rollback()
+                existing = (await self.db.exec(
+                    select(Job).where(col(Job.idempotency_key) == job.idempotency_key)
+                )).one()
+                await self.db.close()
+                if existing.owner != job.owner:
+                    raise DBError(
+                        origin="JobRepository.add",
+                        type="IdempotencyKeyConflict",
+                        status_code=409,
+                        message="The Idempotency-Key is already used by another user's job."
+                    )
+                return JobRead.from_job(existing), False
+
+            for job_file in files:
+                job_file.job_id = job_id
+            self.db.add_all(files)
+            await self._publish()
+            await self.db.commit()
+            self.notifier.notify()
+
+            result = JobRead.from_job(await self.db.get(Job, job_id))
+            await self.db.close()
+            return result, True
+
+        except DBError:
+            raise
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg=f"Failed to add job for operation: {job.operation}.")
+            raise DBError(
+                origin="JobRepository.add",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to add job."
+            ) from e
+
+    async def get(self, job_id: int, owner: str) -> Optional[JobRead]:
+        try:
+            job = (await self.db.exec(
+                select(Job).where(col(Job.job_id) == job_id).where(col(Job.owner) == owner)
+            )).first()
+            result = JobRead.from_job(job) if job else None
+            await self.db.close()
+            return result
+
+        except Exception as e:
+            logger.exception(msg=f"Failed to retrieve job with job_id: {job_id}.")
+            raise DBError(
+                origin="JobRepository.get",
+                type="QueryExecError",
+                status_code=500,
+                message=f"Failed to retrieve job with job_id: {job_id}."
+            ) from e
+
+    async def get_files(self, job_id: int) -> List[JobFile]:
+        try:
+            result = (await self.db.exec(
+                select(JobFile).where(col(JobFile.job_id) == job_id).order_by(col(JobFile.file_id))
+            )).all()
+            await self.db.close()
+            return result
+
+        except Exception as e:
+            logger.exception(msg=f"Failed to retrieve files of job with job_id: {job_id}.")
+            raise DBError(
+                origin="JobRepository.get_files",
+                type="QueryExecError",
+                status_code=500,
+                message=f"Failed to retrieve files of job with job_id: {job_id}."
+            ) from e
+
+    async def claim(self, worker: str, stale_after: float) -> Optional[JobRun]:
+        now = datetime.utcnow()
+        stmt = text(
+            """
+            UPDATE job
+            SET status = 'running', attempts = attempts + 1, worker = :worker,
+                started_at = :now, heartbeat_at = :now, finished_at = NULL
+            WHERE job_id = (
+                SELECT job_id FROM job
+                WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < :stale_before)
+                ORDER BY job_id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING job_id
+            """
+            )
+
+        try:
+            job_id = (await self.db.exec(
+                statement=stmt,
+                params={"worker": worker, "now": now, "stale_before": now - timedelta(seconds=stale_after)}
+            )).scalar_one_or_none()
+            await self.db.commit()
+
+            result = JobRun.from_job(await self.db.get(Job, job_id)) if job_id is not None else None
+            await self.db.close()
+            return result
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg="Failed to claim job")
+            raise DBError(
+                origin="JobRepository.claim",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to claim job"
+            ) from e
+
+    async def heartbeat(self, job_id: int, worker: str) -> bool:
+        stmt = text(
+            """
+            UPDATE job SET heartbeat_at = :now
+            WHERE job_id = :job_id AND worker = :worker AND status = 'running'
+            """
+            )
+
+        try:
+            result = await self.db.exec(statement=stmt, params={"now": datetime.utcnow(), "job_id": job_id, "worker": worker})
+            await self.db.commit()
+            await self.db.close()
+            return result.rowcount > 0
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg=f"Failed to refresh heartbeat of job with job_id: {job_id}.")
+            raise DBError(
+                origin="JobRepository.heartbeat",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to refresh job heartbeat."
+            ) from e
+
+    async def _finish(self, job_id: int, worker: str, values: dict) -> None:
+        """
+        Applies the terminal or requeued state of a job, only while it is still leased to the worker.
+        The uploaded files and secrets are dropped once the job reaches a terminal state.
+        """
+        job = (await self.db.exec(
+            select(Job).where(col(Job.job_id) == job_id).where(col(Job.worker) == worker).where(col(Job.status) == "running").with_for_update()
+        )).first()
+        if job is None:
+            logger.warning(f"Job {job_id} is no longer leased to {worker}, result dropped.")
+            await self.db.rollback()
+            await self.db.close()
+            return
+
+        for key, value in values.items():
+            setattr(job, key, value)
+        if values.get("status") == "queued" and job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+        if job.status != "queued":
+            job.secrets = None
+        self.db.add(job)
+
+        if job.status != "queued":
+            await self.db.exec(statement=text("DELETE FROM jobfile WHERE job_id = :job_id"), params={"job_id": job_id})
+        else:
+            await self._publish()
+        await self.db.commit()
+        await self.db.close()
+
+        if job.status == "queued":
+            self.notifier.notify()
+
+    async def complete(self, job_id: int, worker: str, result: Any) -> None:
+        try:
+            await self._finish(job_id=job_id, worker=worker, values={
+                "status": "succeeded",
+                "result": result,
+                "error": None,
+                "finished_at": datetime.utcnow()
+            })
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg=f"Failed to complete job with job_id: {job_id}.")
+            raise DBError(
+                origin="JobRepository.complete",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to complete job."
+            ) from e
+
+    async def fail(self, job_id: int, worker: str, error: str, retry: bool) -> None:
+        try:
+            values = {"status": "queued", "error": error} if retry else {
+                "status": "failed",
+                "error": error,
+                "finished_at": datetime.utcnow()
+            }
+            await self._finish(job_id=job_id, worker=worker, values=values)
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg=f"Failed to record failure of job with job_id: {job_id}.")
+            raise DBError(
+                origin="JobRepository.fail",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to record job failure."
+            ) from e
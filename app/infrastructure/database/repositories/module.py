@@ -4,9 +4,10 @@ from typing import Optional, List, Literal, Union
 
 from sqlalchemy.exc import IntegrityError
 from fastapi import Depends
-from sqlmodel import Session, text
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.db import get_session
 
 from app.app.errors.db_error import DBError
 
@@ -20,9 +21,9 @@ class ModuleRepository(ModuleRepoProtocol):
     Provides data access to module models.
     '''
     
-    db: Session
+    db: AsyncSession
     
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
         self.db = db
 
     async def add(self, module: ModuleCreate) -> ModuleRead:
@@ -42,7 +43,7 @@ class ModuleRepository(ModuleRepoProtocol):
         query_params = dict(module)
 
         try:
-            result = self.db.exec(statement=compiled_query, params=query_params)
+            result = await self.db.exec(statement=compiled_query, params=query_params)
 
         except IntegrityError as e:
             raise DBError(
@@ -54,7 +55,7 @@ class ModuleRepository(ModuleRepoProtocol):
         
         try:
             result = ModuleRead(**result.mappings().all()[0])
-            self.db.commit()
+            await self.db.commit()
             return result
         
         except Exception as e:
@@ -69,7 +70,7 @@ class ModuleRepository(ModuleRepoProtocol):
     async def get_one(self, module_id: int) -> ModuleRead:
         try:
             query_stmt = text("SELECT * FROM module WHERE module_id = :module_id")
-            result = self.db.exec(statement=query_stmt, params={"module_id": module_id})
+            result = await self.db.exec(statement=query_stmt, params={"module_id": module_id})
             return ModuleRead(**result.mappings().fetchone())
         
         except Exception as e:
@@ -102,8 +103,8 @@ class ModuleRepository(ModuleRepoProtocol):
             query_stmt = text(" ".join([query_stmt, filter_clause]))
             print(query_stmt)
 
-            result = self.db.exec(statement=query_stmt, params=params)
-            self.db.close()
+            result = await self.db.exec(statement=query_stmt, params=params)
+            await self.db.close()
             
             if id_only:
                 return [module.get('module_id') for module in result.mappings().all()]
@@ -127,8 +128,8 @@ class ModuleRepository(ModuleRepoProtocol):
                 ])
             query_stmt = text(" ".join([query_stmt, set_stmts, "WHERE module_id = :module_id RETURNING *"]))
 
-            result = self.db.exec(statement=query_stmt, params={"module_id": module_id, **module_update.dict(exclude_none=True)})
-            self.db.commit()
+            result = await self.db.exec(statement=query_stmt, params={"module_id": module_id, **module_update.dict(exclude_none=True)})
+            await self.db.commit()
             
             return ModuleRead(**result.mappings().fetchone())
         
@@ -144,8 +145,8 @@ class ModuleRepository(ModuleRepoProtocol):
     async def delete_from_course(self, module_id: int, course_id: int) -> None:
         try:
             query_stmt = text("DELETE FROM moduletocourse WHERE module_id = :module_id AND course_id = :course_id")
-            self.db.exec(statement=query_stmt, params={"module_id": module_id, "course_id": course_id})
-            self.db.commit()
+            await self.db.exec(statement=query_stmt, params={"module_id": module_id, "course_id": course_id})
+            await self.db.commit()
 
         except Exception as e:
             logger.exception(msg=f"Failed to return Module object.")
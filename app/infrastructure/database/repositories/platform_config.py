@@ -2,9 +2,10 @@ import logging
 
 from typing import Union
 from fastapi import Depends
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.db import get_session
 
 from app.app.errors.db_error import DBError
 
@@ -15,17 +16,17 @@ from app.domain.models.platform_config import PlatformConfig, PlatformConfigCrea
 logger = logging.getLogger(__name__)
 
 class PlatformConfigRepository(PlatformConfigRepoProtocol):
-    db: Session
+    db: AsyncSession
     
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
     async def add(self, platform_config: PlatformConfigCreate) -> PlatformConfigRead:
         try:
             platform_config_table = PlatformConfig.from_orm(platform_config)
             self.db.add(platform_config_table)
-            self.db.commit()
-            self.db.refresh(platform_config_table)
+            await self.db.commit()
+            await self.db.refresh(platform_config_table)
             return PlatformConfigRead(**dict(platform_config_table))
         
         except Exception as e:
@@ -40,7 +41,7 @@ class PlatformConfigRepository(PlatformConfigRepoProtocol):
     async def get(self, client_id: str) -> PlatformConfigRead:
         try:
             statement = select(PlatformConfig).where(PlatformConfig.CLIENT_ID == client_id)
-            results = self.db.exec(statement=statement)
+            results = await self.db.exec(statement=statement)
             return PlatformConfigRead(**dict(results.one()))
         
         except Exception as e:
@@ -1,42 +1,55 @@
 # app/infrastructure/database/repositories/prompt.py
 from typing import List, Optional
-from sqlmodel import Session
 from fastapi import Depends
+from sqlmodel import select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.domain.models.prompt import Prompt, PromptCreate, PromptRead, PromptUpdate
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.db import get_session
+from app.infrastructure.event_processor.notifier import PromptNotifier
 
 class PromptRepository:
-    db: Session
+    db: AsyncSession
     
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
         self.db = db
+        self.notifier = PromptNotifier()
+
+    async def _publish(self) -> None:
+        """
+        Queues a NOTIFY on the prompt channel, Postgres delivers it to listening replicas when the current transaction commits
+        """
+        await self.db.exec(statement=text("SELECT pg_notify(:channel, '')"), params={"channel": self.notifier.channel})
 
     async def add(self, prompt_create: PromptCreate) -> PromptRead:
         prompt = Prompt.from_orm(prompt_create)
         self.db.add(prompt)
-        self.db.commit()
-        self.db.refresh(prompt)
+        await self._publish()
+        await self.db.commit()
+        self.notifier.notify()
+        await self.db.refresh(prompt)
         return PromptRead.from_orm(prompt)
 
     async def get(self, prompt_id: str) -> Optional[PromptRead]:
-        prompt = self.db.get(Prompt, prompt_id)
+        prompt = await self.db.get(Prompt, prompt_id)
         if prompt:
             return PromptRead.from_orm(prompt)
         return None
 
     async def list(self) -> List[PromptRead]:
-        prompts = self.db.query(Prompt).all()
+        prompts = (await self.db.exec(select(Prompt))).all()
         return [PromptRead.from_orm(prompt) for prompt in prompts]
 
     async def update(self, prompt_id: str, prompt_update: PromptUpdate) -> Optional[PromptRead]:
-        prompt = self.db.get(Prompt, prompt_id)
+        prompt = await self.db.get(Prompt, prompt_id)
         if prompt:
             if prompt_update.editable_part is not None:
                 prompt.editable_part = prompt_update.editable_part
             if prompt_update.fixed_part is not None:
                 prompt.fixed_part = prompt_update.fixed_part
             self.db.add(prompt)
-            self.db.commit()
-            self.db.refresh(prompt)
+            await self._publish()
+            await self.db.commit()
+            self.notifier.notify()
+            await self.db.refresh(prompt)
             return PromptRead.from_orm(prompt)
         return None
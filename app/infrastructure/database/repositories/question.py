@@ -1,13 +1,15 @@
-from typing import List, Literal, Protocol, Union
+from typing import List, Literal, Optional, Protocol, Union
 
 from fastapi import Depends
-from sqlmodel import Session, col, select
+from sqlmodel import col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.domain.models.question import (
     Answer,
     AnswerCreate,
     AnswerRead,
     Question,
+    QuestionAnswerSelection,
     QuestionCreate,
     QuestionRead,
 )
@@ -17,22 +19,50 @@ from app.domain.protocols.repositories.question import (
 from app.domain.protocols.repositories.question import (
     QuestionRepository as QuestionRepoProtocol,
 )
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.bulk import allocate_ids, copy_records
+from app.infrastructure.database.db import get_session
+
+_QUESTION_COLUMNS = ("id", "position", "question_name", "question_type", "question_text", "points_possible", "neutral_comments")
+_ANSWER_COLUMNS = ("id", "answer_text", "answer_weight", "question_id")
 
 
 class QuestionRepository(QuestionRepoProtocol):
-    db: Session
+    db: AsyncSession
     
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
         self.db = db
 
     async def add(self, question: QuestionCreate) -> QuestionRead:
         question = Question.from_orm(question)
         self.db.add(question)
-        self.db.commit()
-        self.db.refresh(question)
+        await self.db.commit()
+        await self.db.refresh(question)
         return QuestionRead.from_orm(question)
 
+    async def bulk_add(self, questions: List[QuestionCreate]) -> List[QuestionRead]:
+        """ This function adds all the questions with a single COPY.
+
+        Args:
+            questions: List of questions, the ones without an id get the next ids of the question sequence
+
+        Returns:
+            List of QuestionRead objects, in the order of questions
+        """
+        new_ids = iter(await allocate_ids(db=self.db, table="question", count=sum(question.id is None for question in questions)))
+        result = [
+            QuestionRead(**{**question.dict(), "id": question.id if question.id is not None else next(new_ids)})
+            for question in questions
+        ]
+
+        await copy_records(
+            db=self.db,
+            table="question",
+            columns=_QUESTION_COLUMNS,
+            records=[tuple(getattr(question, column) for column in _QUESTION_COLUMNS) for question in result]
+        )
+        await self.db.commit()
+        return result
+
     async def get_one_by_id(self, id: int) -> Question:
         """ THis function returns a single question based on matching id.
 
@@ -42,9 +72,9 @@ class QuestionRepository(QuestionRepoProtocol):
         Returns:
             Question to return.
         """
-        return self.db.exec(
+        return (await self.db.exec(
             select(Question).where(col(Question.id) == id)
-        ).first()
+        )).first()
 
     async def bulk_get_by_id(self, id_list: List) -> List[Question]:
         """ This function returns all question where the ids are in the list.
@@ -55,9 +85,9 @@ class QuestionRepository(QuestionRepoProtocol):
         Returns:
             List of QuestionRead objects
         """
-        return self.db.exec(
+        return (await self.db.exec(
             select(Question).where(col(Question.id).in_(id_list))
-        ).all()
+        )).all()
 
     async def get_all_by_concept(self, concept_list: List) -> List[QuestionRead]:
         """ This function returns all the questions for the concepts in the concept_list.
@@ -68,23 +98,83 @@ class QuestionRepository(QuestionRepoProtocol):
         Returns:
             List of QuestionRead objects
         """
-        return self.db.exec(
+        return (await self.db.exec(
             select(Question).where(col(Question.question_name).in_(concept_list))
-        ).all()
+        )).all()
+
+    async def get_with_answers(self, concept_list: Optional[List] = None, id_list: Optional[List] = None) -> List[QuestionAnswerSelection]:
+        """ This function returns the questions for the concepts in the concept_list, or with the ids in the id_list,
+        along with their answers in a single joined query.
+
+        Args:
+            concept_list: List of concepts
+            id_list: List of Question IDs, used when concept_list is None
+
+        Returns:
+            List of QuestionAnswerSelection objects ordered by question id, questions without answers have an empty list
+        """
+        condition = col(Question.question_name).in_(concept_list) if concept_list is not None else col(Question.id).in_(id_list)
+        rows = (await self.db.exec(
+            select(Question, Answer)
+            .outerjoin(Answer, col(Answer.question_id) == col(Question.id))
+            .where(condition)
+            .order_by(col(Question.id), col(Answer.id))
+        )).all()
+
+        selections = {}
+        for question, answer in rows:
+            selection = selections.setdefault(question.id, QuestionAnswerSelection(question=question, answers=[]))
+            if answer is not None:
+                selection.answers.append(AnswerRead.from_orm(answer))
+        return list(selections.values())
+
+    async def delete(self, id: int) -> None:
+        """ This function deletes a question along with its answers.
+
+        Args:
+            id: ID of the question
+        """
+        await self.db.exec(delete(Answer).where(col(Answer.question_id) == id))
+        await self.db.exec(delete(Question).where(col(Question.id) == id))
+        await self.db.commit()
 
 class AnswerRepository(AnswerRepoProtocol):
-    db: Session
+    db: AsyncSession
     
-    def __init__(self, db: Session = Depends(get_db)):
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
         self.db = db
 
     async def add(self, answer: AnswerCreate) -> AnswerRead:
         answer = Answer.from_orm(answer)
         self.db.add(answer)
-        self.db.commit()
-        self.db.refresh(answer)
+        await self.db.commit()
+        await self.db.refresh(answer)
         return AnswerRead.from_orm(answer)
 
+    async def bulk_add(self, answers: List[AnswerCreate]) -> List[AnswerRead]:
+        """ This function adds all the answers with a single COPY.
+
+        Args:
+            answers: List of answers, the ones without an id get the next ids of the answer sequence
+
+        Returns:
+            List of AnswerRead objects, in the order of answers
+        """
+        new_ids = iter(await allocate_ids(db=self.db, table="answer", count=sum(answer.id is None for answer in answers)))
+        result = [
+            AnswerRead(**{**answer.dict(), "id": answer.id if answer.id is not None else next(new_ids)})
+            for answer in answers
+        ]
+
+        await copy_records(
+            db=self.db,
+            table="answer",
+            columns=_ANSWER_COLUMNS,
+            records=[tuple(getattr(answer, column) for column in _ANSWER_COLUMNS) for answer in result]
+        )
+        await self.db.commit()
+        return result
+
     async def get_answer_for_question_id(self, id: int) -> List[Answer]:
         """ This function returns all the answers for the given question id.
 
@@ -94,9 +184,9 @@ class AnswerRepository(AnswerRepoProtocol):
         Returns:
             Returns a list of answers. (1 question has multiple Answers)
         """
-        return self.db.exec(
+        return (await self.db.exec(
             select(Answer).where(col(Answer.question_id) == id)
-        ).all()
+        )).all()
 
 
     async def get_answers_by_question_ids(self, question_ids: List) -> List[Answer]:
@@ -108,6 +198,6 @@ class AnswerRepository(AnswerRepoProtocol):
         Returns:
             Returns a list of answers.
         """
-        return self.db.exec(
+        return await self.db.exec(
             select(Answer).where(col(Answer.question_id).in_(question_ids))
         )
@@ -10,13 +10,16 @@ from app.domain.models.student import (
     StudentKnowledgeCreate, 
     StudentKnowledgeRead, 
     StudentKnowledge, 
+    StudentKnowledgeScore,
     StudentToCourseCreate, 
     StudentToCourseRead, 
     StudentToCourse
     )
 
-from app.infrastructure.database.db import get_db
-from sqlmodel import Session, select, col
+from app.infrastructure.database.db import get_session
+from fastapi import Depends
+from sqlmodel import select, col, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from sqlalchemy.orm.attributes import flag_modified
 
@@ -25,17 +28,17 @@ from app.app.errors.db_error import DBError
 logger = logging.getLogger(__name__)
 
 class StudentRepository():
-    db: Session
+    db: AsyncSession
     
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
     async def add(self, student: StudentCreate) -> StudentRead:
         try:
             student_obj = Student.from_orm(student)
             self.db.add(student_obj)
-            self.db.commit()
-            self.db.refresh(student_obj)
+            await self.db.commit()
+            await self.db.refresh(student_obj)
 
             return StudentRead.from_orm(student_obj)
         
@@ -49,22 +52,42 @@ class StudentRepository():
             ) from e
 
     async def get(self, canvas_id: str) -> StudentRead:
-        return self.db.exec(
+        student = (await self.db.exec(
             select(Student).where(col(Student.canvas_id) == canvas_id)
-        ).first()
+        )).first()
+        await self.db.close()
+        return student
+
+    async def bulk_get(self, canvas_ids: List[str]) -> List[StudentRead]:
+        try:
+            result = await self.db.exec(
+                select(Student).where(col(Student.canvas_id).in_(canvas_ids))
+            )
+            students = [StudentRead.from_orm(student) for student in result.all()]
+            await self.db.close()
+            return students
+
+        except Exception as e:
+            logger.exception(msg=f"Failed to retrieve students for {len(canvas_ids)} canvas_ids.")
+            raise DBError(
+                origin="StudentRepository.bulk_get",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to retrieve students."
+            ) from e
 
 class StudentToCourseRepository():
-    db: Session
+    db: AsyncSession
     
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
     async def add(self, junction: StudentToCourseCreate) -> StudentToCourseRead:
         try:
             junction_obj = StudentToCourse.from_orm(junction)
             self.db.add(junction_obj)
-            self.db.commit()
-            self.db.refresh(junction_obj)
+            await self.db.commit()
+            await self.db.refresh(junction_obj)
 
             return StudentToCourseRead.from_orm(junction_obj)
         
@@ -79,15 +102,15 @@ class StudentToCourseRepository():
 
 
 class StudentKnowledgeRepository():
-    db: Session
+    db: AsyncSession
     
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
 
     async def get(self, student_id:int, concept_name:str) -> StudentKnowledgeRead:
         try:
             stmt = select(StudentKnowledge).where(StudentKnowledge.concept_name == concept_name).where(StudentKnowledge.student_id == student_id)
-            return self.db.exec(stmt).one_or_none()
+            return (await self.db.exec(stmt)).one_or_none()
         
         except Exception as e:
             logger.exception(msg=f"Failed to retrieve student knowledge with student_id: {student_id} and concept_name: {concept_name}")
@@ -105,9 +128,9 @@ class StudentKnowledgeRepository():
             stmt = select(StudentKnowledge).where(
                 col(StudentKnowledge.concept_name).in_(concept_list)).where(
                 col(StudentKnowledge.student_id) == student_id)
-            result = self.db.exec(statement=stmt)
+            result = await self.db.exec(statement=stmt)
             result = StudentKnowledgeRead.from_orm(result.all())
-            self.db.close()
+            await self.db.close()
             return result
 
         except Exception as e:
@@ -126,10 +149,10 @@ class StudentKnowledgeRepository():
         try:
             knowledge_obj = StudentKnowledge.from_orm(score)
             self.db.add(knowledge_obj)
-            self.db.commit()
-            self.db.refresh(knowledge_obj)
+            await self.db.commit()
+            await self.db.refresh(knowledge_obj)
             result = StudentKnowledgeRead.from_orm(knowledge_obj)
-            self.db.close()
+            await self.db.close()
             return result
         
         except Exception as e:
@@ -144,7 +167,7 @@ class StudentKnowledgeRepository():
     async def update(self, score: StudentKnowledgeCreate) -> StudentKnowledgeRead:
         try:
             stmt = select(StudentKnowledge).where(StudentKnowledge.concept_name == score.concept_name).where(StudentKnowledge.student_id == score.student_id)
-            result = self.db.exec(statement=stmt)
+            result = await self.db.exec(statement=stmt)
 
             knowledge = result.one_or_none()
             knowledge.score = score.score
@@ -156,12 +179,12 @@ class StudentKnowledgeRepository():
             self.db.add(knowledge)
 
             # flag_modified(knowledge, 'change_history')
-            self.db.commit()
+            await self.db.commit()
 
-            self.db.refresh(knowledge)
+            await self.db.refresh(knowledge)
             result = StudentKnowledgeRead.from_orm(knowledge)
 
-            self.db.close()
+            await self.db.close()
             return result
     
         except Exception as e:
@@ -177,7 +200,7 @@ class StudentKnowledgeRepository():
         concept_list = [concept.name for concept in concepts.concepts]
         try:
             stmt = select(StudentKnowledge).where(StudentKnowledge.student_id == student_id).filter(StudentKnowledge.concept_name.in_(concept_list))
-            result = self.db.exec(statement=stmt)
+            result = await self.db.exec(statement=stmt)
             result = result.all()
 
             return [StudentKnowledgeRead.from_orm(item) for item in result]
@@ -189,4 +212,74 @@ class StudentKnowledgeRepository():
                 type="QueryExecError",
                 status_code=500,
                 message="Failed retrieve student knowledge entries."
-            ) from e
\ No newline at end of file
+            ) from e
+
+    async def get_all_for_course(self, course_id: int) -> List[StudentKnowledgeScore]:
+        try:
+            stmt = text(
+                """
+                SELECT sk.student_id, sk.concept_name, sk.numerator, sk.denominator, sk.score
+                FROM studentknowledge sk
+                INNER JOIN studenttocourse stc ON stc.student_id = sk.student_id
+                WHERE stc.course_id = :course_id
+                """
+                )
+            result = await self.db.exec(statement=stmt, params={"course_id": course_id})
+            result = [StudentKnowledgeScore(**row) for row in result.mappings().all()]
+            await self.db.close()
+            return result
+
+        except Exception as e:
+            logger.exception(msg=f"Failed retrieve student knowledge entries for course_id: {course_id}.")
+            raise DBError(
+                origin="StudentKnowledgeRepository.get_all_for_course",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed retrieve student knowledge entries."
+            ) from e
+
+    async def get_all_for_student(self, student_id: int) -> List[StudentKnowledgeScore]:
+        try:
+            stmt = text(
+                """
+                SELECT student_id, concept_name, numerator, denominator, score
+                FROM studentknowledge
+                WHERE student_id = :student_id
+                """
+                )
+            result = await self.db.exec(statement=stmt, params={"student_id": student_id})
+            result = [StudentKnowledgeScore(**row) for row in result.mappings().all()]
+            await self.db.close()
+            return result
+
+        except Exception as e:
+            logger.exception(msg=f"Failed retrieve student knowledge entries for student_id: {student_id}.")
+            raise DBError(
+                origin="StudentKnowledgeRepository.get_all_for_student",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed retrieve student knowledge entries."
+            ) from e
+
+    async def get_all_for_students(self, student_ids: List[int], concept_list: List[str]) -> List[StudentKnowledgeScore]:
+        try:
+            stmt = text(
+                """
+                SELECT student_id, concept_name, numerator, denominator, score
+                FROM studentknowledge
+                WHERE student_id = ANY(:student_ids) AND concept_name = ANY(:concept_list)
+                """
+                )
+            result = await self.db.exec(statement=stmt, params={"student_ids": student_ids, "concept_list": concept_list})
+            result = [StudentKnowledgeScore(**row) for row in result.mappings().all()]
+            await self.db.close()
+            return result
+
+        except Exception as e:
+            logger.exception(msg=f"Failed retrieve student knowledge entries for {len(student_ids)} students.")
+            raise DBError(
+                origin="StudentKnowledgeRepository.get_all_for_students",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed retrieve student knowledge entries."
+            ) from e
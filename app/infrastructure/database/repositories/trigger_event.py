@@ -1,9 +1,16 @@
 import logging
-from typing import List
-from sqlmodel import Session, text, delete
+from typing import List, Optional, Tuple
+from fastapi import Depends
+from sqlmodel import text, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 
-from app.infrastructure.database.db import get_db
+from app.infrastructure.database.db import get_session
+from app.infrastructure.database.repositories.concept import FOREIGN_KEY_VIOLATION
+from app.infrastructure.event_processor.notifier import QueueNotifier
 from app.domain.models.trigger_event import TriggerEventCreate, TriggerEventRead, TriggerEvent, TriggerEventProcess
+from app.domain.models.student import StudentKnowledgeScore
 from app.domain.protocols.repositories.trigger_event import TriggerEventRepository as TriggerEventRepoProtocol
 
 from app.app.errors.db_error import DBError
@@ -11,21 +18,31 @@ from app.app.errors.db_error import DBError
 logger = logging.getLogger(__name__)
 
 class TriggerEventRepository(TriggerEventRepoProtocol):
-    db: Session
+    db: AsyncSession
     
-    def __init__(self):
-        self.db = get_db()
+    def __init__(self, db: AsyncSession = Depends(get_session, use_cache=False)):
+        self.db = db
+        self.notifier = QueueNotifier()
+
+    async def _publish(self) -> None:
+        """
+        Queues a NOTIFY on the worker channel, Postgres delivers it to listening replicas when the current transaction commits
+        """
+        await self.db.exec(statement=text("SELECT pg_notify(:channel, '')"), params={"channel": self.notifier.channel})
 
     async def add(self, event: TriggerEventCreate) -> TriggerEventRead:
         try:
             event_obj = TriggerEvent.from_orm(event)
             self.db.add(event_obj)
-            self.db.commit()
-            self.db.refresh(event_obj)
+            await self._publish()
+            await self.db.commit()
+            await self.db.refresh(event_obj)
+            self.notifier.notify()
 
             return TriggerEventRead.from_orm(event_obj)
         
         except Exception as e:
+            await self.db.rollback()
             logger.exception(msg=f"Failed to add Trigger Event: {event}.")
             raise DBError(
                 origin="TriggerEventRepository.add",
@@ -38,10 +55,12 @@ class TriggerEventRepository(TriggerEventRepoProtocol):
         try:
             event_objs = [TriggerEvent.from_orm(event) for event in events]
             self.db.add_all(event_objs)
-            self.db.commit()
+            await self._publish()
+            await self.db.commit()
+            self.notifier.notify()
 
             for item in event_objs:
-                self.db.refresh(item)
+                await self.db.refresh(item)
 
             return [TriggerEventRead.from_orm(event) for event in event_objs]
         
@@ -54,12 +73,35 @@ class TriggerEventRepository(TriggerEventRepoProtocol):
                 message="Failed to add Trigger Events."
             ) from e
         
+    async def bulk_insert(self, events: List[TriggerEventCreate]) -> int:
+        if not events:
+            return 0
+
+        try:
+            stmt = insert(TriggerEvent).values([event.dict() for event in events])
+            await self.db.exec(statement=stmt)
+            await self._publish()
+            await self.db.commit()
+            await self.db.close()
+            self.notifier.notify()
+            return len(events)
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg=f"Failed to insert {len(events)} Trigger Events.")
+            raise DBError(
+                origin="TriggerEventRepository.bulk_insert",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to insert Trigger Events."
+            ) from e
+
     async def queue_check(self) -> bool:
         try:
-            stmt = text("SELECT exists (SELECT * FROM triggerevent limit 1)")
-            result = self.db.exec(statement=stmt)
+            stmt = text("SELECT exists (SELECT * FROM triggereventaccumulator limit 1)")
+            result = await self.db.exec(statement=stmt)
             result = result.one()
-            self.db.close()
+            await self.db.close()
             return result[0]
         
         except Exception as e:
@@ -75,16 +117,15 @@ class TriggerEventRepository(TriggerEventRepoProtocol):
         try:
             stmt = text(
                 """
-                SELECT student_id, concept, SUM(weight * value) numerator, SUM(weight) denominator, array_agg ( event_id ) event_ids
-                FROM triggerevent
-                GROUP BY GROUPING SETS ((student_id, concept))
+                SELECT student_id, concept, numerator, denominator, event_ids
+                FROM triggereventaccumulator
                 LIMIT :max_batch_size
                 """
                 )
             
-            results = self.db.exec(statement=stmt, params={"max_batch_size": max_batch_size})
+            results = await self.db.exec(statement=stmt, params={"max_batch_size": max_batch_size})
             results = [TriggerEventProcess(**event) for event in results.mappings().all()]
-            self.db.close()
+            await self.db.close()
             return results
         
         except Exception as e:
@@ -96,12 +137,193 @@ class TriggerEventRepository(TriggerEventRepoProtocol):
                 message="Failed to return queue"
             ) from e
         
+    async def claim_queue(self, max_batch_size: int, partition_count: int, start_partition: int = 0) -> List[TriggerEventProcess]:
+        stmt = text(
+            """
+            WITH lease AS (
+                SELECT pg_try_advisory_xact_lock(hashtext(:channel), :partition) AS acquired
+            )
+            SELECT a.student_id, a.concept, a.numerator, a.denominator, a.event_ids
+            FROM triggereventaccumulator a, lease
+            WHERE lease.acquired AND mod(a.student_id, :partition_count) = :partition
+            LIMIT :max_batch_size
+            FOR UPDATE OF a SKIP LOCKED
+            """
+            )
+
+        try:
+            for step in range(partition_count):
+                partition = (start_partition + step) % partition_count
+                results = await self.db.exec(
+                    statement=stmt,
+                    params={
+                        "channel": self.notifier.channel,
+                        "partition": partition,
+                        "partition_count": partition_count,
+                        "max_batch_size": max_batch_size
+                    }
+                )
+                results = [TriggerEventProcess(**event) for event in results.mappings().all()]
+                if results:
+                    # The transaction stays open, the partition lock and row locks are released when fold_batch commits
+                    return results
+
+                await self.db.rollback()
+
+            await self.db.close()
+            return []
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg="Failed to claim queue")
+            raise DBError(
+                origin="TriggerEventRepository.claim_queue",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to claim queue"
+            ) from e
+
+    async def fold_batch(self, events: List[TriggerEventProcess], prior_numerator: float, prior_denominator: float) -> Tuple[List[StudentKnowledgeScore], List[TriggerEventProcess]]:
+        if not events:
+            return [], []
+
+        stmt = text(
+            """
+            INSERT INTO studentknowledge AS sk (student_id, concept_name, numerator, denominator, score, no_of_inputs, change_history)
+            SELECT
+                b.student_id,
+                b.concept_name,
+                b.numerator + :prior_numerator,
+                b.denominator + :prior_denominator,
+                (b.numerator + :prior_numerator) / (b.denominator + :prior_denominator),
+                b.no_of_inputs,
+                json_build_array(json_build_object(
+                    'timestamp', to_char(clock_timestamp(), 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+                    'score', (b.numerator + :prior_numerator) / (b.denominator + :prior_denominator),
+                    'no_of_inputs', b.no_of_inputs
+                ))
+            FROM unnest(
+                CAST(:student_ids AS integer[]),
+                CAST(:concept_names AS varchar[]),
+                CAST(:numerators AS double precision[]),
+                CAST(:denominators AS double precision[]),
+                CAST(:input_counts AS integer[])
+            ) AS b(student_id, concept_name, numerator, denominator, no_of_inputs)
+            -- EXCLUDED carries the prior meant for a new row, an existing row only takes the batch sums
+            ON CONFLICT (student_id, concept_name) DO UPDATE SET
+                numerator = sk.numerator + (EXCLUDED.numerator - :prior_numerator),
+                denominator = sk.denominator + (EXCLUDED.denominator - :prior_denominator),
+                score = (sk.numerator + (EXCLUDED.numerator - :prior_numerator)) / (sk.denominator + (EXCLUDED.denominator - :prior_denominator)),
+                no_of_inputs = COALESCE(sk.no_of_inputs, 0) + EXCLUDED.no_of_inputs,
+                change_history = (
+                    COALESCE(sk.change_history::jsonb, '[]'::jsonb) || jsonb_build_array(jsonb_build_object(
+                        'timestamp', to_char(clock_timestamp(), 'YYYY-MM-DD"T"HH24:MI:SS.US'),
+                        'score', (sk.numerator + (EXCLUDED.numerator - :prior_numerator)) / (sk.denominator + (EXCLUDED.denominator - :prior_denominator)),
+                        'no_of_inputs', COALESCE(sk.no_of_inputs, 0) + EXCLUDED.no_of_inputs
+                    ))
+                )::json
+            RETURNING sk.student_id, sk.concept_name, sk.numerator, sk.denominator, sk.score
+            """
+            )
+        params = {
+            "student_ids": [event.student_id for event in events],
+            "concept_names": [event.concept for event in events],
+            "numerators": [event.numerator for event in events],
+            "denominators": [event.denominator for event in events],
+            "input_counts": [len(event.event_ids) for event in events],
+            "prior_numerator": prior_numerator,
+            "prior_denominator": prior_denominator
+        }
+
+        try:
+            results = await self.db.exec(statement=stmt, params=params)
+            folded = [StudentKnowledgeScore(**row) for row in results.mappings().all()]
+
+            await self.db.exec(
+                statement=text("DELETE FROM triggerevent WHERE event_id = ANY(CAST(:event_ids AS integer[]))"),
+                params={"event_ids": [int(event_id) for event in events for event_id in event.event_ids]}
+            )
+
+            await self.db.commit()
+            await self.db.close()
+            return folded, []
+
+        except IntegrityError as e:
+            await self.db.rollback()
+            if getattr(e.orig, "pgcode", None) != FOREIGN_KEY_VIOLATION:
+                logger.exception(msg="Failed to fold trigger event batch")
+                raise DBError(
+                    origin="TriggerEventRepository.fold_batch",
+                    type="QueryExecError",
+                    status_code=500,
+                    message="Failed to fold trigger event batch"
+                ) from e
+
+            # A student or concept was removed under its events, the whole batch goes through the per-row path
+            logger.warning(msg=f"Trigger event batch failed the foreign key checks, falling back to per-row processing: {e.orig}")
+            await self.db.close()
+            return [], events
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.exception(msg="Failed to fold trigger event batch")
+            raise DBError(
+                origin="TriggerEventRepository.fold_batch",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to fold trigger event batch"
+            ) from e
+
+    async def reclaim(self, event: TriggerEventProcess, partition_count: int) -> Optional[TriggerEventProcess]:
+        partition_stmt = text("SELECT pg_advisory_xact_lock(hashtext(:channel), mod(:student_id, :partition_count))")
+        events_stmt = text(
+            """
+            SELECT array_agg(e.event_id) AS event_ids, SUM(e.weight * e.value) AS numerator, SUM(e.weight) AS denominator
+            FROM (
+                SELECT event_id, weight, value FROM triggerevent
+                WHERE event_id = ANY(CAST(:event_ids AS integer[]))
+                FOR UPDATE SKIP LOCKED
+            ) e
+            """
+            )
+
+        try:
+            # Waits for a worker folding the partition, its events are gone from triggerevent once it commits
+            await self.db.exec(
+                statement=partition_stmt,
+                params={"channel": self.notifier.channel, "student_id": event.student_id, "partition_count": partition_count}
+            )
+            result = (await self.db.exec(
+                statement=events_stmt,
+                params={"event_ids": [int(event_id) for event_id in event.event_ids]}
+            )).mappings().one()
+
+            if not result["event_ids"]:
+                await self.release()
+                return None
+            # The transaction stays open, the locks are released when bulk_delete commits or by release
+            return TriggerEventProcess(student_id=event.student_id, concept=event.concept, **result)
+
+        except Exception as e:
+            await self.release()
+            logger.exception(msg=f"Failed to reclaim trigger events of student_id: {event.student_id}, concept: {event.concept}")
+            raise DBError(
+                origin="TriggerEventRepository.reclaim",
+                type="QueryExecError",
+                status_code=500,
+                message="Failed to reclaim trigger events"
+            ) from e
+
+    async def release(self) -> None:
+        await self.db.rollback()
+        await self.db.close()
+
     async def bulk_delete(self, event_ids: list[int]):
         try:
             stmt = delete(TriggerEvent).where(TriggerEvent.event_id.in_(event_ids))
-            self.db.exec(statement=stmt)
-            self.db.commit()
-            self.db.close()
+            await self.db.exec(statement=stmt)
+            await self.db.commit()
+            await self.db.close()
             
         except Exception as e:
             logger.exception(msg="Failed to delete event object")
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from queue import Queue, Empty, Full
+from threading import Thread
+from typing import List, Tuple
+
+from app.config.environment import get_settings
+from app.domain.models.trigger_event import TriggerEventCreate
+from app.domain.protocols.repositories.trigger_event import TriggerEventRepository as TriggerEventRepoProtocol
+from ..database.repositories.trigger_event import TriggerEventRepository
+from ..database.db import get_db, dispose_db
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# Sentinel placed on the queue to stop the flusher after a final flush
+_STOP = object()
+
+
+def start_event_buffer():
+    if _SETTINGS.TRIGGER_EVENT_BUFFER:
+        TriggerEventBuffer().start()
+
+def stop_event_buffer():
+    TriggerEventBuffer().stop()
+
+
+class TriggerEventBuffer:
+    """
+    In memory write-behind buffer following the Singleton pattern, coalesces submitted trigger events
+    and writes them with one multi-row INSERT every flush_interval seconds or max_events events, whichever comes first.
+
+    The queue is bounded by capacity, once full append() waits for the flusher to make room (backpressure).
+    stop() flushes everything still buffered before returning.
+    """
+    _buffer = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._buffer:
+            cls._buffer = super(TriggerEventBuffer, cls).__new__(cls, *args, **kwargs)
+        return cls._buffer
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.flush_interval = _SETTINGS.TRIGGER_EVENT_BUFFER_FLUSH_MS / 1000
+            self.max_events = max(_SETTINGS.TRIGGER_EVENT_BUFFER_MAX_EVENTS, 1)
+            self._queue = Queue(maxsize=_SETTINGS.TRIGGER_EVENT_BUFFER_CAPACITY)
+            self._thread = None
+            self.initialized = True
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    async def append(self, event: TriggerEventCreate) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except Full:
+            logger.warning("Trigger event buffer full, waiting for a flush")
+            await asyncio.to_thread(self._queue.put, event)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = Thread(target=self.worker, name="trigger-event-buffer")
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+    def worker(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        event_repo: TriggerEventRepoProtocol = TriggerEventRepository(db=get_db())
+
+        stopping = False
+        while not stopping:
+            events, stopping = self._collect()
+            if events:
+                loop.run_until_complete(self.flush(event_repo=event_repo, events=events))
+
+        loop.run_until_complete(dispose_db())
+        loop.close()
+
+    def _collect(self) -> Tuple[List[TriggerEventCreate], bool]:
+        """
+        Blocks until an event arrives, then gathers more until the flush interval elapses or max_events is reached.
+        Returns the events and whether the stop sentinel was seen.
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return self._drain(), True
+
+        events = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(events) < self.max_events:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except Empty:
+                break
+            if item is _STOP:
+                return events + self._drain(), True
+            events.append(item)
+
+        return events, False
+
+    def _drain(self) -> List[TriggerEventCreate]:
+        events = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                return events
+            if item is not _STOP:
+                events.append(item)
+
+    async def flush(self, event_repo: TriggerEventRepoProtocol, events: List[TriggerEventCreate]) -> None:
+        for start in range(0, len(events), self.max_events):
+            chunk = events[start:start + self.max_events]
+            try:
+                await event_repo.bulk_insert(events=chunk)
+            except Exception:
+                # One bad row (e.g. an unknown concept) fails the whole INSERT, retry row by row so the rest are kept
+                logger.exception(msg=f"Failed to flush {len(chunk)} buffered Trigger Events, retrying one at a time")
+                for event in chunk:
+                    try:
+                        await event_repo.add(event=event)
+                    except Exception:
+                        logger.exception(msg=f"Dropped buffered Trigger Event: {event}")
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import select
+import time
+from threading import Condition, Thread
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from app.config.environment import get_settings
+
+_SETTINGS = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class QueueNotifier:
+    """
+    In memory wakeup signal following the Singleton pattern, shared between the request handlers and the trigger event worker threads.
+
+    Repositories call notify() after committing new trigger events, which bumps version and wakes every waiter.
+    Each worker reads version before checking its queue and, once idle, waits for it to move past what it read,
+    so one worker picking up a notification never hides it from the others.
+    Replicas are woken through a Postgres LISTEN/NOTIFY channel, see start_pg_listener.
+    """
+    _notifier = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._notifier:
+            cls._notifier = super(QueueNotifier, cls).__new__(cls, *args, **kwargs)
+        return cls._notifier
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.channel = self._channel()
+            self._changed = Condition()
+            self.version = 0
+            self.initialized = True
+
+    @staticmethod
+    def _channel() -> str:
+        return _SETTINGS.TRIGGER_EVENT_NOTIFY_CHANNEL
+
+    def notify(self) -> None:
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def _wait(self, version: int, timeout: float) -> bool:
+        with self._changed:
+            return self._changed.wait_for(lambda: self.version != version, timeout)
+
+    async def wait(self, version: int, timeout: float) -> bool:
+        """
+        Waits off the event loop until notified after version was read, or until the timeout elapses.
+        Returns True if woken by a notification.
+        """
+        return await asyncio.to_thread(self._wait, version, timeout)
+
+
+class JobNotifier(QueueNotifier):
+    """
+    Wakeup signal of the background job workers, notified after a job is enqueued. Same semantics as QueueNotifier on its own channel.
+    """
+    _notifier = None
+
+    @staticmethod
+    def _channel() -> str:
+        return _SETTINGS.JOB_NOTIFY_CHANNEL
+
+
+class PromptNotifier(QueueNotifier):
+    """
+    Change signal of the prompt templates, notified after a prompt is created or updated, here or in another replica.
+    PromptCache reloads once its templates are older than the current version.
+    """
+    _notifier = None
+
+    @staticmethod
+    def _channel() -> str:
+        return _SETTINGS.PROMPT_NOTIFY_CHANNEL
+
+
+def listen(notifier: QueueNotifier, reconnect_delay: float = 5.0) -> None:
+    """
+    Blocking loop that LISTENs on the notifier's channel and forwards every Postgres notification to the in-process signal.
+    Reconnects after reconnect_delay seconds if the connection drops.
+    The signal is also raised whenever LISTEN is (re)established, as notifications sent while not listening are lost,
+    so workers recheck their queue and PromptCache reloads.
+    """
+    engine = create_engine(_SETTINGS.DATABASE1_URL, poolclass=NullPool)
+
+    while True:
+        connection = None
+        try:
+            connection = engine.raw_connection()
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{notifier.channel}"')
+            logger.info(f"Listening for notifications on channel: {notifier.channel}")
+            notifier.notify()
+
+            while True:
+                readable, _, _ = select.select([dbapi_connection], [], [], 60)
+                if not readable:
+                    continue
+
+                dbapi_connection.poll()
+                if dbapi_connection.notifies:
+                    dbapi_connection.notifies.clear()
+                    notifier.notify()
+
+        except Exception:
+            logger.exception(msg=f"Listener on channel: {notifier.channel} failed, reconnecting in {reconnect_delay}s")
+            time.sleep(reconnect_delay)
+
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+
+def start_pg_listener(notifier: QueueNotifier) -> Thread:
+    listener = Thread(target=listen, args=(notifier,), daemon=True)
+    listener.start()
+    return listener
@@ -1,9 +1,12 @@
-from app.domain.models.student import StudentKnowledgeCreate
+from app.domain.models.student import StudentKnowledgeCreate, StudentKnowledgeScore
 
 from ..database.repositories.trigger_event import TriggerEventRepository
 from app.domain.protocols.repositories.trigger_event import TriggerEventRepository as TriggerEventRepoProtocol
 from ..database.repositories.student import StudentKnowledgeRepository
-import time
+from ..database.db import get_db
+from .notifier import QueueNotifier, start_pg_listener
+from ..cache.knowledge_matrix import KnowledgeMatrixCache
+from app.config.environment import get_settings
 import logging 
 import asyncio
 from threading import Thread
@@ -11,16 +14,48 @@ from threading import Thread
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+_SETTINGS = get_settings()
+
+# Prior applied to a student's first score for a concept, equivalent to one input of 0.5 at weight 1
+PRIOR_NUMERATOR = .5
+PRIOR_DENOMINATOR = 1
+
 def start_process_worker():
-    process_manger = Process_Manager(max_batch_size=100)
-    worker = Thread(target=process_manger.worker)
-    worker.start()
+    if _SETTINGS.TRIGGER_EVENT_LISTEN:
+        start_pg_listener(notifier=QueueNotifier())
+
+    for worker_index in range(_SETTINGS.TRIGGER_EVENT_WORKER_COUNT):
+        process_manger = Process_Manager(
+            max_batch_size=_SETTINGS.TRIGGER_EVENT_BATCH_SIZE,
+            min_idle=_SETTINGS.TRIGGER_EVENT_MIN_IDLE_SECONDS,
+            max_idle=_SETTINGS.TRIGGER_EVENT_MAX_IDLE_SECONDS,
+            partition_count=_SETTINGS.TRIGGER_EVENT_PARTITIONS,
+            worker_index=worker_index
+        )
+        worker = Thread(target=process_manger.worker, name=f"trigger-event-worker-{worker_index}")
+        worker.start()
 
 class Process_Manager:
-    def __init__(self, max_batch_size: int = 250):
+    def __init__(
+            self, 
+            max_batch_size: int = 250, 
+            batch_mode: bool = True, 
+            min_idle: float = 1.0, 
+            max_idle: float = 60.0,
+            partition_count: int = 1,
+            worker_index: int = 0
+    ):
         self.max_batch_size = max_batch_size
-        self.event_repo: TriggerEventRepoProtocol = TriggerEventRepository()
-        self.s_k_repo = StudentKnowledgeRepository()
+        self.batch_mode = batch_mode
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.partition_count = max(partition_count, 1)
+        # Workers start their partition scan at different offsets so they spread across partitions
+        self.next_partition = worker_index % self.partition_count
+        self.notifier = QueueNotifier()
+        self.event_repo: TriggerEventRepoProtocol = TriggerEventRepository(db=get_db())
+        self.s_k_repo = StudentKnowledgeRepository(db=get_db())
+        self.knowledge_cache = KnowledgeMatrixCache()
 
     def worker(self):
         loop = asyncio.new_event_loop()
@@ -30,8 +65,15 @@ class Process_Manager:
         loop.close()
 
     async def start(self):
+        """
+        Drains the queue back to back while batches make progress, then waits for a wakeup from the notifier.
+        While idle the wait timeout doubles from min_idle up to max_idle so an empty queue is polled less and less often.
+        """
         paused = True
+        idle_delay = self.min_idle
         while True:
+            # Read before checking so a notification arriving mid-check still wakes the next wait
+            seen = self.notifier.version
             queue_exists = await self.event_repo.queue_check()
 
             if queue_exists:
@@ -39,17 +81,71 @@ class Process_Manager:
                     logger.info("Processing trigger events")
                     paused = False
 
-                events = await self.event_repo.get_queue(max_batch_size=self.max_batch_size)
-                await self.run(events=events)
+                if self.batch_mode:
+                    events = await self.event_repo.claim_queue(
+                        max_batch_size=self.max_batch_size,
+                        partition_count=self.partition_count,
+                        start_partition=self.next_partition
+                    )
+                    self.next_partition = (self.next_partition + 1) % self.partition_count
+                    folded = await self.run_batch(events=events)
+                else:
+                    events = await self.event_repo.get_queue(max_batch_size=self.max_batch_size)
+                    folded = await self.run(events=events)
+
+                if folded:
+                    idle_delay = self.min_idle
+                    continue
 
             else:
                 if not paused:
                     paused = True
                     logger.info("Queue empty process paused")
 
-            time.sleep(60)
+            woken = await self.notifier.wait(version=seen, timeout=idle_delay)
+            idle_delay = self.min_idle if woken else min(idle_delay * 2, self.max_idle)
+
+    async def run_batch(self, events):
+        """
+        Folds a batch leased by claim_queue into StudentKnowledge with one set-based upsert,
+        groups that fail the foreign key checks fall back to the per-row path in run().
+        The lease ends with fold_batch either way, so each fallback group is reclaimed first and only its events no other worker folded are run.
+        The folded scores are written through to the knowledge matrix cache.
+        """
+        if not events:
+            logger.info("No events to process")
+            return 0
+
+        try:
+            scores, unfolded = await self.event_repo.fold_batch(
+                events=events,
+                prior_numerator=PRIOR_NUMERATOR,
+                prior_denominator=PRIOR_DENOMINATOR
+            )
+            self.knowledge_cache.apply(scores)
+        except Exception:
+            logger.exception(msg="Batch fold failed, falling back to per-row processing")
+            unfolded = events
+
+        folded = len(events) - len(unfolded)
+        for event in unfolded:
+            try:
+                reclaimed = await self.event_repo.reclaim(event=event, partition_count=self.partition_count)
+                if reclaimed is not None:
+                    folded += await self.run(events=[reclaimed])
+            except Exception:
+                logger.exception(msg=f"Fallback for student_id: {event.student_id}, concept: {event.concept} failed")
+            finally:
+                # run() leaves the lease open when the group can not be folded
+                await self.event_repo.release()
+
+        return folded
 
     async def run(self, events):
+            """
+            Folds each group into StudentKnowledge one at a time, returns the number of groups folded
+            """
+            folded = 0
             if not events:
                 logger.info("No events to process")
             else:
@@ -62,7 +158,7 @@ class Process_Manager:
 
                         new_score = calculated_numerator / calculated_denominator
 
-                        await self.s_k_repo.update(
+                        knowledge = await self.s_k_repo.update(
                             StudentKnowledgeCreate(
                                 student_id=event.student_id, 
                                 concept_name=event.concept, 
@@ -72,14 +168,16 @@ class Process_Manager:
                                 no_of_inputs=score.no_of_inputs + input_count
                                 ))
                         await self.event_repo.bulk_delete(event_ids=event.event_ids)
+                        self.knowledge_cache.apply([StudentKnowledgeScore.from_orm(knowledge)])
+                        folded += 1
 
                     except Exception as e:
                         try:
-                            calculated_numerator = event.numerator + .5
-                            calculated_denominator = event.denominator + 1
+                            calculated_numerator = event.numerator + PRIOR_NUMERATOR
+                            calculated_denominator = event.denominator + PRIOR_DENOMINATOR
                             new_score = calculated_numerator / calculated_denominator
 
-                            await self.s_k_repo.add(
+                            knowledge = await self.s_k_repo.add(
                                 StudentKnowledgeCreate(
                                     student_id=event.student_id, 
                                     concept_name=event.concept, 
@@ -90,9 +188,12 @@ class Process_Manager:
                                     )
                                     )
                             await self.event_repo.bulk_delete(event_ids=event.event_ids)
+                            self.knowledge_cache.apply([StudentKnowledgeScore.from_orm(knowledge)])
+                            folded += 1
 
                         except Exception as e:
                             #Fails if student id doesn't exist in system
                             logger.exception(msg=f"Either student with student_id: {event.student_id}, or concept with concept_name: {event.concept} does not exist.")
                             continue
 
+            return folded
@@ -0,0 +1,117 @@
+"""
+Background job operations. Services are built with their own sessions from get_db() as the FastAPI dependencies are not available outside a request,
+the sessions of a job are closed when it ends.
+"""
+from typing import List
+
+from fastapi import UploadFile
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.app.routes.qas import generate_personalized_quizzes, register_course
+from app.domain.models.forms import ModuleForm, RegistrationForm
+from app.domain.models.job import JobRun
+from app.domain.protocols.routes.qas import PersonalizedQuizProtocol
+from app.domain.services.concept import ConceptService
+from app.domain.services.course import CourseService
+from app.domain.services.domain import DomainService
+from app.domain.services.module import ModuleService
+from app.domain.services.question import QuestionService
+from app.domain.services.student import StudentService
+from app.utils.encryption import decrypt_json
+from ..database.db import get_db
+from ..database.repositories.concept import (
+    ConceptRepository,
+    ConceptToConceptRepository,
+    ConceptToDomainRepository,
+    ConceptToModuleRepository,
+)
+from ..database.repositories.course import CourseRepository
+from ..database.repositories.domain import DomainRepository
+from ..database.repositories.module import ModuleRepository
+from ..database.repositories.question import AnswerRepository, QuestionRepository
+from ..database.repositories.student import StudentKnowledgeRepository, StudentRepository, StudentToCourseRepository
+from .runner import JobRunner
+
+
+class JobSessions:
+    """
+    Hands out a separate session per repository, as the request dependencies do, and closes all of them when the job ends
+    so none is left holding a pooled connection.
+    """
+    def __init__(self) -> None:
+        self._sessions: List[AsyncSession] = []
+
+    def __call__(self) -> AsyncSession:
+        db = get_db()
+        self._sessions.append(db)
+        return db
+
+    async def __aenter__(self) -> "JobSessions":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        for db in self._sessions:
+            await db.close()
+
+
+def build_concept_service(db: JobSessions) -> ConceptService:
+    return ConceptService(
+        concept_repo=ConceptRepository(db=db()),
+        c_to_d_repo=ConceptToDomainRepository(db=db()),
+        c_to_m_repo=ConceptToModuleRepository(db=db()),
+        c_to_c_repo=ConceptToConceptRepository(db=db())
+    )
+
+
+def build_course_service(db: JobSessions) -> CourseService:
+    return CourseService(course_repo=CourseRepository(db=db()), concept_service=build_concept_service(db))
+
+
+async def run_register(job: JobRun, files: List[UploadFile]):
+    async with JobSessions() as db:
+        return await register_course(
+            model_name=job.payload["model_name"],
+            content_files=files,
+            form_data=RegistrationForm(**job.payload["form_data"]),
+            course_service=build_course_service(db),
+            domain_service=DomainService(domain_repo=DomainRepository(db=db()))
+        )
+
+
+async def run_create_module(job: JobRun, files: List[UploadFile]):
+    async with JobSessions() as db:
+        module_service = ModuleService(
+            module_repo=ModuleRepository(db=db()),
+            concept_service=build_concept_service(db),
+            course_service=build_course_service(db)
+        )
+        return await module_service.create_module(
+            form_data=ModuleForm(**job.payload["form_data"]),
+            files=files,
+            model_name=job.payload["model_name"]
+        )
+
+
+async def run_generate_personalized_quizzes(job: JobRun, files: List[UploadFile]):
+    # The access token is kept out of the payload, see generate_personalized_quiz_for_all_students
+    secrets = decrypt_json(job.secrets)
+    async with JobSessions() as db:
+        return await generate_personalized_quizzes(
+            quiz_params=PersonalizedQuizProtocol(**job.payload["quiz_params"], canvas_access_token=secrets["canvas_access_token"]),
+            question_service=QuestionService(
+                question_repo=QuestionRepository(db=db()),
+                answer_repo=AnswerRepository(db=db())
+            ),
+            concept_service=build_concept_service(db),
+            student_service=StudentService(
+                student_repo=StudentRepository(db=db()),
+                s_k_repo=StudentKnowledgeRepository(db=db()),
+                s_to_c_repo=StudentToCourseRepository(db=db())
+            )
+        )
+
+
+def register_operations(runner: JobRunner) -> None:
+    runner.register("qas:register", run_register)
+    runner.register("qas:create-module", run_create_module)
+    runner.register("qas:generate-personalized-quizzes", run_generate_personalized_quizzes)
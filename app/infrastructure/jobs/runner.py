@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from threading import Thread
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import UploadFile
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import Headers
+
+from app.config.environment import get_settings
+from app.domain.models.errors import ErrorResponse
+from app.domain.models.job import JobRun
+from app.domain.protocols.repositories.job import JobRepository as JobRepoProtocol
+from ..database.db import get_db, dispose_db
+from ..LLM.clients import close_clients as close_llm_clients
+from ..database.repositories.job import JobRepository
+from ..event_processor.notifier import JobNotifier, start_pg_listener
+
+logger = logging.getLogger(__name__)
+
+_SETTINGS = get_settings()
+
+OperationHandler = Callable[[JobRun, List[UploadFile]], Awaitable[Any]]
+
+
+@dataclass
+class Operation:
+    handler: OperationHandler
+    # Handlers that are not safe to run twice are only rerun when a crashed worker's lease expires
+    retry_on_error: bool = False
+
+
+class JobRunner:
+    """
+    Registry of the operations the background job workers can run, following the Singleton pattern.
+    Operations are registered by name on startup, a job's operation field selects the handler.
+    """
+    _runner = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._runner:
+            cls._runner = super(JobRunner, cls).__new__(cls, *args, **kwargs)
+        return cls._runner
+
+    def __init__(self) -> None:
+        if not hasattr(self, "initialized"):
+            self.operations: Dict[str, Operation] = {}
+            self.initialized = True
+
+    def register(self, name: str, handler: OperationHandler, retry_on_error: bool = False) -> None:
+        self.operations[name] = Operation(handler=handler, retry_on_error=retry_on_error)
+
+    def get(self, name: str) -> Optional[Operation]:
+        return self.operations.get(name)
+
+
+def start_job_workers():
+    # Imported here as the operations pull in the route handlers
+    from .operations import register_operations
+    register_operations(JobRunner())
+
+    if _SETTINGS.JOB_LISTEN:
+        start_pg_listener(notifier=JobNotifier())
+
+    for worker_index in range(_SETTINGS.JOB_WORKER_COUNT):
+        job_worker = JobWorker(worker_index=worker_index)
+        worker = Thread(target=job_worker.worker, name=f"job-worker-{worker_index}", daemon=True)
+        worker.start()
+
+
+class JobWorker:
+    def __init__(
+            self,
+            worker_index: int = 0,
+            min_idle: float = _SETTINGS.JOB_MIN_IDLE_SECONDS,
+            max_idle: float = _SETTINGS.JOB_MAX_IDLE_SECONDS
+    ):
+        # Unique across replicas so a lease can only be completed by the worker holding it
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{worker_index}"
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.runner = JobRunner()
+        self.notifier = JobNotifier()
+        self.job_repo: JobRepoProtocol = JobRepository(db=get_db())
+        # Separate session so heartbeats can run while the job holds the other one
+        self.heartbeat_repo: JobRepoProtocol = JobRepository(db=get_db())
+
+    def worker(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        try:
+            loop.run_until_complete(self.start())
+        finally:
+            loop.run_until_complete(close_llm_clients())
+            loop.run_until_complete(dispose_db())
+            loop.close()
+
+    async def start(self):
+        """
+        Runs jobs back to back while the queue has any, then waits for a wakeup from the notifier.
+        While idle the wait timeout doubles from min_idle up to max_idle, the poll also picks up jobs abandoned by crashed workers.
+        """
+        idle_delay = self.min_idle
+        while True:
+            seen = self.notifier.version
+            try:
+                job = await self.job_repo.claim(worker=self.name, stale_after=_SETTINGS.JOB_STALE_SECONDS)
+            except Exception:
+                logger.exception(msg="Job claim failed")
+                job = None
+
+            if job is not None:
+                try:
+                    await self.run(job=job)
+                except Exception:
+                    # The lease expires and the job is reclaimed once its heartbeat goes stale
+                    logger.exception(msg=f"Recording the outcome of job {job.job_id} failed")
+                idle_delay = self.min_idle
+                continue
+
+            woken = await self.notifier.wait(version=seen, timeout=idle_delay)
+            idle_delay = self.min_idle if woken else min(idle_delay * 2, self.max_idle)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(_SETTINGS.JOB_HEARTBEAT_SECONDS)
+            try:
+                if not await self.heartbeat_repo.heartbeat(job_id=job_id, worker=self.name):
+                    logger.warning(f"Lost the lease of job {job_id}")
+                    return
+            except Exception:
+                logger.exception(msg=f"Heartbeat of job {job_id} failed")
+
+    async def run(self, job: JobRun) -> None:
+        if job.attempts > job.max_attempts:
+            await self.job_repo.fail(
+                job_id=job.job_id,
+                worker=self.name,
+                error=f"Abandoned after {job.max_attempts} attempts.",
+                retry=False
+            )
+            return
+
+        operation = self.runner.get(job.operation)
+        if operation is None:
+            await self.job_repo.fail(job_id=job.job_id, worker=self.name, error=f"Unknown operation: {job.operation}", retry=False)
+            return
+
+        logger.info(f"Running job {job.job_id} ({job.operation}), attempt {job.attempts}/{job.max_attempts}")
+        heartbeat = asyncio.create_task(self._heartbeat(job_id=job.job_id))
+        started = time.monotonic()
+        try:
+            files = [
+                UploadFile(
+                    file=BytesIO(job_file.content),
+                    filename=job_file.filename,
+                    headers=Headers({"content-type": job_file.content_type or "application/octet-stream"})
+                )
+                for job_file in await self.job_repo.get_files(job_id=job.job_id)
+            ]
+            result = await operation.handler(job, files)
+
+        except Exception as e:
+            logger.exception(msg=f"Job {job.job_id} ({job.operation}) failed after {time.monotonic() - started:.2f}s")
+            await self.job_repo.fail(job_id=job.job_id, worker=self.name, error=str(e), retry=operation.retry_on_error)
+            return
+
+        finally:
+            heartbeat.cancel()
+
+        if isinstance(result, ErrorResponse):
+            logger.info(f"Job {job.job_id} ({job.operation}) returned an error after {time.monotonic() - started:.2f}s")
+            await self.job_repo.fail(job_id=job.job_id, worker=self.name, error=result.json(), retry=False)
+            return
+
+        logger.info(f"Job {job.job_id} ({job.operation}) succeeded in {time.monotonic() - started:.2f}s")
+        await self.job_repo.complete(job_id=job.job_id, worker=self.name, result=jsonable_encoder(result))
@@ -0,0 +1,39 @@
+""" This file stores the functions that encrypt values persisted outside the request, such as the credentials of background jobs."""
+import base64
+import hashlib
+import json
+from typing import Any, Dict
+
+from cryptography.fernet import Fernet
+
+from app.config.environment import get_secret_key
+
+
+def _fernet(key: str = None) -> Fernet:
+    if not key:
+        key = get_secret_key()
+
+    # Fernet expects 32 url-safe base64 encoded bytes, derived from the secret key so it can be of any length
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(key.encode()).digest()))
+
+
+def encrypt_json(value: Dict[str, Any], key: str = None) -> str:
+    """ Serializes the value to JSON and encrypts it.
+
+    Args:
+        value: JSON serializable dictionary.
+        key: Secret key, defaults to the app's secret key.
+
+    Returns:
+        The Fernet token as a string.
+    """
+    return _fernet(key).encrypt(json.dumps(value).encode()).decode()
+
+
+def decrypt_json(token: str, key: str = None) -> Dict[str, Any]:
+    """ Decrypts a token created by encrypt_json.
+
+    Raises:
+        cryptography.fernet.InvalidToken: If the token was not created with the same key or was altered.
+    """
+    return json.loads(_fernet(key).decrypt(token.encode()))
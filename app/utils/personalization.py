@@ -1,5 +1,5 @@
 """ This function contains multiple parsing utility functions used throughout the app."""
-from typing import List
+from typing import List, Dict, Optional
 
 import pandas as pd
 
@@ -31,31 +31,43 @@ async def convert_question_list_to_dataframe(questions: List[Question]) -> pd.Da
     return pd.DataFrame.from_records(data=[question.dict() for question in questions])
 
 
+async def index_answers_by_question_id(answers: List[AnswerRead]) -> Dict[int, List[AnswerRead]]:
+    """ This function groups a list of answer objects by the question they belong to.
+
+    Args:
+        answers: List of Answer objects
+
+    Returns:
+        Mapping of question_id to its answers, in the order they were given.
+    """
+    answers_by_question_id = {}
+    for answer in answers:
+        answers_by_question_id.setdefault(answer.question_id, []).append(answer)
+    return answers_by_question_id
+
+
 async def map_answers_to_questions(
         questions: List[Question],
-        answers: List[AnswerRead]
+        answers: Optional[List[AnswerRead]] = None,
+        answers_by_question_id: Optional[Dict[int, List[AnswerRead]]] = None
 ) -> List[QuestionAnswerSelection]:
     """ This function takes in a list of question objects and a list of answer objects and maps
-    them together. If an answer does not have a respective question then an error is raised.
+    them together. Questions without any answer are left out.
 
     Args:
         questions: List of Question objects
         answers: List of Answer objects
+        answers_by_question_id: Answers already indexed by index_answers_by_question_id, used
+            instead of 'answers' when mapping many question lists against one answer bank.
 
     Returns:
-        A list of mapped QuestionAnswerSelection Objects.
+        A list of mapped QuestionAnswerSelection Objects, in the order of the questions.
     """
-    # TODO: Improve the performance of this code. Currently O(nxm)
-    question_to_object_mapping ={}
-    for answer in answers:
-        for question in questions:
-            if question.id == answer.question_id:
-                if question_to_object_mapping.get(question.id) is None:
-                    question_to_object_mapping[question.id] = QuestionAnswerSelection(
-                        question=question,
-                        answers=[]
-                    )
-                question_to_object_mapping[question.id].answers = question_to_object_mapping[
-                    question.id].answers + [answer]
-
-    return list(question_to_object_mapping.values())
+    if answers_by_question_id is None:
+        answers_by_question_id = await index_answers_by_question_id(answers=answers or [])
+
+    return [
+        QuestionAnswerSelection(question=question, answers=answers_by_question_id[question.id])
+        for question in questions
+        if question.id in answers_by_question_id
+    ]
@@ -0,0 +1,67 @@
+"""
+Load test for the database layer, concurrent GETs against /health/db-pool and a repository backed route.
+
+Point it at a running server (docker compose up serves http://localhost:8080), the concept looked up should exist so the
+route goes through ConceptRepository rather than returning early. Latencies are reported per route, followed by the
+pool metrics the server reported at the end of the run.
+
+    python -m benchmarks.db_pool_load --base-url http://localhost:8080 --concept Recursion --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+from urllib.parse import quote
+
+import httpx
+import numpy as np
+
+
+async def hammer(client: httpx.AsyncClient, paths: List[str], requests_per_worker: int, latencies: Dict[str, List[float]], errors: Dict[str, int]):
+    for i in range(requests_per_worker):
+        path = paths[i % len(paths)]
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors[path] += 1
+        except httpx.HTTPError:
+            errors[path] += 1
+        latencies[path].append(time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    parser.add_argument("--concept", required=True, help="Name of an existing concept, read through /concept/one/{concept_name}")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests-per-worker", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    paths = ["/health/db-pool", f"/concept/one/{quote(args.concept)}"]
+    latencies = {path: [] for path in paths}
+    errors = {path: 0 for path in paths}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            hammer(client, paths[worker % 2:] + paths[:worker % 2], args.requests_per_worker, latencies, errors)
+            for worker in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        pool = (await client.get("/health/db-pool")).json()
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{args.concurrency} concurrent clients, {total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s)")
+    print(f"{'route':<40}{'n':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for path, samples in latencies.items():
+        p50, p95, p99, worst = np.percentile(np.array(samples) * 1000, [50, 95, 99, 100])
+        print(f"{path:<40}{len(samples):>7}{errors[path]:>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{worst:>10.1f}")
+    print(json.dumps(pool, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Per call overhead of ActionExecutor.executePrompt, pooled provider clients vs a client built for every call.
+
+Starts a local OpenAI compatible server answering /v1/chat/completions with a canned response after --server-latency,
+and points OPENAI_API_URL and LLAMA_API_URL at it. The per call mode mirrors the old executePrompt: a new ChatOpenAI for
+every gpt call and a new httpx.AsyncClient for every llama call. The pooled mode is the current executePrompt.
+The server is plain http, so the TLS handshakes a fresh client pays against the real providers are not included.
+
+    python -m benchmarks.llm_client_overhead --calls 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+_COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "{\"ok\": true}"}}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13},
+}
+
+
+def start_mock_server(latency: float) -> int:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions() -> dict:
+        await asyncio.sleep(latency)
+        return _COMPLETION
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+async def timed(call, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--server-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    port = start_mock_server(args.server_latency)
+    os.environ["OPENAI_API_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ["LLAMA_API_URL"] = f"http://127.0.0.1:{port}/v1/chat/completions"
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+    # Settings are read on import, so the app is only imported once the urls point at the mock server.
+    # app.app goes first like app.main does, the services reach the routes through app.app.errors.
+    from app.app import init_app  # noqa: F401
+    from app.infrastructure.LLM.action_exec import ActionExecutor
+    from app.infrastructure.LLM.clients import close_clients
+    from langchain_community.chat_models.openai import ChatOpenAI
+
+    # Per call request and telemetry logs would dominate the timings
+    logging.disable(logging.INFO)
+
+    executor = ActionExecutor()
+    executor.prompts = {"base-prompt": {"editable_part": "", "fixed_part": "", "text": "You are a benchmark."}}
+    context_prompt, action_prompt = "context", "action"
+
+    async def gpt_per_call():
+        model = ChatOpenAI(
+            model="gpt-4o-mini",
+            openai_api_key=os.environ["OPENAI_API_KEY"],
+            openai_api_base=os.environ["OPENAI_API_URL"],
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
+        await model.ainvoke(executor._chat_messages("openai", context_prompt, action_prompt))
+
+    async def llama_per_call():
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await client.post(
+                os.environ["LLAMA_API_URL"],
+                headers=executor._llama_headers(),
+                json=executor._llama_payload(context_prompt, action_prompt, stream=False)
+            )
+            response.raise_for_status()
+
+    cases = [
+        ("gpt", "per call", gpt_per_call),
+        ("gpt", "pooled", lambda: executor.executePrompt(context_prompt, action_prompt, "gpt-4o-mini")),
+        ("llama", "per call", llama_per_call),
+        ("llama", "pooled", lambda: executor.executePrompt(context_prompt, action_prompt, "llama-3")),
+    ]
+
+    print(f"{args.calls} calls per case, mock server latency {args.server_latency * 1000:.0f} ms")
+    print(f"{'model':<8}{'client':<10}{'concurrency':>12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'calls/s':>10}")
+    for concurrency in args.concurrency:
+        for model, mode, call in cases:
+            # One untimed call so imports and the first connection are not counted
+            await call()
+            latencies, elapsed = await timed(call, args.calls, concurrency)
+            latencies = sorted(latency * 1000 for latency in latencies)
+            print(f"{model:<8}{mode:<10}{concurrency:>12}{statistics.mean(latencies):>10.2f}{latencies[len(latencies) // 2]:>10.2f}"
+                  f"{latencies[int(len(latencies) * 0.95)]:>10.2f}{args.calls / elapsed:>10.0f}")
+
+    await close_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
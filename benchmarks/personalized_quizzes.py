@@ -0,0 +1,116 @@
+"""
+Personalized quiz selection benchmark, one batched pass over a students x concepts matrix vs a service per student.
+
+Runs on a synthetic question and answer bank and a synthetic knowledge matrix drawn from a fixed seed, no database or
+Canvas is involved. The per student mode mirrors the old route: a fresh QuestionPersonalizationService and a fresh
+answer mapping for every student.
+
+    python -m benchmarks.personalized_quizzes --students 100 1000 10000
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+# Imported first like app.main does, the services reach the routes through app.app.errors and would import them half initialized
+from app.app import init_app  # noqa: F401
+from app.domain.models.question import AnswerRead, Question
+from app.domain.protocols.services.personalization import KnowledgeStateParameters
+from app.domain.services.personalization import QuestionPersonalizationService
+from app.utils.personalization import index_answers_by_question_id, map_answers_to_questions
+
+
+def build_bank(n_concepts: int, questions_per_concept: int, answers_per_question: int):
+    concepts = [f"concept-{c}" for c in range(n_concepts)]
+    questions = [
+        Question(
+            id=c * questions_per_concept + q,
+            position=q,
+            question_name=concept,
+            question_type="multiple_choice_question",
+            question_text=f"{concept} question {q}",
+            points_possible=1,
+            neutral_comments=""
+        )
+        for c, concept in enumerate(concepts)
+        for q in range(questions_per_concept)
+    ]
+    answers = [
+        AnswerRead(id=question.id * answers_per_question + a, question_id=question.id, answer_text=f"answer {a}", answer_weight=100 if a == 0 else 0)
+        for question in questions
+        for a in range(answers_per_question)
+    ]
+    return concepts, questions, answers
+
+
+def build_knowledge_matrix(rng: np.random.Generator, n_students: int, n_concepts: int, missing: float) -> np.ndarray:
+    """
+    Scores drawn from a Beta(2, 2), a missing fraction of the entries is NaN like concepts a student has no entry for
+    """
+    matrix = rng.beta(2.0, 2.0, size=(n_students, n_concepts))
+    matrix[rng.random((n_students, n_concepts)) < missing] = np.nan
+    return matrix
+
+
+async def per_student(concepts, questions, answers, matrix, n_questions, seed):
+    rng = np.random.default_rng(seed)
+    quizzes = []
+    for row in matrix:
+        service = QuestionPersonalizationService(
+            knowledge_state=KnowledgeStateParameters(concept_list=concepts, student_knowledge_state={}, student_knowledge_vector=row),
+            questions=questions,
+            rng=rng
+        )
+        selected = await service.get_personalized_questions(n_questions=n_questions)
+        quizzes.append(await map_answers_to_questions(questions=selected, answers=answers))
+    return quizzes
+
+
+async def batched(concepts, questions, answers, matrix, n_questions, seed):
+    answers_by_question_id = await index_answers_by_question_id(answers=answers)
+    service = QuestionPersonalizationService(
+        knowledge_state=KnowledgeStateParameters(concept_list=concepts, student_knowledge_state={}),
+        questions=questions,
+        rng=np.random.default_rng(seed)
+    )
+    selected = await service.get_personalized_quizzes(student_knowledge_matrix=matrix, n_questions=n_questions)
+    return [await map_answers_to_questions(questions=quiz, answers_by_question_id=answers_by_question_id) for quiz in selected]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--concepts", type=int, default=40)
+    parser.add_argument("--questions-per-concept", type=int, default=25)
+    parser.add_argument("--answers-per-question", type=int, default=4)
+    parser.add_argument("--n-questions", type=int, default=10)
+    parser.add_argument("--missing", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-per-student-above", type=int, default=10_000,
+                        help="Class sizes above this only run the batched mode")
+    args = parser.parse_args()
+
+    concepts, questions, answers = build_bank(args.concepts, args.questions_per_concept, args.answers_per_question)
+    print(f"{len(concepts)} concepts, {len(questions)} questions, {len(answers)} answers, {args.n_questions} questions per quiz")
+    print(f"{'students':>10}{'per student s':>16}{'batched s':>12}{'speedup':>10}")
+
+    for n_students in args.students:
+        matrix = build_knowledge_matrix(np.random.default_rng(args.seed), n_students, len(concepts), args.missing)
+
+        start = time.perf_counter()
+        await batched(concepts, questions, answers, matrix, args.n_questions, args.seed)
+        batched_seconds = time.perf_counter() - start
+
+        if n_students > args.skip_per_student_above:
+            print(f"{n_students:>10}{'-':>16}{batched_seconds:>12.3f}{'-':>10}")
+            continue
+
+        start = time.perf_counter()
+        await per_student(concepts, questions, answers, matrix, args.n_questions, args.seed)
+        per_student_seconds = time.perf_counter() - start
+        print(f"{n_students:>10}{per_student_seconds:>16.3f}{batched_seconds:>12.3f}{per_student_seconds / batched_seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
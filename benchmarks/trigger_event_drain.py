@@ -0,0 +1,102 @@
+"""
+Trigger Event queue drain benchmark, accumulator table vs the old GROUP BY over the whole triggerevent table.
+
+For every size the pending events are generated in a transaction that is rolled back afterwards, so it can point at a
+development database, but it does need one with the schema created (start the app once) and is not meant for production.
+
+    python -m benchmarks.trigger_event_drain --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app.infrastructure.database.db import get_engine
+
+_STUDENT_OFFSET = 900_000_000
+
+_SEED = text(
+    """
+    INSERT INTO student(student_id, canvas_id)
+    SELECT :offset + s, 'bench-' || s FROM generate_series(1, :students) s;
+
+    INSERT INTO concept(name, subject, difficulty)
+    SELECT 'bench-concept-' || c, 'bench', 1 FROM generate_series(1, :concepts) c;
+    """
+)
+
+_EVENTS = text(
+    """
+    INSERT INTO triggerevent(datetime_stamp, student_id, concept, value, weight)
+    SELECT now(), :offset + 1 + (e % :students), 'bench-concept-' || (1 + (e / :students) % :concepts), random(), 1 + random()
+    FROM generate_series(0, :events - 1) e
+    """
+)
+
+_ACCUMULATOR_QUEUE = text(
+    """
+    SELECT event_ids FROM triggereventaccumulator LIMIT :batch_size
+    """
+)
+
+_LEGACY_QUEUE = text(
+    """
+    SELECT array_agg(event_id) event_ids, SUM(weight * value) numerator, SUM(weight) denominator
+    FROM triggerevent
+    GROUP BY student_id, concept
+    LIMIT :batch_size
+    """
+)
+
+_DELETE = text("DELETE FROM triggerevent WHERE event_id = ANY(:event_ids)")
+
+
+def drain(conn, mode: str, events: int, students: int, concepts: int, batch_size: int) -> dict:
+    trans = conn.begin()
+    try:
+        if mode == "legacy":
+            conn.execute(text("ALTER TABLE triggerevent DISABLE TRIGGER triggerevent_accumulate"))
+            conn.execute(text("ALTER TABLE triggerevent DISABLE TRIGGER triggerevent_release"))
+
+        params = {"offset": _STUDENT_OFFSET, "students": students, "concepts": concepts, "events": events}
+        conn.execute(_SEED, params)
+
+        start = time.perf_counter()
+        conn.execute(_EVENTS, params)
+        insert_seconds = time.perf_counter() - start
+
+        queue = _LEGACY_QUEUE if mode == "legacy" else _ACCUMULATOR_QUEUE
+        batches = 0
+        start = time.perf_counter()
+        while True:
+            rows = conn.execute(queue, {"batch_size": batch_size}).all()
+            if not rows:
+                break
+            conn.execute(_DELETE, {"event_ids": [event_id for row in rows for event_id in row.event_ids]})
+            batches += 1
+        drain_seconds = time.perf_counter() - start
+
+        return {"mode": mode, "events": events, "batches": batches, "insert_s": insert_seconds, "drain_s": drain_seconds}
+
+    finally:
+        trans.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--students", type=int, default=1_000)
+    parser.add_argument("--concepts", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=250)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'events':>10}{'batches':>10}{'insert s':>12}{'drain s':>12}")
+    with get_engine().connect() as conn:
+        for size in args.sizes:
+            for mode in ("legacy", "accumulator"):
+                result = drain(conn, mode, size, args.students, args.concepts, args.batch_size)
+                print(f"{result['mode']:<12}{result['events']:>10}{result['batches']:>10}{result['insert_s']:>12.2f}{result['drain_s']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
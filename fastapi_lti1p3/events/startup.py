@@ -1,4 +1,6 @@
 from ..config import AdapterConfig
+from ..session_cache import SessionCache
+from ..session_cache.backends import build_backend
 from ..models.settings import ToolConfigSettings, PlatformConfigSettings
 from typing import Union, Callable, Union, Coroutine, Any
 
@@ -72,4 +74,5 @@ def init_adapter_config(
     adapter_config = AdapterConfig()
     adapter_config.set_settings(tool_settings=tool_settings, platform_settings=platform_settings)
     adapter_config.assign_key_pair()
+    SessionCache().use_backend(build_backend(tool_settings))
 
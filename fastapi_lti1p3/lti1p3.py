@@ -186,7 +186,7 @@ class LTI(LTIProtocol):
                 global_id=response_dict["user"]["global_id"]
                 
                 )
-            self.session_cache.set(cache_id=session_id, key="client_credentials", value=client_credentials, store="session")
+            await self.session_cache.set(cache_id=session_id, key="client_credentials", value=client_credentials, store="session")
 
 
     async def get_client_grant():
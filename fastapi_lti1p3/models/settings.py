@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Type
+from typing import Optional, List, Literal, Type
 from fastapi_lti1p3.models.cache_models import Session
 
 class ToolConfigSettings(BaseModel):
@@ -33,6 +33,24 @@ class ToolConfigSettings(BaseModel):
     :param Type[Session] or Session SESSION_CLASS:
     The Pydantic Model stored in and returned by the session_cache, can be overridden to allow for additional fields to be stored in the cache. **WARNING** Additional fields must either be Optional or have a default value.
 
+    :param str or 'memory' SESSION_CACHE_BACKEND:
+    Where the session_cache keeps sessions and nonces. 'memory' keeps them in the process, 'redis' in Redis so they survive restarts and are shared by every worker.
+
+    :param str or None SESSION_CACHE_REDIS_URL:
+    The Redis URL used by the 'redis' backend, e.g. redis://localhost:6379/0
+
+    :param str or 'lti1p3' SSO_REDIS_SESSION_PREFIX:
+    Prefix of the keys the 'redis' backend stores sessions and nonces under.
+
+    :param int or 28800 SESSION_TTL_SECONDS:
+    Seconds a session lives without being used.
+
+    :param int or 600 NONCE_TTL_SECONDS:
+    Seconds a nonce lives after the OIDC initiation, orphaned nonces of abandoned launches are removed after it.
+
+    :param int or 10000 SESSION_CACHE_MAX_ENTRIES:
+    Size limit of each store of the 'memory' backend, the least recently used items are evicted past it.
+
     :param str TOOL_DOMAIN_NAME:
     The domain name of the tool.
 
@@ -74,6 +92,12 @@ class ToolConfigSettings(BaseModel):
     AUTH_FRAME_TEMPLATE: str = "simpleLaunch.html"
     DYNAMIC_REGISTRATION_TEMPLATE: str = "registration_form.html"
     SESSION_CLASS: Type[Session] = Session
+    SESSION_CACHE_BACKEND: Literal["memory", "redis"] = "memory"
+    SESSION_CACHE_REDIS_URL: Optional[str] = None
+    SSO_REDIS_SESSION_PREFIX: str = "lti1p3"
+    SESSION_TTL_SECONDS: int = 8 * 3600
+    NONCE_TTL_SECONDS: int = 600
+    SESSION_CACHE_MAX_ENTRIES: Optional[int] = 10000
     ENV: str
     LTI_PUBLIC_KEY: Optional[bytes] = None
     LTI_PRIVATE_KEY: Optional[bytes] = Field(default=None, exclude=True)
@@ -0,0 +1,43 @@
+from typing import Protocol, Literal, Any, Dict, Union
+from ..models.cache_models import Session, Nonce
+
+class SessionCacheBackend(Protocol):
+    """
+    Storage behind the SessionCache, holding the 'session' and 'nonce' stores
+    """
+
+    async def create(self, store: Literal["session", "nonce"], value: Union[Session, Nonce]) -> bool:
+        """
+        Stores a new object under its primary key, returns False without changing anything if the key is taken
+        """
+        pass
+
+    async def get(self, store: Literal["session", "nonce"], cache_id: str) -> Union[Session, Nonce, None]:
+        """
+        Returns the object stored at cache_id, or None if it does not exist or has expired
+        """
+        pass
+
+    async def pop(self, store: Literal["session", "nonce"], cache_id: str) -> Union[Session, Nonce, None]:
+        """
+        Returns and deletes the object stored at cache_id in one step, so it can only be retrieved once
+        """
+        pass
+
+    async def update(self, store: Literal["session", "nonce"], cache_id: str, values: Dict[str, Any]) -> Union[Session, Nonce, None]:
+        """
+        Sets attributes of the object stored at cache_id and returns the updated object, None if it does not exist
+        """
+        pass
+
+    async def delete(self, store: Literal["session", "nonce"], cache_id: str) -> None:
+        pass
+
+    async def get_all(self, store: Literal["session", "nonce"]) -> dict:
+        """
+        Returns every live object of a store by primary key, for debugging
+        """
+        pass
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,197 @@
+import json
+from typing import Literal, Any, Dict, Optional, Type, Union
+
+from fastapi.encoders import jsonable_encoder
+
+from ..errors import ConfigValidationError
+from ..models.cache_models import Session, Nonce
+from ..models.settings import ToolConfigSettings
+from .data_store import DataStore
+
+
+class MemoryBackend:
+    """
+    Keeps both stores in process memory, items expire after their TTL and the least recently used are evicted past max_entries.
+    Sessions are lost on restart and not shared between workers.
+    """
+    def __init__(self, session_ttl: Optional[float] = None, nonce_ttl: Optional[float] = None, max_entries: Optional[int] = None) -> None:
+        self.stores = {
+            "session": DataStore(ttl=session_ttl, max_entries=max_entries, sliding=True),
+            "nonce": DataStore(ttl=nonce_ttl, max_entries=max_entries, sliding=False)
+        }
+
+    async def create(self, store: Literal["session", "nonce"], value: Union[Session, Nonce]) -> bool:
+        return await self.stores[store].append(value)
+
+    async def get(self, store: Literal["session", "nonce"], cache_id: str) -> Union[Session, Nonce, None]:
+        return self.stores[store][cache_id]
+
+    async def pop(self, store: Literal["session", "nonce"], cache_id: str) -> Union[Session, Nonce, None]:
+        item = self.stores[store][cache_id]
+        del self.stores[store][cache_id]
+        return item
+
+    async def update(self, store: Literal["session", "nonce"], cache_id: str, values: Dict[str, Any]) -> Union[Session, Nonce, None]:
+        self.stores[store][cache_id] = values
+        return self.stores[store][cache_id]
+
+    async def delete(self, store: Literal["session", "nonce"], cache_id: str) -> None:
+        del self.stores[store][cache_id]
+
+    async def get_all(self, store: Literal["session", "nonce"]) -> dict:
+        return self.stores[store]._data
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisBackend:
+    """
+    Keeps both stores in Redis so sessions survive restarts and are shared by every worker.
+
+    Each object is a hash at '<prefix>:<store>:<primary key>' with one compact JSON value per non-null field, so updating an
+    attribute writes only that field. Every operation is a single pipelined round trip, apart from create which watches the key
+    to keep primary keys unique. Sessions have their TTL restarted whenever they are read or updated, nonces expire nonce_ttl after creation.
+
+    :param url: Redis URL, e.g. redis://localhost:6379/0, used when no client is given
+    :param client: A redis.asyncio.Redis compatible client, e.g. fakeredis.aioredis.FakeRedis() for integration tests
+    """
+    def __init__(
+            self,
+            url: Optional[str] = None,
+            client: Any = None,
+            prefix: str = "lti1p3",
+            session_class: Type[Session] = Session,
+            session_ttl: Optional[int] = None,
+            nonce_ttl: Optional[int] = None
+    ) -> None:
+        if client is None:
+            if not url:
+                raise ConfigValidationError(message="Invalid Config: SESSION_CACHE_REDIS_URL must be set to use the redis session cache backend.")
+            try:
+                from redis.asyncio import Redis
+            except ImportError as e:
+                raise ConfigValidationError(message="Invalid Config: the redis session cache backend requires the 'redis' package.") from e
+            client = Redis.from_url(url)
+
+        self.client = client
+        self.prefix = prefix
+        self.models = {"session": session_class, "nonce": Nonce}
+        self.ttls = {"session": session_ttl, "nonce": nonce_ttl}
+        self.primary_keys = {"session": "session_id", "nonce": "nonce"}
+
+    def _key(self, store: str, cache_id: str) -> str:
+        return f"{self.prefix}:{store}:{cache_id}"
+
+    @staticmethod
+    def _dump(values: Dict[str, Any]) -> Dict[str, str]:
+        return {field: json.dumps(value, separators=(",", ":")) for field, value in jsonable_encoder(values).items() if value is not None}
+
+    def _load(self, store: str, mapping: dict) -> Union[Session, Nonce, None]:
+        values = {
+            (field.decode() if isinstance(field, bytes) else field): json.loads(value)
+            for field, value in mapping.items()
+        }
+        # A hash without its primary key was recreated by an update after the object expired
+        if self.primary_keys[store] not in values:
+            return None
+        return self.models[store].model_validate(values)
+
+    def _expire(self, pipe, store: str, key: str) -> None:
+        if self.ttls[store] is not None:
+            pipe.expire(key, self.ttls[store])
+
+    async def create(self, store: Literal["session", "nonce"], value: Union[Session, Nonce]) -> bool:
+        from redis.exceptions import WatchError
+
+        key = self._key(store, str(value))
+        async with self.client.pipeline(transaction=True) as pipe:
+            await pipe.watch(key)
+            if await pipe.exists(key):
+                return False
+
+            pipe.multi()
+            pipe.hset(key, mapping=self._dump(value.model_dump()))
+            self._expire(pipe, store, key)
+            try:
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def get(self, store: Literal["session", "nonce"], cache_id: str) -> Union[Session, Nonce, None]:
+        key = self._key(store, cache_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(key)
+            if store == "session":
+                self._expire(pipe, store, key)
+            mapping = (await pipe.execute())[0]
+        return self._load(store, mapping)
+
+    async def pop(self, store: Literal["session", "nonce"], cache_id: str) -> Union[Session, Nonce, None]:
+        key = self._key(store, cache_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.delete(key)
+            mapping = (await pipe.execute())[0]
+        return self._load(store, mapping)
+
+    async def update(self, store: Literal["session", "nonce"], cache_id: str, values: Dict[str, Any]) -> Union[Session, Nonce, None]:
+        # Attributes the model does not have are ignored, as by Session.update
+        values = {field: value for field, value in values.items() if field in self.models[store].model_fields}
+        key = self._key(store, cache_id)
+        cleared = [field for field, value in values.items() if value is None]
+        fields = self._dump(values)
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            if fields:
+                pipe.hset(key, mapping=fields)
+            if cleared:
+                pipe.hdel(key, *cleared)
+            if store == "session":
+                self._expire(pipe, store, key)
+            pipe.hgetall(key)
+            mapping = (await pipe.execute())[-1]
+
+        item = self._load(store, mapping)
+        if item is None and mapping:
+            await self.client.delete(key)
+        return item
+
+    async def delete(self, store: Literal["session", "nonce"], cache_id: str) -> None:
+        await self.client.delete(self._key(store, cache_id))
+
+    async def get_all(self, store: Literal["session", "nonce"]) -> dict:
+        keys = [key async for key in self.client.scan_iter(match=self._key(store, "*"))]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            mappings = await pipe.execute()
+
+        items = [self._load(store, mapping) for mapping in mappings]
+        return {str(item): item for item in items if item is not None}
+
+    async def close(self) -> None:
+        # aclose was added in redis 5, close is deprecated from then on
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+
+def build_backend(tool_settings: ToolConfigSettings) -> Union[MemoryBackend, RedisBackend]:
+    """
+    Returns the session cache backend selected by SESSION_CACHE_BACKEND
+    """
+    if tool_settings.SESSION_CACHE_BACKEND == "redis":
+        return RedisBackend(
+            url=tool_settings.SESSION_CACHE_REDIS_URL,
+            prefix=tool_settings.SSO_REDIS_SESSION_PREFIX,
+            session_class=tool_settings.SESSION_CLASS,
+            session_ttl=tool_settings.SESSION_TTL_SECONDS,
+            nonce_ttl=tool_settings.NONCE_TTL_SECONDS
+        )
+
+    return MemoryBackend(
+        session_ttl=tool_settings.SESSION_TTL_SECONDS,
+        nonce_ttl=tool_settings.NONCE_TTL_SECONDS,
+        max_entries=tool_settings.SESSION_CACHE_MAX_ENTRIES
+    )
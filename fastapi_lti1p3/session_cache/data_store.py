@@ -1,32 +1,81 @@
-from typing import Literal, Any, Union
+import time
+from collections import OrderedDict
+from typing import Literal, Any, Optional, Union
 from ..models.cache_models import Session, Nonce
 
 class DataStore:
-    def __init__(self):
-        self._data = {}
+    """
+    In memory store of Session or Nonce objects with TTL and LRU eviction.
+
+    :param ttl: Seconds an item lives without being read or updated, None keeps items until evicted
+    :param max_entries: Size limit of the store, the least recently used item is evicted once it is exceeded
+    :param sliding: Reads and updates restart an item's TTL when True, as for sessions. Nonces keep the TTL they were created with.
+    """
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None, sliding: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sliding = sliding
+        # primary key -> (expires at, item), least recently used first
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @property
+    def _data(self) -> dict:
+        self.purge()
+        return {key: item for key, (_, item) in self._items.items()}
+
+    def _expires_at(self) -> float:
+        return time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+
+    def purge(self) -> None:
+        """
+        Removes every expired item
+        """
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._items.items() if expires_at <= now]:
+            del self._items[key]
 
     async def append(self, value: Union[Session, Nonce]) -> bool:
         """
         Adds item to data store and returns True if primary key of Session/Nonce obj is unique, else returns False
         """
-        if value not in self._data.values():
-            self._data[str(value)] = value
-            return True
-        
-        return False
-    
+        if self[str(value)] is not None:
+            return False
+
+        self._items[str(value)] = (self._expires_at(), value)
+        if self.max_entries is not None and len(self._items) > self.max_entries:
+            # Orphaned items are usually expired already, only then the least recently used live ones go
+            self.purge()
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return True
+
     def __getitem__(self, primary_key: str) -> Union[Session, Nonce, None]:
-        return self._data.get(primary_key)
-    
+        entry = self._items.get(primary_key)
+        if entry is None:
+            return None
+
+        expires_at, item = entry
+        if expires_at <= time.monotonic():
+            del self._items[primary_key]
+            return None
+
+        self._items.move_to_end(primary_key)
+        if self.sliding:
+            self._items[primary_key] = (self._expires_at(), item)
+        return item
+
     def __setitem__(self, key: str, value: dict) -> Union[Session, Nonce]:
         """
         updates attributes of item at key
         """
         item = self[key]
         return item.update(**value) if item else item
-    
+
     def __delitem__(self, key: str) -> None:
         try:
-            del self._data[key]
+            del self._items[key]
         except KeyError:
-            return None
\ No newline at end of file
+            return None
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -1,17 +1,19 @@
 from typing import Literal, Any, Union
 from ..models.cache_models import Session, Nonce
-from .data_store import DataStore
+from ..protocols.session_cache import SessionCacheBackend
+from .backends import MemoryBackend
 
-#TODO: Add option to Replace this cache with a Redis cache if the app scales beyond its capacity
-#TODO: Create protocol for session cache
 class SessionCache:
     """
-    In memory data cache following the Singleton pattern, 
+    Data cache following the Singleton pattern, 
     contains two data stores: session_store and nonce_store
 
     session_store - storage for active client-sessions
 
     nonce_store - Temporary storage for nonce value and other lti launch params, used during oidc auth process
+
+    The stores are kept by a SessionCacheBackend, in memory by default. init_adapter_config installs the backend selected
+    by the SESSION_CACHE_BACKEND tool setting, see use_backend().
     """
     _cache = None
 
@@ -22,10 +24,18 @@ class SessionCache:
     
     def __init__(self) -> None:
         if not hasattr(self, "initialized"):
-            self.session_store = DataStore()
-            self.nonce_store = DataStore()
+            self.backend: SessionCacheBackend = MemoryBackend()
             self.initialized = True
 
+    def use_backend(self, backend: SessionCacheBackend) -> None:
+        """
+        Replaces the backend, objects held by the previous one are not carried over
+        """
+        self.backend = backend
+
+    async def close(self) -> None:
+        await self.backend.close()
+
 
     async def get(self, cache_id: str, store: Literal["session", "nonce"]) -> Union[Session, Nonce, None]:
         """
@@ -39,21 +49,16 @@ class SessionCache:
         ---
         """
         if store == "session":
-            return self.session_store[cache_id]
+            return await self.backend.get(store="session", cache_id=cache_id)
         else:
-            nonce_session = self.nonce_store[cache_id]
-            await self.delete(cache_id=cache_id, store="nonce")
-            return nonce_session
+            return await self.backend.pop(store="nonce", cache_id=cache_id)
     
     async def get_all(self, store: Literal["session", "nonce"]) -> dict:
         #TODO: Delete this method if unused in prod
         """
         Returns the entire cached dictionary of one of the two stores, only really used for debugging
         """
-        if store == "session":
-            return self.session_store._data
-        else:
-            return self.nonce_store._data
+        return await self.backend.get_all(store=store)
 
     async def create_cache(self, value: Union[Session, Nonce]) -> bool:
         """
@@ -63,9 +68,9 @@ class SessionCache:
         :returns: Boolean value, True if value was successfully inserted, False if it was not.
         """
         if isinstance(value, Session):
-            return await self.session_store.append(value)
+            return await self.backend.create(store="session", value=value)
         else:
-            return await self.nonce_store.append(value)
+            return await self.backend.create(store="nonce", value=value)
 
     async def set(self, cache_id: str, key: str, value: Any, store: Literal["session", "nonce"]) -> Union[Session, Nonce, None]:
         """
@@ -77,12 +82,7 @@ class SessionCache:
         :param store: The data store to search: The 'session' data store contains client sessions. The 'nonce' data store contains temporary data related to the oidc auth handshake. 
         :returns: The updated Session or Nonce object
         """
-        if store == "session":
-            self.session_store[cache_id] = {key: value}
-            return self.session_store[cache_id]
-        else:
-            self.nonce_store[cache_id] = {key: value}
-            return self.nonce_store[cache_id]
+        return await self.backend.update(store=store, cache_id=cache_id, values={key: value})
 
 
     async def delete(self, cache_id: str, store: Literal["session", "nonce"]) -> None:
@@ -92,7 +92,4 @@ class SessionCache:
         :param cache_id: The key of the cached object being deleted
         :param store: The data store to search: The 'session' data store contains client sessions. The 'nonce' data store contains temporary data related to the oidc auth handshake. 
         """
-        if store == "session":
-            del self.session_store[cache_id]
-        else:
-            del self.nonce_store[cache_id]
\ No newline at end of file
+        await self.backend.delete(store=store, cache_id=cache_id)
\ No newline at end of file
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import pytest
+import requests
+from canvasapi import Canvas
+from canvasapi.exceptions import CanvasException
+
+from app.domain.models.question import AnswerRead, Question, QuestionAnswerSelection
+from app.domain.services import canvas
+from app.domain.services.canvas import CanvasCourseService
+
+BASE_URL = "https://canvas.test"
+
+
+class FakeCanvas(requests.adapters.BaseAdapter):
+    """
+    Transport adapter answering canvasapi's requests from canned responses, mounted on its requests session.
+    Routes map (method, path) to a list of (status, body, headers), the last one is repeated once the others are used up.
+    """
+    def __init__(self, routes, delay=0.0):
+        super().__init__()
+        self.routes = {key: list(responses) for key, responses in routes.items()}
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        key = (request.method, urlparse(request.url).path)
+        with self._lock:
+            self.calls.append(key)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            responses = self.routes[key]
+            status, body, headers = responses.pop(0) if len(responses) > 1 else responses[0]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode()
+        response.headers.update({"Content-Type": "application/json", **headers})
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(canvas._SETTINGS, "CANVAS_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(canvas._SETTINGS, "CANVAS_BACKOFF_MAX_SECONDS", 1.0)
+    monkeypatch.setattr(canvas._SETTINGS, "CANVAS_MAX_RETRIES", 3)
+
+
+def service_with(fake, course_id=1):
+    service = CanvasCourseService(access_token="token", course_id=course_id, base_url=BASE_URL)
+    service.canvas_client._Canvas__requester._session.mount(BASE_URL, fake)
+    return service
+
+
+def quiz_body(quiz_id=10, assignment_id=20):
+    return {"id": quiz_id, "assignment_id": assignment_id, "title": "quiz"}
+
+
+def test_canvasapi_still_exposes_the_requester_session():
+    # The service reads response headers through these private attributes, an upgrade renaming them breaks it
+    requester = Canvas(base_url=BASE_URL, access_token="token")._Canvas__requester
+
+    assert isinstance(requester._session, requests.Session)
+
+
+def test_response_hook_tracks_the_rate_limit_bucket():
+    fake = FakeCanvas({("GET", "/api/v1/courses/1/quizzes/10"): [(200, quiz_body(), {"X-Rate-Limit-Remaining": "640.5"})]})
+    service = service_with(fake)
+
+    asyncio.run(service._call(service.course.get_quiz, 10))
+
+    assert service._rate_limit_remaining == 640.5
+
+
+@pytest.mark.parametrize("status, body", [(429, {"errors": "throttled"}), (403, "403 Forbidden (Rate Limit Exceeded)")])
+def test_throttled_calls_are_retried_after_retry_after(status, body):
+    fake = FakeCanvas({("GET", "/api/v1/courses/1/quizzes/10"): [(status, body, {"Retry-After": "0.2"}), (200, quiz_body(), {})]})
+    service = service_with(fake)
+
+    start = time.perf_counter()
+    quiz = asyncio.run(service._call(service.course.get_quiz, 10))
+
+    assert quiz.id == 10
+    assert len(fake.calls) == 2
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_throttled_create_is_retried():
+    fake = FakeCanvas({("POST", "/api/v1/courses/1/quizzes"): [(429, {"errors": "throttled"}, {}), (200, quiz_body(), {})]})
+    service = service_with(fake)
+
+    quiz = asyncio.run(service._call(service.course.create_quiz, idempotent=False, quiz={"title": "quiz"}))
+
+    assert quiz.id == 10
+    assert fake.calls == [("POST", "/api/v1/courses/1/quizzes")] * 2
+
+
+def test_failed_create_is_not_retried():
+    fake = FakeCanvas({("POST", "/api/v1/courses/1/quizzes"): [(500, {"errors": "boom"}, {}), (200, quiz_body(), {})]})
+    service = service_with(fake)
+
+    with pytest.raises(CanvasException):
+        asyncio.run(service._call(service.course.create_quiz, idempotent=False, quiz={"title": "quiz"}))
+    assert len(fake.calls) == 1
+
+
+def test_failed_read_is_retried():
+    fake = FakeCanvas({("GET", "/api/v1/courses/1/quizzes/10"): [(502, {"errors": "boom"}, {}), (200, quiz_body(), {})]})
+    service = service_with(fake)
+
+    assert asyncio.run(service._call(service.course.get_quiz, 10)).id == 10
+    assert len(fake.calls) == 2
+
+
+def test_retries_give_up_after_max_retries():
+    fake = FakeCanvas({("GET", "/api/v1/courses/1/quizzes/10"): [(503, {"errors": "down"}, {})]})
+    service = service_with(fake)
+
+    with pytest.raises(CanvasException):
+        asyncio.run(service._call(service.course.get_quiz, 10))
+    assert len(fake.calls) == canvas._SETTINGS.CANVAS_MAX_RETRIES + 1
+
+
+def test_calls_in_flight_are_bounded(monkeypatch):
+    monkeypatch.setattr(canvas._SETTINGS, "CANVAS_MAX_CONCURRENCY", 3)
+    fake = FakeCanvas({("GET", "/api/v1/courses/1/quizzes/10"): [(200, quiz_body(), {})]}, delay=0.05)
+
+    async def read_many():
+        service = service_with(fake)
+        return await asyncio.gather(*(service._call(service.course.get_quiz, 10) for _ in range(12)))
+
+    assert len(asyncio.run(read_many())) == 12
+    assert fake.max_in_flight == 3
+
+
+def test_publish_personalized_quizzes_reports_every_student():
+    quiz_routes = {
+        ("POST", "/api/v1/courses/1/quizzes"): [(200, quiz_body(), {})],
+        ("GET", "/api/v1/courses/1/assignments/20"): [(200, {"id": 20, "course_id": 1}, {})],
+        ("POST", "/api/v1/courses/1/assignments/20/overrides"): [(200, {"id": 30, "assignment_id": 20}, {})],
+        ("PUT", "/api/v1/courses/1/quizzes/10"): [(200, quiz_body(), {})],
+        ("POST", "/api/v1/courses/1/quizzes/10/questions"): [(200, {"id": 40}, {}), (500, {"errors": "boom"}, {}), (200, {"id": 41}, {})],
+    }
+    fake = FakeCanvas(quiz_routes)
+    service = service_with(fake)
+    questions = [
+        QuestionAnswerSelection(
+            question=Question(id=i, position=i, question_name="recursion", question_type="multiple_choice_question",
+                              question_text=f"question {i}", points_possible=1, neutral_comments=""),
+            answers=[AnswerRead(id=i, question_id=i, answer_text="yes", answer_weight=100)]
+        )
+        for i in range(3)
+    ]
+    progress = []
+
+    async def on_progress(result, completed, total):
+        progress.append((result.student_id, completed, total))
+
+    results = asyncio.run(service.publish_personalized_quizzes(
+        quizzes={101: questions[:1], 102: questions[1:]}, module_id=7, type_of_quiz="prereq", on_progress=on_progress
+    ))
+
+    assert [result.student_id for result in results] == [101, 102]
+    assert sorted(result.n_published for result in results) == [1, 1]
+    assert sorted(result.status for result in results) == ["partial", "published"]
+    assert sorted(completed for _, completed, _ in progress) == [1, 2]
+    # The failed question create was not retried
+    assert fake.calls.count(("POST", "/api/v1/courses/1/quizzes/10/questions")) == 3
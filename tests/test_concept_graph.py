@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from app.infrastructure.cache.concept_graph import ConceptGraph
+
+
+def graph_of(*junctions):
+    """
+    Builds a graph from (concept_name, prereq_name) pairs
+    """
+    return ConceptGraph.from_junctions(
+        SimpleNamespace(concept_name=concept_name, prereq_name=prereq_name) for concept_name, prereq_name in junctions
+    )
+
+
+def test_learning_order_puts_prerequisites_first():
+    graph = graph_of(("b", "a"), ("c", "b"), ("c", "a"))
+
+    assert graph.learning_order() == ["a", "b", "c"]
+
+
+def test_learning_order_follows_prerequisites_through_unselected_concepts():
+    # a needs m, m needs z, m is not selected
+    graph = graph_of(("a", "m"), ("m", "z"))
+
+    assert graph.learning_order(["a", "z"]) == ["z", "a"]
+
+
+def test_learning_order_of_a_diamond_subset():
+    graph = graph_of(("top", "left"), ("top", "right"), ("left", "base"), ("right", "base"))
+
+    assert graph.learning_order(["top", "base"]) == ["base", "top"]
+
+
+def test_learning_order_puts_concepts_without_junctions_first():
+    graph = graph_of(("b", "a"))
+
+    assert graph.learning_order(["b", "x", "a"]) == ["x", "a", "b"]
+
+
+def test_learning_order_appends_cycles():
+    graph = graph_of(("a", "b"), ("b", "a"), ("c", "d"))
+
+    assert graph.learning_order() == ["d", "c", "a", "b"]
+
+
+def test_prerequisites_within_hops():
+    graph = graph_of(("a", "m"), ("m", "z"))
+
+    assert graph.prerequisites(["a"], hops=1) == ["m"]
+    assert graph.prerequisites(["a"]) == ["m", "z"]
+    assert graph.dependents(["z"]) == ["m", "a"]
@@ -0,0 +1,40 @@
+import asyncio
+
+from app.infrastructure.event_processor.notifier import JobNotifier, PromptNotifier, QueueNotifier
+
+
+def test_every_waiting_worker_is_woken():
+    notifier = QueueNotifier()
+
+    async def scenario():
+        seen = notifier.version
+        waiters = [asyncio.create_task(notifier.wait(version=seen, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        notifier.notify()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(scenario()) == [True, True, True]
+
+
+def test_notification_before_the_wait_is_not_lost():
+    notifier = QueueNotifier()
+    seen = notifier.version
+    notifier.notify()
+
+    assert asyncio.run(notifier.wait(version=seen, timeout=0.1))
+
+
+def test_wait_times_out_without_a_notification():
+    notifier = QueueNotifier()
+
+    assert not asyncio.run(notifier.wait(version=notifier.version, timeout=0.1))
+
+
+def test_notifiers_are_separate_singletons():
+    assert QueueNotifier() is QueueNotifier()
+    assert len({id(QueueNotifier()), id(JobNotifier()), id(PromptNotifier())}) == 3
+    assert len({QueueNotifier().channel, JobNotifier().channel, PromptNotifier().channel}) == 3
+
+    version = JobNotifier().version
+    PromptNotifier().notify()
+    assert JobNotifier().version == version
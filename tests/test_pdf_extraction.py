@@ -0,0 +1,57 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import fitz
+import pytest
+
+from app.infrastructure.LLM import pdf_extraction
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pdf_of(*pages: str) -> bytes:
+    with fitz.open() as doc:
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        return doc.tobytes()
+
+
+@pytest.fixture
+def small_tasks(monkeypatch):
+    # Three ranges of two pages across two processes, so the pool is actually used
+    monkeypatch.setattr(pdf_extraction._SETTINGS, "PDF_PAGES_PER_TASK", 2)
+    monkeypatch.setattr(pdf_extraction._SETTINGS, "PDF_EXTRACTION_WORKERS", 2)
+    yield
+    pdf_extraction.shutdown_pool()
+
+
+def test_pool_worker_module_does_not_import_the_app():
+    # Run without the settings environment, as a spawned pool process would need it for any app import
+    environment = {name: value for name, value in os.environ.items() if name in ("PATH", "HOME", "PYTHONPATH")}
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, app.infrastructure.LLM.pdf_worker; print(sorted(m for m in sys.modules if m.startswith('app')))"],
+        cwd=ROOT, env=environment, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "['app', 'app.infrastructure', 'app.infrastructure.LLM', 'app.infrastructure.LLM.pdf_worker']"
+
+
+def test_pages_are_extracted_across_the_pool_in_order(small_tasks):
+    pages = [f"page {number}" for number in range(6)]
+    data = pdf_of(*pages)
+
+    chunks = list(pdf_extraction.iter_pdf_pages(data))
+
+    assert len(chunks) == 3
+    assert [line for chunk in chunks for line in chunk.split()[1::2]] == [str(number) for number in range(6)]
+    assert asyncio.run(pdf_extraction.aextract_pdf_text(data)) == "".join(chunks)
+
+
+def test_short_documents_skip_the_pool():
+    data = pdf_of("only page")
+
+    assert pdf_extraction.extract_pdf_text(data).strip() == "only page"
+    assert pdf_extraction._POOL is None
@@ -0,0 +1,236 @@
+import asyncio
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+
+from fastapi_lti1p3.models.cache_models import Nonce, Session
+from fastapi_lti1p3.session_cache import SessionCache
+from fastapi_lti1p3.session_cache import data_store
+from fastapi_lti1p3.session_cache.backends import MemoryBackend, RedisBackend
+from fastapi_lti1p3.session_cache.data_store import DataStore
+
+
+class Clock:
+    """
+    Stands in for time.monotonic in the data store so expiry can be tested without sleeping
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(data_store.time, "monotonic", clock)
+    return clock
+
+
+def session(session_id="s1", **values):
+    return Session(**{"session_id": session_id, "id_token": {"sub": "user"}, "csrf_token": "csrf", "client_credentials": None, "client_id": None, **values})
+
+
+def nonce(value="n1"):
+    return Nonce(nonce=value, target_link_uri="https://tool.test/launch", client_id="client", state="state")
+
+
+def redis_backend(**kwargs):
+    return RedisBackend(client=FakeRedis(), prefix="test", **kwargs)
+
+
+# RedisBackend against fakeredis
+
+def test_redis_create_and_get_round_trip():
+    async def scenario():
+        backend = redis_backend()
+        assert await backend.create(store="session", value=session(client_id="abc"))
+        return await backend.get(store="session", cache_id="s1")
+
+    item = asyncio.run(scenario())
+
+    assert item.session_id == "s1"
+    assert item.id_token == {"sub": "user"}
+    assert item.client_id == "abc"
+    assert item.client_credentials is None
+
+
+def test_redis_create_keeps_primary_keys_unique():
+    async def scenario():
+        backend = redis_backend()
+        first = await backend.create(store="session", value=session(csrf_token="first"))
+        second = await backend.create(store="session", value=session(csrf_token="second"))
+        return first, second, await backend.get(store="session", cache_id="s1")
+
+    first, second, item = asyncio.run(scenario())
+
+    assert (first, second) == (True, False)
+    assert item.csrf_token == "first"
+
+
+def test_redis_pop_returns_the_object_once():
+    async def scenario():
+        backend = redis_backend()
+        await backend.create(store="nonce", value=nonce())
+        return await backend.pop(store="nonce", cache_id="n1"), await backend.pop(store="nonce", cache_id="n1")
+
+    first, second = asyncio.run(scenario())
+
+    assert first.state == "state"
+    assert second is None
+
+
+def test_redis_update_sets_and_clears_fields():
+    async def scenario():
+        backend = redis_backend()
+        await backend.create(store="session", value=session(client_id="abc"))
+        updated = await backend.update(store="session", cache_id="s1", values={"csrf_token": "new", "client_id": None, "unknown": 1})
+        return updated, await backend.get(store="session", cache_id="s1")
+
+    updated, item = asyncio.run(scenario())
+
+    assert updated.csrf_token == item.csrf_token == "new"
+    assert updated.client_id is item.client_id is None
+
+
+def test_redis_update_of_a_missing_object_leaves_nothing_behind():
+    async def scenario():
+        backend = redis_backend()
+        updated = await backend.update(store="session", cache_id="gone", values={"csrf_token": "new"})
+        return updated, await backend.client.exists("test:session:gone")
+
+    assert asyncio.run(scenario()) == (None, 0)
+
+
+def test_redis_session_ttl_restarts_on_get():
+    async def scenario():
+        backend = redis_backend(session_ttl=100)
+        await backend.create(store="session", value=session())
+        await backend.client.expire("test:session:s1", 5)
+        await backend.get(store="session", cache_id="s1")
+        return await backend.client.ttl("test:session:s1")
+
+    assert asyncio.run(scenario()) > 5
+
+
+def test_redis_nonce_expires_after_its_ttl():
+    async def scenario():
+        backend = redis_backend(nonce_ttl=1)
+        await backend.create(store="nonce", value=nonce())
+        # Reads do not extend a nonce
+        assert await backend.get(store="nonce", cache_id="n1") is not None
+        await asyncio.sleep(1.2)
+        return await backend.get(store="nonce", cache_id="n1")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_redis_get_all():
+    async def scenario():
+        backend = redis_backend()
+        await backend.create(store="session", value=session("s1"))
+        await backend.create(store="session", value=session("s2"))
+        await backend.create(store="nonce", value=nonce())
+        return await backend.get_all(store="session")
+
+    assert sorted(asyncio.run(scenario())) == ["s1", "s2"]
+
+
+# SessionCache over either backend
+
+@pytest.fixture
+def session_cache():
+    cache = SessionCache()
+    backend = cache.backend
+    yield cache
+    cache.use_backend(backend)
+
+
+@pytest.mark.parametrize("make_backend", [MemoryBackend, redis_backend], ids=["memory", "redis"])
+def test_session_cache_nonce_is_single_use(session_cache, make_backend):
+    async def scenario():
+        session_cache.use_backend(make_backend())
+        assert await session_cache.create_cache(nonce())
+        return await session_cache.get(cache_id="n1", store="nonce"), await session_cache.get(cache_id="n1", store="nonce")
+
+    first, second = asyncio.run(scenario())
+
+    assert first == "n1"
+    assert second is None
+
+
+@pytest.mark.parametrize("make_backend", [MemoryBackend, redis_backend], ids=["memory", "redis"])
+def test_session_cache_set_and_delete(session_cache, make_backend):
+    async def scenario():
+        session_cache.use_backend(make_backend())
+        await session_cache.create_cache(session())
+        updated = await session_cache.set(cache_id="s1", key="csrf_token", value="new", store="session")
+        await session_cache.delete(cache_id="s1", store="session")
+        return updated, await session_cache.get(cache_id="s1", store="session")
+
+    updated, deleted = asyncio.run(scenario())
+
+    assert updated.csrf_token == "new"
+    assert deleted is None
+
+
+# In memory DataStore
+
+def test_data_store_items_expire_after_their_ttl(clock):
+    store = DataStore(ttl=10)
+    asyncio.run(store.append(session()))
+
+    clock.now += 9
+    assert store["s1"] is not None
+    clock.now += 10
+    assert store["s1"] is None
+    assert len(store) == 0
+
+
+def test_data_store_sliding_ttl_restarts_on_read(clock):
+    sliding, fixed = DataStore(ttl=10, sliding=True), DataStore(ttl=10, sliding=False)
+    asyncio.run(sliding.append(session()))
+    asyncio.run(fixed.append(nonce()))
+
+    clock.now += 8
+    assert sliding["s1"] is not None and fixed["n1"] is not None
+    clock.now += 8
+
+    assert sliding["s1"] is not None
+    assert fixed["n1"] is None
+
+
+def test_data_store_evicts_the_least_recently_used(clock):
+    store = DataStore(max_entries=2)
+    asyncio.run(store.append(session("a")))
+    asyncio.run(store.append(session("b")))
+    assert store["a"] is not None
+
+    asyncio.run(store.append(session("c")))
+
+    assert sorted(store._data) == ["a", "c"]
+
+
+def test_data_store_evicts_expired_items_before_live_ones(clock):
+    store = DataStore(ttl=10, max_entries=2, sliding=False)
+    asyncio.run(store.append(nonce("stale")))
+    clock.now += 2
+    asyncio.run(store.append(nonce("live")))
+    clock.now += 3
+    # stale becomes the most recently used without its TTL restarting
+    assert store["stale"] is not None
+    clock.now += 6
+
+    asyncio.run(store.append(nonce("new")))
+
+    assert sorted(store._data) == ["live", "new"]
+
+
+def test_data_store_rejects_taken_primary_keys_until_expired(clock):
+    store = DataStore(ttl=10)
+
+    assert asyncio.run(store.append(session()))
+    assert not asyncio.run(store.append(session()))
+    clock.now += 11
+    assert asyncio.run(store.append(session()))